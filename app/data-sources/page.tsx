@@ -39,7 +39,9 @@ export default function DataSourcesPage() {
           </Item>
           <Item>
             <b>ONS Postcode Directory (ONSPD)</b> — postcode centroids used to geocode
-            transactions and reference data to grid cells.
+            transactions, reference data, schools, GP surgeries and pharmacies to grid cells.
+            Office for National Statistics, Open Government Licence v3.0. Contains OS data
+            © Crown copyright and database right.
           </Item>
         </Section>
 
@@ -106,12 +108,12 @@ export default function DataSourcesPage() {
         <Section label="Health">
           <Item>
             <b>NHS Organisation Data Service (ODS) — GP Practice file (epraccur)</b> — all
-            active GP surgeries in England with postcode, geocoded via postcodes.io.
+            active GP surgeries in England with postcode, geocoded with the ONS Postcode Directory.
             Open Government Licence v3.0.
           </Item>
           <Item>
             <b>NHS BSA Consolidated Pharmaceutical List</b> — community pharmacy locations in
-            England, geocoded via postcodes.io. Open Government Licence v3.0.
+            England, geocoded with the ONS Postcode Directory. Open Government Licence v3.0.
           </Item>
         </Section>
 
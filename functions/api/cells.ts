@@ -23,6 +23,8 @@ const CORE_CELL_FIELDS = new Set<string>([
   "bb_avg_speed",
   // Listed building: all fields (small lookup, lb_density needed for paint expression)
   "lb_score", "lb_density", "lb_count", "lb_grade1", "lb_grade2s", "lb_grade2",
+  // Flood: share of postcodes at any / high risk for paint expression + scoring
+  "flood_pct_any", "flood_pct_high",
 ]);
 
 export const onRequestGet = async ({ env, request }: { env: Env; request: Request }) => {
@@ -520,7 +522,7 @@ async function backfillVotes(env: Env, grid: GridKey, rows: CellRow[]): Promise<
 /* ---------- slim country lookup (all grids) ---------- */
 
 // country_cells_{grid}.json.gz is a nested dict {gx: {gy: country_char}}
-// built from vote_cells_{grid} by build_country_lookup_assets.py.
+// built from ONSPD country codes (majority per cell) by build_country_lookup_assets.py.
 // Sizes: 1mile=44 KB, 5km=5 KB, 10km=1.3 KB, 25km=0.4 KB compressed.
 // Loading this separately from the vote file means country is always available
 // for flood/school scoring even if the vote lookup fails, and decouples country
@@ -865,6 +867,46 @@ async function getCachedListedBuildingLookup(env: Env, grid: GridKey): Promise<M
   return lookup.size > 0 ? lookup : null;
 }
 
+/* ---------- flood risk cell data ---------- */
+
+// flood_cells_{grid}.json.gz (build_flood_cells.py): per-cell share of postcodes
+// in each flood risk band, so flood exposure is a cell lookup rather than a
+// download of the national postcode points file. England only.
+type FloodCellEntry = { n: number; pct_high: number; pct_medium: number; pct_low: number; pct_very_low: number; pct_any: number };
+const FLOOD_CELLS_CACHE_BY_GRID: Partial<Record<GridKey, { lookup: Map<string, FloodCellEntry>; loadedAtMs: number }>> = {};
+
+async function getCachedFloodCellLookup(env: Env, grid: GridKey): Promise<Map<string, FloodCellEntry> | null> {
+  const now = Date.now();
+  const cached = FLOOD_CELLS_CACHE_BY_GRID[grid];
+  if (cached && now - cached.loadedAtMs <= CACHE_TTL_MS) return cached.lookup.size > 0 ? cached.lookup : null;
+
+  const bucket = getBucket(env);
+  const obj = await bucket.get(`flood_cells_${grid}.json.gz`);
+  if (!obj) {
+    FLOOD_CELLS_CACHE_BY_GRID[grid] = { lookup: new Map(), loadedAtMs: Date.now() };
+    return null;
+  }
+
+  const gz = await obj.arrayBuffer();
+  const jsonText = await gunzipToString(gz);
+  const rows = JSON.parse(jsonText) as Array<{ gx: number; gy: number; flood_n: number; flood_pct_high: number; flood_pct_medium: number; flood_pct_low: number; flood_pct_very_low: number; flood_pct_any: number }>;
+
+  const lookup = new Map<string, FloodCellEntry>();
+  for (const row of rows) {
+    lookup.set(`${row.gx}_${row.gy}`, {
+      n: row.flood_n,
+      pct_high: row.flood_pct_high,
+      pct_medium: row.flood_pct_medium,
+      pct_low: row.flood_pct_low,
+      pct_very_low: row.flood_pct_very_low,
+      pct_any: row.flood_pct_any,
+    });
+  }
+
+  FLOOD_CELLS_CACHE_BY_GRID[grid] = { lookup, loadedAtMs: Date.now() };
+  return lookup.size > 0 ? lookup : null;
+}
+
 /* ---------- modelled price estimates ---------- */
 
 type ModelledRow = { estimated_median: number; model_confidence: number; n_years: number; ratio_cv: number };
@@ -1009,7 +1051,7 @@ async function backfillAll(env: Env, grid: GridKey, rows: CellRow[], coreMode =
     ? Promise.resolve(null)
     : getCachedCommuteLookup(env, grid).catch(() => null);
 
-  const [voteLookup, countryLookup, commuteLookup, ageLookup, crimeLookup, epcFuelLookup, broadbandLookup, lbLookup] = await Promise.all([
+  const [voteLookup, countryLookup, commuteLookup, ageLookup, crimeLookup, epcFuelLookup, broadbandLookup, lbLookup, floodLookup] = await Promise.all([
     votePromise,
     getCachedCountryLookup(env, grid).catch(() => null),
     commutePromise,
@@ -1018,6 +1060,7 @@ async function backfillAll(env: Env, grid: GridKey, rows: CellRow[], coreMode =
     getCachedEpcFuelLookup(env, grid).catch(() => null),
     broadbandPromise,
     getCachedListedBuildingLookup(env, grid).catch(() => null),
+    getCachedFloodCellLookup(env, grid).catch(() => null),
   ]);
 
   return rows.map((row) => {
@@ -1104,6 +1147,16 @@ async function backfillAll(env: Env, grid: GridKey, rows: CellRow[], coreMode =
         ...(lb_density !== null ? { lb_density } : {}) };
     }
 
+    const flood = floodLookup?.get(key);
+    if (flood) out = { ...out,
+      flood_n:            flood.n,
+      flood_pct_high:     flood.pct_high,
+      flood_pct_medium:   flood.pct_medium,
+      flood_pct_low:      flood.pct_low,
+      flood_pct_very_low: flood.pct_very_low,
+      flood_pct_any:      flood.pct_any,
+    };
+
     // Project to core fields only — strips display-only extras (crime rates/counts,
     // commute, broadband detail, epc detail, vote) to reduce response size.
     if (coreMode) {
@@ -1,5 +1,5 @@
 import type { R2Bucket } from "@cloudflare/workers-types";
-import { gunzipStream } from "../_lib/gzip";
+import { gunzipStream, gunzipToString } from "../_lib/gzip";
 
 interface Env {
   R2?: R2Bucket;
@@ -15,6 +15,11 @@ type ResolvedObject = {
 export const onRequestGet = async ({ env, request }: { env: Env; request: Request }) => {
   try {
     const url = new URL(request.url);
+    const postcode = url.searchParams.get("postcode");
+    if (postcode !== null) {
+      return await floodForPostcode(env, postcode);
+    }
+
     const resolved = await resolveFloodObject(env, request);
     if (!resolved) {
       const requestedKey = normalizeRequestedKey(url.searchParams.get("key") ?? env.FLOOD_OVERLAY_KEY ?? "flood_postcode_points.geojson.gz");
@@ -102,7 +107,10 @@ function normalizeRequestedKey(raw: string) {
 async function resolveFloodObject(env: Env, request: Request): Promise<ResolvedObject | null> {
   const url = new URL(request.url);
   const requestedKey = normalizeRequestedKey(url.searchParams.get("key") ?? env.FLOOD_OVERLAY_KEY ?? "flood_postcode_points.geojson.gz");
+  return getWithPrefixes(env, requestedKey);
+}
 
+async function getWithPrefixes(env: Env, requestedKey: string): Promise<ResolvedObject | null> {
   const bucket = env.BRICKGRID_BUCKET ?? env.R2;
   if (!bucket) {
     throw new Error("R2 binding not found. Expected environment binding `BRICKGRID_BUCKET` or `R2`.");
@@ -129,3 +137,71 @@ async function resolveFloodObject(env: Env, request: Request): Promise<ResolvedO
 
   return null;
 }
+
+/* ---------- per-postcode lookup (outcode shards) ---------- */
+
+// build_flood_postcode_assets.py writes flood_lookup/{OUTCODE}.json.gz, each a
+// {postcode_key: record} dict for one outward code, plus flood_lookup/_index.json
+// with per-shard byte sizes. A postcode query fetches only its outcode's shard
+// (typically a few KB), so cold isolates never download the national lookup.
+// Postcodes absent from their shard have no recorded flood risk.
+
+type FloodRecord = Record<string, unknown>;
+
+const SHARD_PREFIX = "flood_lookup";
+const SHARD_CACHE_LIMIT = 64;
+// outcode -> parsed shard (null = no shard for this outcode); insertion-ordered for eviction
+const SHARD_CACHE = new Map<string, Record<string, FloodRecord> | null>();
+
+function normalizePostcodeKey(raw: string): string | null {
+  const key = raw.toUpperCase().replace(/\s+/g, "");
+  return /^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$/.test(key) ? key : null;
+}
+
+async function getFloodShard(env: Env, outcode: string): Promise<Record<string, FloodRecord> | null> {
+  if (SHARD_CACHE.has(outcode)) {
+    const cached = SHARD_CACHE.get(outcode) ?? null;
+    // Refresh recency
+    SHARD_CACHE.delete(outcode);
+    SHARD_CACHE.set(outcode, cached);
+    return cached;
+  }
+
+  const resolved = await getWithPrefixes(env, `${SHARD_PREFIX}/${outcode}.json.gz`);
+  const shard = resolved
+    ? (JSON.parse(await gunzipToString(await resolved.object.arrayBuffer())) as Record<string, FloodRecord>)
+    : null;
+
+  SHARD_CACHE.set(outcode, shard);
+  if (SHARD_CACHE.size > SHARD_CACHE_LIMIT) {
+    const oldest = SHARD_CACHE.keys().next().value;
+    if (oldest !== undefined) SHARD_CACHE.delete(oldest);
+  }
+  return shard;
+}
+
+async function floodForPostcode(env: Env, rawPostcode: string): Promise<Response> {
+  const postcodeKey = normalizePostcodeKey(rawPostcode);
+  if (!postcodeKey) {
+    return Response.json({ error: `Invalid postcode '${rawPostcode}'.` }, { status: 400 });
+  }
+  // Inward code is always the last three characters
+  const outcode = postcodeKey.slice(0, -3);
+  const shard = await getFloodShard(env, outcode);
+  const record = shard?.[postcodeKey] ?? null;
+
+  return Response.json(
+    {
+      postcode_key: postcodeKey,
+      outcode,
+      found: record !== null,
+      flood: record,
+    },
+    {
+      headers: {
+        "Cache-Control": "public, max-age=3600",
+        "X-Flood-Key": `${SHARD_PREFIX}/${outcode}.json.gz`,
+      },
+    }
+  );
+}
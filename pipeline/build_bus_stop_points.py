@@ -15,16 +15,22 @@ Stop types used:
 Outputs:
   data/model/transit/bus_stop_overlay_points.geojson.gz   (BCT + BCS)
   data/model/transit/metro_tram_overlay_points.geojson.gz (TMU + PLT)
+
+The CSV is parsed straight off the HTTP stream in CHUNK_ROWS chunks, reading
+only NAPTAN_COLUMNS; filtering and coordinate parsing are vectorised per chunk
+and features are streamed to the outputs, so memory stays flat.  --url also
+accepts a local (optionally gzipped) CSV.
 """
 from __future__ import annotations
 
 import argparse
-import csv
 import gzip
-import io
 import json
 import urllib.request
 from pathlib import Path
+from typing import BinaryIO
+
+import pandas as pd
 
 from paths import MODEL_TRANSIT_DIR, ensure_pipeline_dirs
 
@@ -33,93 +39,126 @@ NAPTAN_URL = "https://naptan.api.dft.gov.uk/v1/access-nodes?dataFormat=csv"
 BUS_STOP_TYPES   = {"BCT", "BCS"}
 METRO_TRAM_TYPES = {"TMU", "PLT"}
 
+# Only these columns are parsed; the full NaPTAN CSV has ~40
+NAPTAN_COLUMNS = ["ATCOCode", "CommonName", "StopType", "Status", "Longitude", "Latitude"]
+CHUNK_ROWS = 100_000
+
 # GB bounding box sanity check
 LON_MIN, LON_MAX = -8.2, 2.0
 LAT_MIN, LAT_MAX = 49.8, 60.9
 
 
-def download_naptan(url: str) -> str:
-    """Download NaPTAN CSV and return as string."""
-    print(f"Downloading NaPTAN from {url} ...")
-    req = urllib.request.Request(url, headers={"User-Agent": "valuemap-uk/1.0"})
-    with urllib.request.urlopen(req, timeout=120) as r:
-        raw = r.read()
-    print(f"  Downloaded {len(raw) / 1e6:.1f} MB")
-    return raw.decode("utf-8", errors="replace")
+def open_naptan(source: str) -> BinaryIO:
+    """Binary stream of the NaPTAN CSV: an HTTP response for a URL, else a local (optionally .gz) file."""
+    if source.startswith(("http://", "https://")):
+        print(f"Streaming NaPTAN from {source} ...")
+        req = urllib.request.Request(source, headers={"User-Agent": "valuemap-uk/1.0"})
+        return urllib.request.urlopen(req, timeout=120)
+    print(f"Reading NaPTAN from {source} ...")
+    return gzip.open(source, "rb") if source.endswith(".gz") else open(source, "rb")
 
 
-def parse_naptan(csv_text: str) -> tuple[list[dict], list[dict]]:
+def select_stops(chunk: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """
+    Active bus/metro/tram stops in a NaPTAN chunk as name, atco_code,
+    stop_type, lon, lat — plus the number of matching rows dropped for bad
+    coordinates or a missing name and code.
+    """
+    stop_type = chunk["StopType"].str.strip()
+    keep = chunk["Status"].str.strip().eq("active") & stop_type.isin(BUS_STOP_TYPES | METRO_TRAM_TYPES)
+    sub = chunk[keep]
+    stops = pd.DataFrame({
+        "name": sub["CommonName"].str.strip(),
+        "atco_code": sub["ATCOCode"].str.strip(),
+        "stop_type": stop_type[keep],
+        "lon": pd.to_numeric(sub["Longitude"].str.strip(), errors="coerce"),
+        "lat": pd.to_numeric(sub["Latitude"].str.strip(), errors="coerce"),
+    })
+    ok = (
+        stops["lon"].between(LON_MIN, LON_MAX)
+        & stops["lat"].between(LAT_MIN, LAT_MAX)
+        & ((stops["name"] != "") | (stops["atco_code"] != ""))
+    )
+    return stops[ok], int((~ok).sum())
+
+
+class FeatureCollectionWriter:
+    """Streams Point features into a gzip GeoJSON FeatureCollection (renamed into place on close)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.tmp = path.with_name(f"{path.name}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.fh = gzip.open(self.tmp, "wt", encoding="utf-8")
+        self.fh.write('{"type":"FeatureCollection","features":[')
+        self.count = 0
+
+    def write_stops(self, stops: pd.DataFrame) -> None:
+        for name, atco_code, stop_type, lon, lat in zip(
+            stops["name"].tolist(),
+            stops["atco_code"].tolist(),
+            stops["stop_type"].tolist(),
+            stops["lon"].tolist(),
+            stops["lat"].tolist(),
+        ):
+            feature = {
+                "type": "Feature",
+                "properties": {
+                    "name":      name,
+                    "atco_code": atco_code,
+                    "stop_type": stop_type,
+                },
+                "geometry": {
+                    "type": "Point",
+                    # Python round(), not Series.round(): they differ on half-way values
+                    "coordinates": [round(lon, 7), round(lat, 7)],
+                },
+            }
+            if self.count:
+                self.fh.write(",")
+            self.fh.write(json.dumps(feature, ensure_ascii=False, separators=(",", ":")))
+            self.count += 1
+
+    def abort(self) -> None:
+        self.fh.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        self.fh.write("]}")
+        self.fh.close()
+        self.tmp.replace(self.path)
+        print(f"  Written {self.count:,} features → {self.path} ({self.path.stat().st_size / 1e6:.1f} MB)")
+
+
+def parse_naptan(stream: BinaryIO, bus: FeatureCollectionWriter, metro: FeatureCollectionWriter) -> int:
     """
-    Parse NaPTAN CSV, return (bus_features, metro_tram_features) as GeoJSON feature lists.
+    Parse the NaPTAN CSV in CHUNK_ROWS chunks (needed columns only), streaming
+    bus stops and metro/tram stops into their writers.  Returns rows read.
     """
-    bus_features: list[dict] = []
-    metro_tram_features: list[dict] = []
+    rows = 0
     skipped = 0
-
-    reader = csv.DictReader(io.StringIO(csv_text))
-    for row in reader:
-        status    = (row.get("Status") or "").strip()
-        stop_type = (row.get("StopType") or "").strip()
-        if status != "active":
-            continue
-        if stop_type not in (BUS_STOP_TYPES | METRO_TRAM_TYPES):
-            continue
-
-        lon_str = (row.get("Longitude") or "").strip()
-        lat_str = (row.get("Latitude")  or "").strip()
-        if not lon_str or not lat_str:
-            skipped += 1
-            continue
-        try:
-            lon = float(lon_str)
-            lat = float(lat_str)
-        except ValueError:
-            skipped += 1
-            continue
-
-        # GB bounds check
-        if not (LON_MIN <= lon <= LON_MAX) or not (LAT_MIN <= lat <= LAT_MAX):
-            skipped += 1
-            continue
-
-        name      = (row.get("CommonName") or "").strip()
-        atco_code = (row.get("ATCOCode")   or "").strip()
-        if not name and not atco_code:
-            skipped += 1
-            continue
-
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "name":      name,
-                "atco_code": atco_code,
-                "stop_type": stop_type,
-            },
-            "geometry": {
-                "type": "Point",
-                "coordinates": [round(lon, 7), round(lat, 7)],
-            },
-        }
-
-        if stop_type in BUS_STOP_TYPES:
-            bus_features.append(feature)
-        else:
-            metro_tram_features.append(feature)
-
-    return bus_features, metro_tram_features
-
-
-def write_geojson_gz(path: Path, features: list[dict]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    payload = {"type": "FeatureCollection", "features": features}
-    with gzip.open(path, "wt", encoding="utf-8") as fh:
-        json.dump(payload, fh, ensure_ascii=False, separators=(",", ":"))
-    print(f"  Written {len(features):,} features → {path} ({path.stat().st_size / 1e6:.1f} MB)")
+    for chunk in pd.read_csv(
+        stream,
+        usecols=NAPTAN_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=CHUNK_ROWS,
+        encoding="utf-8",
+        encoding_errors="replace",
+    ):
+        rows += len(chunk)
+        stops, dropped = select_stops(chunk)
+        skipped += dropped
+        is_bus = stops["stop_type"].isin(BUS_STOP_TYPES).to_numpy()
+        bus.write_stops(stops[is_bus])
+        metro.write_stops(stops[~is_bus])
+    print(f"  NaPTAN rows: {rows:,}  skipped (bad coordinates / unnamed): {skipped:,}")
+    return rows
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build bus stop and metro/tram overlay GeoJSON from NaPTAN")
-    p.add_argument("--url", default=NAPTAN_URL, help="NaPTAN CSV download URL")
+    p.add_argument("--url", default=NAPTAN_URL, help="NaPTAN CSV download URL or local CSV path")
     p.add_argument(
         "--bus-output",
         default=str(MODEL_TRANSIT_DIR / "bus_stop_overlay_points.geojson.gz"),
@@ -137,17 +176,20 @@ def main() -> None:
     ensure_pipeline_dirs()
     args = parse_args()
 
-    csv_text = download_naptan(args.url)
-    bus_features, metro_features = parse_naptan(csv_text)
-
-    print(f"Bus stops (BCT+BCS): {len(bus_features):,}")
-    print(f"Metro/tram (TMU+PLT): {len(metro_features):,}")
-
-    bus_path   = Path(args.bus_output)
-    metro_path = Path(args.metro_output)
-
-    write_geojson_gz(bus_path, bus_features)
-    write_geojson_gz(metro_path, metro_features)
+    bus = FeatureCollectionWriter(Path(args.bus_output))
+    metro = FeatureCollectionWriter(Path(args.metro_output))
+    try:
+        with open_naptan(args.url) as stream:
+            parse_naptan(stream, bus, metro)
+    except BaseException:
+        bus.abort()
+        metro.abort()
+        raise
+    bus.close()
+    metro.close()
+
+    print(f"Bus stops (BCT+BCS): {bus.count:,}")
+    print(f"Metro/tram (TMU+PLT): {metro.count:,}")
     print("Bus stop and metro/tram overlay generation complete.")
 
 
@@ -1,15 +1,17 @@
 """
-Build slim country-lookup assets for all grid sizes plus an outward-code table:
+Build slim country-lookup assets for all grid sizes plus an outward-code table,
+straight from the ONSPD gazetteer (no dependency on the vote build):
 
 1. country_cells_{grid}.json.gz  (grid = 1mile / 5km / 10km / 25km)
-   Nested dict {str(gx_km): {str(gy_km): country_char}}
-   Derived from vote_cells_{grid}.json.gz which has country on every row.
-   Sizes: ~44 KB / 5 KB / 1.3 KB / 0.4 KB compressed.
+   Nested dict {str(gx): {str(gy): country_char}}  (BNG metres, SW corner)
+   Each cell takes the majority CTRY code of the active postcodes inside it.
 
 2. country_by_outward.json.gz
    Dict {outward_code: country_char}  e.g. {"SW1A": "E", "EH1": "S", "CF10": "W"}
-   Derived from ONSPD active postcodes; 25 border-straddling outward codes resolved
-   by majority count.  ~6 KB compressed.
+   The ~25 border-straddling outward codes are resolved by majority count.
+
+ONSPD is read once; every grid and the outward table are grouped from the
+same frame with bincounts, so the whole build takes seconds.
 
 Writes outputs to:
   pipeline/data/publish/property/country_cells_1mile.json.gz
@@ -17,25 +19,32 @@ Writes outputs to:
   pipeline/data/publish/property/country_cells_10km.json.gz
   pipeline/data/publish/property/country_cells_25km.json.gz
   pipeline/data/publish/property/country_by_outward.json.gz
+
+Usage:
+    python pipeline/build_country_lookup_assets.py
+    python pipeline/build_country_lookup_assets.py --onspd path/to/ONSPD.csv --out-dir path/to/dir
 """
 
-import csv
+from __future__ import annotations
+
+import argparse
 import gzip
 import io
 import json
-import pathlib
-import collections
 import sys
+from pathlib import Path
 
-from paths import RAW_DIR, PUBLISH_DIR
+import numpy as np
+import pandas as pd
+
+import csv_ingest
+from paths import PUBLISH_DIR, RAW_DIR
 
 # ── Paths ─────────────────────────────────────────────────────────────────────
-VOTE_DIR = PUBLISH_DIR / "vote"
 ONSPD_CSV = RAW_DIR / "property" / "ONSPD_Online_latest_Postcode_Centroids_.csv"
 OUT_DIR = PUBLISH_DIR / "property"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-GRIDS = ["1mile", "5km", "10km", "25km"]
+GRID_SIZES = {"1mile": 1600, "5km": 5000, "10km": 10000, "25km": 25000}
 
 # ── Country code normalisation ─────────────────────────────────────────────────
 # CTRY25CD values in ONSPD → single-char country used throughout the codebase
@@ -45,6 +54,12 @@ CTRY_MAP = {
     "W92000004": "W",  # Wales
     "N92000002": "N",  # Northern Ireland
 }
+COUNTRIES = list(CTRY_MAP.values())
+
+# ONSPD gives Northern Ireland eastings/northings on the Irish Grid, which
+# overlaps BNG coordinates in southern Britain, so NI postcodes only feed the
+# outward table.
+CELL_COUNTRIES = {"E", "S", "W"}
 
 
 def gzip_json(obj) -> bytes:
@@ -56,132 +71,138 @@ def gzip_json(obj) -> bytes:
     return buf.getvalue()
 
 
-# ══════════════════════════════════════════════════════════════════════════════
-# STEP 1 — Build country_cells_{grid} for all grids from vote_cells_{grid}
-# ══════════════════════════════════════════════════════════════════════════════
-for grid in GRIDS:
-    src = VOTE_DIR / f"vote_cells_{grid}.json.gz"
-    out = OUT_DIR / f"country_cells_{grid}.json.gz"
-
-    print(f"Building country_cells_{grid}.json.gz …")
-    with gzip.open(src) as f:
-        vote_rows = json.load(f)
-
-    print(f"  {len(vote_rows):,} rows loaded")
-
-    missing = [r for r in vote_rows if not r.get("country")]
-    if missing:
-        print(f"  WARNING: {len(missing)} rows missing country — will be omitted")
-
-    country_dist = collections.Counter(r["country"] for r in vote_rows if r.get("country"))
-    print("  Country distribution:", dict(country_dist))
+# ── Gazetteer ──────────────────────────────────────────────────────────────────
+
+def load_gazetteer(path: Path) -> pd.DataFrame:
+    """
+    Active ONSPD postcodes as: postcode_key, outward (str), east, north
+    (float, NaN when ungridded) and country_code (int index into COUNTRIES).
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"ONSPD not found: {path}")
+    cols = {c.lower().strip(): c for c in csv_ingest.read_header(path)}
+    pc_col = cols.get("pcds") or cols.get("pcd7") or cols.get("pcd")
+    east_col = cols.get("east1m") or cols.get("x")
+    north_col = cols.get("north1m") or cols.get("y")
+    ctry_col = cols.get("ctry25cd") or cols.get("ctry") or next(
+        (c for k, c in cols.items() if k.startswith("ctry") and k.endswith("cd")), None
+    )
+    term_col = cols.get("doterm")
+    if not all([pc_col, east_col, north_col, ctry_col]):
+        raise RuntimeError("Cannot detect postcode/east/north/country columns in ONSPD")
+
+    wanted = {pc_col: "string", east_col: "float64", north_col: "float64", ctry_col: "string"}
+    if term_col:
+        wanted[term_col] = "string"
+    df = csv_ingest.read_csv(path, wanted, filters=[(pc_col, "notnull", None), (ctry_col, "notnull", None)])
+
+    # Skip terminated postcodes (DOTERM set)
+    if term_col:
+        df = df[df[term_col].fillna("").str.strip() == ""]
+
+    country_code = df[ctry_col].str.strip().map(
+        {cd: COUNTRIES.index(c) for cd, c in CTRY_MAP.items()}
+    )
+    key = df[pc_col].str.upper().str.replace(r"\s+", "", regex=True)
+    out = pd.DataFrame({
+        "postcode_key": key,
+        # Inward code is always the last three characters
+        "outward": key.str[:-3],
+        "east": df[east_col].to_numpy(dtype="float64"),
+        "north": df[north_col].to_numpy(dtype="float64"),
+        "country_code": country_code.to_numpy(dtype="float64"),
+    })
+    known = out["country_code"].notna() & (out["outward"].str.len() > 0)
+    skipped = int((~known).sum())
+    if skipped:
+        print(f"  Skipped (no CTRY code / bad postcode): {skipped:,}")
+    out = out[known].reset_index(drop=True)
+    out["country_code"] = out["country_code"].astype("int64")
+    return out
+
+
+# ── Majority grouping ──────────────────────────────────────────────────────────
+
+def majority_country(groups: np.ndarray, codes: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per group: index of the most common country code, and how many distinct
+    countries the group spans.  Ties go to the first country in COUNTRIES.
+    """
+    k = len(COUNTRIES)
+    counts = np.bincount(groups * k + codes, minlength=n_groups * k).reshape(n_groups, k)
+    return counts.argmax(axis=1), (counts > 0).sum(axis=1)
+
+
+def country_cells(gaz: pd.DataFrame, g: int) -> dict[str, dict[str, str]]:
+    """Nested {str(gx): {str(gy): country_char}} for grid size g (metres)."""
+    cell_mask = gaz["country_code"].isin([COUNTRIES.index(c) for c in CELL_COUNTRIES])
+    cell_mask &= gaz["east"].notna() & gaz["north"].notna() & (gaz["east"] > 0) & (gaz["north"] > 0)
+    sub = gaz[cell_mask]
+    gx = (sub["east"].to_numpy() // g * g).astype(np.int64)
+    gy = (sub["north"].to_numpy() // g * g).astype(np.int64)
+    keys, inv = np.unique(np.stack([gx, gy], axis=1), axis=0, return_inverse=True)
+    winner, _ = majority_country(inv.reshape(-1), sub["country_code"].to_numpy(), len(keys))
 
-    # Build nested dict: gx → gy → country_char
     nested: dict[str, dict[str, str]] = {}
-    for r in vote_rows:
-        c = r.get("country")
-        if not c:
-            continue
-        gx_k = str(r["gx"])
-        gy_k = str(r["gy"])
-        if gx_k not in nested:
-            nested[gx_k] = {}
-        nested[gx_k][gy_k] = c
-
-    print(f"  Nested dict: {len(nested)} gx buckets, {sum(len(v) for v in nested.values()):,} cells")
-
-    data = gzip_json(nested)
-    out.write_bytes(data)
-    print(f"  Written {out}  ({len(data)/1024:.1f} KB compressed)")
-    print()
-
-
-# ══════════════════════════════════════════════════════════════════════════════
-# STEP 2 — Build outward-code → country from ONSPD
-# ══════════════════════════════════════════════════════════════════════════════
-OUT_OUTWARD = OUT_DIR / "country_by_outward.json.gz"
-
-print()
-print("Building outward-code → country from ONSPD …")
-
-if not ONSPD_CSV.exists():
-    print(f"  ONSPD not found at {ONSPD_CSV} — skipping outward table")
-    sys.exit(0)
-
-print(f"  Source: {ONSPD_CSV}  ({ONSPD_CSV.stat().st_size / 1024 / 1024:.0f} MB)")
-
-# For each outward code we want the single definitive country.
-# Occasionally an outward spans a border (rare edge case); we pick majority.
-outward_votes: dict[str, collections.Counter] = {}
-
-total = 0
-skipped_ctry = 0
-skipped_term = 0
-
-with open(ONSPD_CSV, encoding="utf-8-sig") as fh:
-    reader = csv.DictReader(fh)
-    for row in reader:
-        total += 1
-        if total % 1_000_000 == 0:
-            print(f"  … {total:,} rows")
-
-        # Skip terminated postcodes (DOTERM != '')
-        if row.get("DOTERM", "").strip():
-            skipped_term += 1
-            continue
-
-        ctry25 = row.get("CTRY25CD", "").strip()
-        country = CTRY_MAP.get(ctry25)
-        if not country:
-            skipped_ctry += 1
-            continue
-
-        pcds = row.get("PCDS", "").strip()
-        if not pcds:
-            continue
-
-        # Outward code = everything before the space, e.g. "SW1A 1AA" → "SW1A"
-        outward = pcds.split(" ")[0].upper()
-        if outward not in outward_votes:
-            outward_votes[outward] = collections.Counter()
-        outward_votes[outward][country] += 1
-
-print(f"  Total rows read: {total:,}")
-print(f"  Skipped (terminated): {skipped_term:,}  (no CTRY code): {skipped_ctry:,}")
-print(f"  Unique outward codes: {len(outward_votes):,}")
-
-# Pick the majority country per outward code
-ambiguous = []
-outward_country: dict[str, str] = {}
-for outward, counter in sorted(outward_votes.items()):
-    winner, winner_n = counter.most_common(1)[0]
-    total_n = sum(counter.values())
-    outward_country[outward] = winner
-    if len(counter) > 1:
-        ambiguous.append((outward, dict(counter)))
-
-print(f"  Ambiguous outward codes (span >1 country): {len(ambiguous)}")
-for ow, dist in ambiguous[:20]:
-    print(f"    {ow}: {dist}")
-
-# Country summary
-country_totals = collections.Counter(outward_country.values())
-print("  Country totals:", dict(country_totals))
-
-data2 = gzip_json(outward_country)
-OUT_OUTWARD.write_bytes(data2)
-print(f"  Written {OUT_OUTWARD}  ({len(data2)/1024:.1f} KB compressed)")
-
-# Show a few examples
-sample_e = [(k, v) for k, v in outward_country.items() if v == "E"][:5]
-sample_s = [(k, v) for k, v in outward_country.items() if v == "S"][:5]
-sample_w = [(k, v) for k, v in outward_country.items() if v == "W"][:5]
-sample_n = [(k, v) for k, v in outward_country.items() if v == "N"][:5]
-print()
-print("Sample E:", sample_e)
-print("Sample S:", sample_s)
-print("Sample W:", sample_w)
-print("Sample N:", sample_n)
-
-print()
-print("Done.")
+    for (x, y), c in zip(keys.tolist(), winner.tolist()):
+        nested.setdefault(str(x), {})[str(y)] = COUNTRIES[c]
+    return nested
+
+
+def country_by_outward(gaz: pd.DataFrame) -> tuple[dict[str, str], dict[str, int]]:
+    """{outward: country_char} plus the outward codes that span >1 country."""
+    idx, outwards = pd.factorize(gaz["outward"], sort=True)
+    winner, spans = majority_country(idx, gaz["country_code"].to_numpy(), len(outwards))
+    lookup = {str(o): COUNTRIES[c] for o, c in zip(outwards, winner.tolist())}
+    ambiguous = {str(o): int(s) for o, s in zip(outwards, spans.tolist()) if s > 1}
+    return lookup, ambiguous
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def write_asset(path: Path, obj) -> None:
+    data = gzip_json(obj)
+    path.write_bytes(data)
+    print(f"  Written {path}  ({len(data) / 1024:.1f} KB compressed)")
+
+
+def build_country_lookup_assets(onspd_path: Path, out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Loading ONSPD: {onspd_path}  ({onspd_path.stat().st_size / 1024 / 1024:.0f} MB)")
+    gaz = load_gazetteer(onspd_path)
+    print(f"  Active postcodes with a country: {len(gaz):,}")
+
+    for grid, g in GRID_SIZES.items():
+        print(f"\nBuilding country_cells_{grid}.json.gz …")
+        nested = country_cells(gaz, g)
+        n_cells = sum(len(v) for v in nested.values())
+        dist = pd.Series([c for ys in nested.values() for c in ys.values()]).value_counts().to_dict()
+        print(f"  {n_cells:,} cells in {len(nested)} gx buckets  {dist}")
+        write_asset(out_dir / f"country_cells_{grid}.json.gz", nested)
+
+    print("\nBuilding outward-code → country …")
+    outward_country, ambiguous = country_by_outward(gaz)
+    print(f"  Unique outward codes: {len(outward_country):,}")
+    print(f"  Ambiguous outward codes (span >1 country): {len(ambiguous)}")
+    for ow in list(ambiguous)[:20]:
+        print(f"    {ow}: {outward_country[ow]} (of {ambiguous[ow]})")
+    print("  Country totals:", pd.Series(list(outward_country.values())).value_counts().to_dict())
+    write_asset(out_dir / "country_by_outward.json.gz", outward_country)
+
+    print("\nDone.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build country_cells_{grid} and country_by_outward lookups from ONSPD")
+    parser.add_argument("--onspd", default=str(ONSPD_CSV), help="Path to ONSPD CSV")
+    parser.add_argument("--out-dir", default=str(OUT_DIR), help="Output directory (default: publish/property)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    onspd = Path(args.onspd)
+    if not onspd.exists():
+        print(f"ONSPD not found at {onspd} — skipping country lookup")
+        sys.exit(0)
+    build_country_lookup_assets(onspd, Path(args.out_dir))
@@ -35,12 +35,18 @@ Each file is a JSON array of objects:
 Composite weight: violentÃ—4 + propertyÃ—1 + asbÃ—0.3 (normalised by 5.3).
 Absolute scoring: inverse national percentile â€” cells with the LOWEST rate score 100.
 Local scoring: cells ranked within a spatial neighbourhood, blended with national score.
+
+--mode points bins the street-level incident snap points cached by
+build_crime_overlay.py straight to each grid instead of spreading LSOA totals
+over postcodes; per-cell population for the rates is cached after the first run
+(and rebuilt when ONSPD or the LSOA overlay changes).
 """
 
 from __future__ import annotations
 
 import argparse
 import gzip
+import hashlib
 import json
 import sys
 from pathlib import Path
@@ -50,7 +56,9 @@ import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent))
 import shutil
+from build_crime_overlay import cached_months, cached_window_keys, load_cell_counts
 from paths import (
+    INTERMEDIATE_CRIME_CELL_POPULATION_TEMPLATE,
     MODEL_CRIME_CELLS_TEMPLATE,
     MODEL_CRIME_DIR,
     MODEL_CRIME_OVERLAY,
@@ -259,16 +267,103 @@ def compute_local_pct(
     return local_pct
 
 
+# Rows of cells compared per batch in compute_local_pct_grid (bounds memory for
+# fine grids: each batch holds a few int32 arrays of STRIP_ROWS × grid height).
+STRIP_ROWS = 256
+
+
+def compute_local_pct_grid(
+    gx_arr: np.ndarray,
+    gy_arr: np.ndarray,
+    rate_arr: np.ndarray,
+    radius_m: int,
+    cell_m: int,
+) -> np.ndarray:
+    """
+    Vectorised compute_local_pct for cells on a regular cell_m lattice.
+
+    Cells are scattered into a dense (x, y) raster padded by the window
+    half-width R = radius_m // cell_m.  For every offset in the (2R+1)² square
+    window the shifted raster is compared with the centre raster in one array
+    operation, accumulating neighbour / lower / equal counts per cell; rows are
+    processed in STRIP_ROWS batches.  The arithmetic matches compute_local_pct
+    exactly (same counts, same final expression), so results are identical.
+
+    Falls back to compute_local_pct if the cells are not on the lattice.
+    """
+    n = len(rate_arr)
+    if radius_m <= 0 or n == 0:
+        return np.full(n, 50.0)
+
+    x0, y0 = gx_arr.min(), gy_arr.min()
+    xi = (gx_arr - x0) / cell_m
+    yi = (gy_arr - y0) / cell_m
+    if not (np.all(xi == np.floor(xi)) and np.all(yi == np.floor(yi))):
+        return compute_local_pct(gx_arr, gy_arr, rate_arr, radius_m)
+    xi = xi.astype(np.int64)
+    yi = yi.astype(np.int64)
+
+    r = int(radius_m // cell_m)
+    nx, ny = int(xi.max()) + 1, int(yi.max()) + 1
+    occupied = np.zeros((nx + 2 * r, ny + 2 * r), dtype=bool)
+    rates = np.full(occupied.shape, np.nan)
+    occupied[xi + r, yi + r] = True
+    rates[xi + r, yi + r] = rate_arr
+    if int(occupied.sum()) != n:
+        raise ValueError("compute_local_pct_grid needs one cell per (gx, gy)")
+
+    k_grid     = np.zeros((nx, ny), dtype=np.int32)
+    lower_grid = np.zeros((nx, ny), dtype=np.int32)
+    equal_grid = np.zeros((nx, ny), dtype=np.int32)
+
+    for a in range(0, nx, STRIP_ROWS):
+        b = min(a + STRIP_ROWS, nx)
+        centre = rates[a + r:b + r, r:r + ny]
+        k = k_grid[a:b]
+        lower = lower_grid[a:b]
+        equal = equal_grid[a:b]
+        for dx in range(-r, r + 1):
+            for dy in range(-r, r + 1):
+                nbr_occ  = occupied[a + r + dx:b + r + dx, r + dy:r + dy + ny]
+                nbr_rate = rates[a + r + dx:b + r + dx, r + dy:r + dy + ny]
+                k     += nbr_occ
+                lower += nbr_rate < centre
+                equal += nbr_rate == centre
+
+    k     = k_grid[xi, yi].astype(np.float64)
+    lower = lower_grid[xi, yi].astype(np.float64)
+    equal = equal_grid[xi, yi].astype(np.float64)
+
+    local_pct = np.full(n, 50.0)
+    ok = k > 1
+    rank = lower[ok] + 0.5 * equal[ok]
+    local_pct[ok] = (1.0 - rank / (k[ok] - 1)) * 100.0
+    return local_pct
+
+
+def verify_local_pct(agg: pd.DataFrame, rate_col: str, radius_m: int, cell_m: int) -> None:
+    """Check compute_local_pct_grid against the reference loop; raise on mismatch."""
+    gx_arr = agg["gx"].values.astype(np.float64)
+    gy_arr = agg["gy"].values.astype(np.float64)
+    rate   = agg[rate_col].values.astype(np.float64)
+    fast = compute_local_pct_grid(gx_arr, gy_arr, rate, radius_m, cell_m)
+    ref  = compute_local_pct(gx_arr, gy_arr, rate, radius_m)
+    if not np.array_equal(fast, ref):
+        bad = int(np.sum(fast != ref))
+        raise AssertionError(
+            f"local pct mismatch for {rate_col} at {cell_m}m: {bad:,} of {len(ref):,} cells differ "
+            f"(max abs diff {np.max(np.abs(fast - ref)):.6g})"
+        )
+    print(f"[verified {rate_col}]", end=" ", flush=True)
+
+
 # â”€â”€ Grid snap + aggregate â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
 
-def build_cells_for_grid(
-    df_joined: pd.DataFrame,
-    grid_m: int,
-    grid_label: str,
-) -> list[dict]:
+def aggregate_lsoa_cells(df_joined: pd.DataFrame, grid_m: int) -> pd.DataFrame:
     """
-    Snap postcode points to a grid and compute per-cell crime rates, national
-    scores, and blended local scores.
+    Snap postcode points to a grid and spread each LSOA's annual crime counts
+    and population over its postcodes.  Returns gx, gy, violent_sum,
+    property_sum, asb_sum, total_sum, population.
     """
     # Fractional share: weight each postcode by 1/n_postcodes in its LSOA
     df = df_joined.copy()
@@ -288,7 +383,50 @@ def build_cells_for_grid(
         total_sum    =("total_annual_frac",     "sum"),
         population   =("population_frac",       "sum"),
     )
+    return agg
+
 
+def aggregate_point_cells(
+    point_counts: pd.DataFrame,
+    population: pd.DataFrame,
+    months_used: int,
+) -> pd.DataFrame:
+    """
+    Annualised incident counts binned straight from street-level snap points
+    (build_crime_overlay.load_cell_counts), over the cells that have resident
+    population.  Same columns as aggregate_lsoa_cells.
+    """
+    ann_factor = 12.0 / max(months_used, 1)
+    agg = population.merge(point_counts, on=["gx", "gy"], how="left")
+    for tier in ("violent", "property", "asb", "other"):
+        agg[tier] = agg[tier].fillna(0).astype(np.float64) * ann_factor
+    agg["violent_sum"]  = agg["violent"]
+    agg["property_sum"] = agg["property"]
+    agg["asb_sum"]      = agg["asb"]
+    agg["total_sum"]    = agg["violent"] + agg["property"] + agg["asb"] + agg["other"]
+    return agg[["gx", "gy", "violent_sum", "property_sum", "asb_sum", "total_sum", "population"]]
+
+
+def build_cells_for_grid(
+    df_joined: pd.DataFrame,
+    grid_m: int,
+    grid_label: str,
+    verify_local: bool = False,
+) -> list[dict]:
+    """
+    Snap postcode points to a grid and compute per-cell crime rates, national
+    scores, and blended local scores.
+    """
+    return score_cells(aggregate_lsoa_cells(df_joined, grid_m), grid_m, grid_label, verify_local)
+
+
+def score_cells(
+    agg: pd.DataFrame,
+    grid_m: int,
+    grid_label: str,
+    verify_local: bool = False,
+) -> list[dict]:
+    """Rates, counts, national and blended local scores for aggregated cells."""
     # Rates per 1,000 residents (annualised)
     pop = agg["population"].clip(lower=1)
     agg["violent_rate"]  = (agg["violent_sum"]  / pop * 1000).round(1)
@@ -332,8 +470,10 @@ def build_cells_for_grid(
             ("asb_rate",      "asb_score",      "asb_local_score"),
         ]
         for rate_col, nat_col, local_col in rate_cols:
-            local_pct = compute_local_pct(
-                gx_arr, gy_arr, agg[rate_col].values.astype(np.float64), radius_m
+            if verify_local:
+                verify_local_pct(agg, rate_col, radius_m, grid_m)
+            local_pct = compute_local_pct_grid(
+                gx_arr, gy_arr, agg[rate_col].values.astype(np.float64), radius_m, grid_m
             )
             blended = local_pct * local_weight + agg[nat_col].values * nat_weight
             agg[local_col] = np.round(blended).astype(int)
@@ -356,9 +496,8 @@ def build_cells_for_grid(
 
 # â”€â”€ Main â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
 
-def main(onspd_path: Path) -> None:
-    ensure_pipeline_dirs()
-
+def load_joined(onspd_path: Path) -> pd.DataFrame:
+    """Postcodes (ONSPD) joined to their LSOA's crime stats."""
     # 1. Load LSOA crime data
     df_crime = load_lsoa_crime(MODEL_CRIME_OVERLAY)
 
@@ -376,27 +515,118 @@ def main(onspd_path: Path) -> None:
     print(f"  Joined rows (postcodes with crime data): {len(df_joined):,}")
     if df_joined.empty:
         raise RuntimeError("Join produced no rows â€“ check LSOA code column names")
+    return df_joined
+
+
+def population_path(grid_label: str) -> Path:
+    return Path(str(INTERMEDIATE_CRIME_CELL_POPULATION_TEMPLATE).replace("{grid}", grid_label))
+
+
+def population_stamp(onspd_path: Path) -> str:
+    """
+    Inputs the cell population depends on: ONSPD (name, size, mtime) and the
+    LSOA overlay's contents (its LSOA set and populations, incl. sparse-force
+    exclusions), hashed.
+    """
+    if not MODEL_CRIME_OVERLAY.exists():
+        raise FileNotFoundError(
+            f"Crime LSOA overlay not found: {MODEL_CRIME_OVERLAY}\n"
+            "Run build_crime_overlay.py first."
+        )
+    stat = onspd_path.stat()
+    overlay_hash = hashlib.sha256(MODEL_CRIME_OVERLAY.read_bytes()).hexdigest()[:16]
+    return f"{onspd_path.name}:{stat.st_size}:{int(stat.st_mtime)}|overlay:{overlay_hash}"
+
+
+def load_cell_population(onspd_path: Path, refresh: bool = False) -> dict[str, pd.DataFrame]:
+    """
+    Resident population per cell (gx, gy, population) for every grid.  Built
+    once from the postcode join and cached, keyed on population_stamp, so
+    points mode does not re-read ONSPD until ONSPD or the overlay changes.
+    LSOAs dropped from the overlay (sparse forces) carry no population, so
+    their cells are left out as in LSOA mode.
+    """
+    paths = {label: population_path(label) for label, _ in GRID_SIZES}
+    stamp = population_stamp(onspd_path)
+    if not refresh and all(p.exists() for p in paths.values()):
+        cached = {label: pd.read_parquet(p) for label, p in paths.items()}
+        if all("source" in df.columns and len(df) and df["source"].iloc[0] == stamp for df in cached.values()):
+            print("Using cached cell population")
+            return {label: df.drop(columns=["source"]) for label, df in cached.items()}
+        print("Cached cell population is stale (ONSPD or overlay changed); rebuilding")
+
+    df_joined = load_joined(onspd_path)
+    out: dict[str, pd.DataFrame] = {}
+    for grid_label, grid_m in GRID_SIZES:
+        pop = aggregate_lsoa_cells(df_joined, grid_m)[["gx", "gy", "population"]]
+        paths[grid_label].parent.mkdir(parents=True, exist_ok=True)
+        pop.assign(source=pd.Categorical([stamp] * len(pop))).to_parquet(paths[grid_label], index=False)
+        out[grid_label] = pop
+    return out
+
+
+def write_cells(cells: list[dict], grid_label: str) -> None:
+    out_path = MODEL_CRIME_DIR / MODEL_CRIME_CELLS_TEMPLATE.name.format(grid=grid_label)
+    with gzip.open(out_path, "wt", encoding="utf-8") as f:
+        json.dump(cells, f, separators=(",", ":"))
+    size_kb = out_path.stat().st_size // 1024
+    publish_path = PUBLISH_CRIME_DIR / out_path.name
+    shutil.copy2(out_path, publish_path)
+    print(f"  → {out_path.name}  ({size_kb:,} KB)  [staged to publish]")
+
+
+def _announce(grid_label: str) -> None:
+    cfg = LOCAL_CONFIG[grid_label]
+    radius_km = cfg["radius_m"] // 1000
+    lw = int(cfg["local_weight"] * 100)
+    print(
+        f"Building {grid_label} cells "
+        f"(local radius {radius_km}km, {lw}% local / {100-lw}% national) â€¦",
+        end=" ", flush=True,
+    )
+
+
+def main(onspd_path: Path, verify_local: bool = False) -> None:
+    ensure_pipeline_dirs()
+    df_joined = load_joined(onspd_path)
 
     # 4. Build one file per grid size
     for grid_label, grid_m in GRID_SIZES:
-        cfg = LOCAL_CONFIG[grid_label]
-        radius_km = cfg["radius_m"] // 1000
-        lw = int(cfg["local_weight"] * 100)
-        print(
-            f"Building {grid_label} cells "
-            f"(local radius {radius_km}km, {lw}% local / {100-lw}% national) â€¦",
-            end=" ", flush=True,
-        )
-        cells = build_cells_for_grid(df_joined, grid_m, grid_label)
+        _announce(grid_label)
+        cells = build_cells_for_grid(df_joined, grid_m, grid_label, verify_local)
         print(f"{len(cells):,} cells")
+        write_cells(cells, grid_label)
+
+    print("Done.")
 
-        out_path = MODEL_CRIME_DIR / MODEL_CRIME_CELLS_TEMPLATE.name.format(grid=grid_label)
-        with gzip.open(out_path, "wt", encoding="utf-8") as f:
-            json.dump(cells, f, separators=(",", ":"))
-        size_kb = out_path.stat().st_size // 1024
-        publish_path = PUBLISH_CRIME_DIR / out_path.name
-        shutil.copy2(out_path, publish_path)
-        print(f"  → {out_path.name}  ({size_kb:,} KB)  [staged to publish]")
+
+def main_points(
+    onspd_path: Path,
+    months: int = 12,
+    verify_local: bool = False,
+    refresh_population: bool = False,
+) -> None:
+    """
+    Points mode: incident counts come from the street-level snap points binned
+    per cell by build_crime_overlay.py (monthly cache), not from LSOA totals
+    spread over postcodes, so a large rural LSOA no longer smears its crimes
+    across every cell it touches.
+    """
+    ensure_pipeline_dirs()
+    chosen = cached_months()[:months]
+    if not chosen:
+        sys.exit("ERROR: no cached monthly crime counts – run build_crime_overlay.py first")
+    keys = cached_window_keys(chosen)
+    print(f"Binned crime points: {chosen[-1]} → {chosen[0]}  ({len(chosen)} months, {len(keys):,} force files)")
+
+    population = load_cell_population(onspd_path, refresh_population)
+
+    for grid_label, grid_m in GRID_SIZES:
+        _announce(grid_label)
+        agg = aggregate_point_cells(load_cell_counts(keys, grid_label), population[grid_label], len(chosen))
+        cells = score_cells(agg, grid_m, grid_label, verify_local)
+        print(f"{len(cells):,} cells")
+        write_cells(cells, grid_label)
 
     print("Done.")
 
@@ -410,5 +640,32 @@ if __name__ == "__main__":
         default=str(ONSPD_DEFAULT),
         help="Path to ONSPD postcode centroid CSV",
     )
+    parser.add_argument(
+        "--verify-local",
+        action="store_true",
+        help="Also run the reference compute_local_pct loop and fail if any local score differs",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["lsoa", "points"],
+        default="lsoa",
+        help="lsoa: spread LSOA totals over postcodes (default); "
+             "points: bin street-level incident points directly to cells",
+    )
+    parser.add_argument(
+        "--months",
+        type=int,
+        default=12,
+        help="Points mode: most-recent cached months to include (default: 12)",
+    )
+    parser.add_argument(
+        "--refresh-population",
+        action="store_true",
+        help="Points mode: rebuild the cached per-cell population from ONSPD",
+    )
     args = parser.parse_args()
-    main(onspd_path=Path(args.onspd).expanduser().resolve())
+    onspd_path = Path(args.onspd).expanduser().resolve()
+    if args.mode == "points":
+        main_points(onspd_path, args.months, args.verify_local, args.refresh_population)
+    else:
+        main(onspd_path=onspd_path, verify_local=args.verify_local)
@@ -7,9 +7,12 @@ Coverage:   England, Wales, Northern Ireland  (Scotland = BTP only – excluded)
 
 Steps
 -----
-1. Download latest.zip (~1.6 GB) from data.police.uk unless --no-download
+1. Download latest.zip (~1.6 GB) from data.police.uk unless --no-download;
+   a conditional request (If-Modified-Since) skips it when the local copy is current
 2. Scan all *-street.csv files inside the zip; keep only the 12 most recent months
-3. Aggregate per LSOA: violent / property / ASB / other crime counts
+3. Parse force-months not yet in the monthly count cache (per LSOA × crime type,
+   data/intermediate/crime/monthly_counts/<month>/<force>.parquet), then sum
+   the window per LSOA: violent / property / ASB / other crime counts
 4. Derive LSOA centroid as the mean of the crime snap-point coordinates
 5. Join population from ONS Census 2021 LSOA age data (ts007a_age_lsoa21.csv)
 6. Compute rates per 1,000 residents (annualised over the 12 months)
@@ -33,29 +36,38 @@ Usage
 -----
   python build_crime_overlay.py               # download + build
   python build_crime_overlay.py --no-download # use the cached latest.zip
+  python build_crime_overlay.py --cache-only  # rebuild from cached monthly counts
 """
 from __future__ import annotations
 
 import argparse
 import csv
+import email.utils
 import gzip
 import io
 import json
+import os
 import re
 import shutil
 import sys
+import urllib.error
 import urllib.request
 import zipfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Set, Tuple
 
+import numpy as np
+import pandas as pd
+
 from paths import (
     MODEL_CRIME_DIR,
     MODEL_CRIME_OVERLAY,
     PUBLISH_CRIME_DIR,
     RAW_CENSUS_AGE_LSOA,
     RAW_CRIME_LATEST_ZIP,
+    INTERMEDIATE_CRIME_MONTHLY_DIR,
     ensure_pipeline_dirs,
 )
 
@@ -85,11 +97,37 @@ ARCHIVE_URL = "https://data.police.uk/data/archive/latest.zip"
 
 
 def _download(url: str, dest: Path) -> None:
+    """
+    Fetch url to dest unless the local copy is current.  The request carries
+    If-Modified-Since (dest's mtime, which is set to the server's
+    Last-Modified after each download); a 304, or a 200 whose Last-Modified
+    and Content-Length match the local file, skips the transfer.
+    """
     dest.parent.mkdir(parents=True, exist_ok=True)
-    print(f"Downloading {url}  →  {dest}")
-    req = urllib.request.Request(url, headers={"User-Agent": "valuemap-pipeline/1.0"})
-    with urllib.request.urlopen(req, timeout=300) as resp:
+    headers = {"User-Agent": "valuemap-pipeline/1.0"}
+    local = dest.stat() if dest.exists() else None
+    if local is not None:
+        headers["If-Modified-Since"] = email.utils.formatdate(local.st_mtime, usegmt=True)
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        resp = urllib.request.urlopen(req, timeout=300)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and local is not None:
+            print(f"Archive unchanged since last download (HTTP 304) – using {dest}")
+            return
+        raise
+    with resp:
         total = int(resp.headers.get("Content-Length") or 0)
+        last_modified = resp.headers.get("Last-Modified")
+        remote_mtime = email.utils.parsedate_to_datetime(last_modified).timestamp() if last_modified else None
+        if (
+            local is not None and remote_mtime is not None
+            and int(remote_mtime) == int(local.st_mtime) and total == local.st_size
+        ):
+            print(f"Archive unchanged (same Last-Modified and size) – using {dest}")
+            return
+
+        print(f"Downloading {url}  →  {dest}")
         downloaded = 0
         chunk_size = 1024 * 1024  # 1 MB
         tmp = dest.with_suffix(".tmp")
@@ -105,6 +143,8 @@ def _download(url: str, dest: Path) -> None:
                     mb = downloaded / (1024 * 1024)
                     print(f"\r  {mb:.0f} MB  ({pct:.1f}%)     ", end="", flush=True)
         print()  # newline after progress
+    if remote_mtime is not None:
+        os.utime(tmp, (remote_mtime, remote_mtime))
     tmp.replace(dest)
     print(f"Download complete: {dest.stat().st_size / (1024 * 1024):.0f} MB")
 
@@ -131,78 +171,258 @@ def _pick_latest_months(months_map: Dict[str, List[str]], n: int = 12) -> List[s
 
 
 # ── CSV processing ─────────────────────────────────────────────────────────────
+#
+# Each force-month street CSV is reduced to counts per (LSOA, crime type) plus
+# coordinate sums and cached as INTERMEDIATE_CRIME_MONTHLY_DIR/<month>/<force>.parquet.
+# A rolling-window build only parses members whose (month, force) is not yet
+# cached; the window totals are then summed from the cache.
+#
+# The same pass bins every incident's snap point to the standard BNG grids
+# (<force>.cells.parquet: grid, gx, gy + per-tier counts) for the points mode
+# of build_crime_cells.py.
+
+# Columns read from each street CSV (everything else is never decoded)
+STREET_COLS = ["LSOA code", "LSOA name", "Crime type", "Latitude", "Longitude"]
+TIERS = ("violent", "property", "asb", "other")
+COUNT_COLS = ["crimes", "lat_sum", "lon_sum", "n_coords"]
+ACC_COLS = [*TIERS, "lat_sum", "lon_sum", "n_coords"]
+
+CELL_GRIDS: list[tuple[str, int]] = [
+    ("1mile", 1_600),
+    ("5km",  5_000),
+    ("10km", 10_000),
+    ("25km", 25_000),
+]
+
+TIER_BY_TYPE: Dict[str, str] = {
+    **{t: "violent" for t in VIOLENT_TYPES},
+    **{t: "property" for t in PROPERTY_TYPES},
+    **{t: "asb" for t in ASB_TYPES},
+}
+
+
+def _member_key(member: str) -> Tuple[str, str]:
+    """(YYYY-MM, force) for a path like 2025-11/avon-and-somerset/2025-11-avon-and-somerset-street.csv."""
+    month = member.split("/")[0]
+    stem = member.rsplit("/", 1)[-1][: -len("-street.csv")]
+    force = stem[len(month) + 1:] if stem.startswith(month + "-") else stem
+    return month, force
+
+
+def _cache_path(month: str, force: str) -> Path:
+    return INTERMEDIATE_CRIME_MONTHLY_DIR / month / f"{force}.parquet"
+
+
+def _cells_cache_path(month: str, force: str) -> Path:
+    return INTERMEDIATE_CRIME_MONTHLY_DIR / month / f"{force}.cells.parquet"
+
+
+def _is_cached(month: str, force: str) -> bool:
+    return _cache_path(month, force).exists() and _cells_cache_path(month, force).exists()
+
+
+def _empty_counts() -> pd.DataFrame:
+    return pd.DataFrame({
+        "lsoa_code": pd.Series(dtype="string"),
+        "lsoa_name": pd.Series(dtype="string"),
+        "crime_type": pd.Series(dtype="string"),
+        **{c: pd.Series(dtype="float64" if c.endswith("_sum") else "int64") for c in COUNT_COLS},
+    })
+
+
+def _empty_cells() -> pd.DataFrame:
+    return pd.DataFrame({
+        "grid": pd.Series(dtype="string"),
+        "gx": pd.Series(dtype="int64"),
+        "gy": pd.Series(dtype="int64"),
+        **{t: pd.Series(dtype="int64") for t in TIERS},
+    })
+
+
+def _bin_points(east: np.ndarray, north: np.ndarray, tier: np.ndarray) -> pd.DataFrame:
+    """Per-tier incident counts per cell for every CELL_GRIDS size."""
+    tier_codes = pd.Categorical(tier, categories=list(TIERS)).codes
+    frames = []
+    for label, grid_m in CELL_GRIDS:
+        gx = (east // grid_m * grid_m).astype("int64")
+        gy = (north // grid_m * grid_m).astype("int64")
+        keys, inv = np.unique(np.stack([gx, gy], axis=1), axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        flat = np.bincount(inv * len(TIERS) + tier_codes, minlength=len(keys) * len(TIERS))
+        flat = flat.reshape(len(keys), len(TIERS))
+        frame = pd.DataFrame({"grid": label, "gx": keys[:, 0], "gy": keys[:, 1]})
+        for j, t in enumerate(TIERS):
+            frame[t] = flat[:, j].astype("int64")
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True).astype({"grid": "string"})
+
+
+def _parse_csv_bytes(raw: bytes, transformer=None) -> Tuple[pd.DataFrame, pd.DataFrame, int, int]:
+    """Parse one force-month street CSV into counts per (LSOA, crime type).
+
+    Returns (frame with lsoa_code, lsoa_name, crime_type + COUNT_COLS,
+    per-cell tier counts (empty unless a WGS84 → BNG `transformer` is given),
+    rows_processed, rows_skipped).
+    """
+    if not raw.strip():
+        return _empty_counts(), _empty_cells(), 0, 0
+    df = pd.read_csv(
+        io.BytesIO(raw),
+        usecols=lambda c: c in STREET_COLS,
+        dtype="string",
+        encoding_errors="replace",
+    )
+    for col in STREET_COLS:
+        if col not in df.columns:
+            df[col] = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    code = df["LSOA code"].str.strip().fillna("")
+    crime_type = df["Crime type"].str.strip().str.lower().fillna("")
+    # Scotland: LSOA codes start with S (DataZones) — skip
+    keep = (code != "") & (crime_type != "") & ~code.str.startswith("S")
+    skipped = int((~keep).sum())
+    if not keep.any():
+        return _empty_counts(), _empty_cells(), 0, skipped
+
+    lat = pd.to_numeric(df["Latitude"][keep], errors="coerce").astype("float64")
+    lon = pd.to_numeric(df["Longitude"][keep], errors="coerce").astype("float64")
+    has_coord = lat.between(-90, 90) & lon.between(-180, 180) & (lat != 0) & (lon != 0)
+
+    name = df["LSOA name"][keep].str.strip()
+    rows = pd.DataFrame({
+        "lsoa_code": code[keep],
+        "lsoa_name": name.mask(name == ""),
+        "crime_type": crime_type[keep],
+        "crimes": 1,
+        "lat_sum": lat.where(has_coord, 0.0),
+        "lon_sum": lon.where(has_coord, 0.0),
+        "n_coords": has_coord.astype("int64"),
+    })
+    grouped = rows.groupby(["lsoa_code", "crime_type"], sort=False)
+    out = grouped[COUNT_COLS].sum()
+    out.insert(0, "lsoa_name", grouped["lsoa_name"].first())
+
+    cells = _empty_cells()
+    if transformer is not None and has_coord.any():
+        east, north = transformer.transform(lon[has_coord].to_numpy(), lat[has_coord].to_numpy())
+        east, north = np.asarray(east), np.asarray(north)
+        finite = np.isfinite(east) & np.isfinite(north)
+        tier = crime_type[keep][has_coord].map(TIER_BY_TYPE).fillna("other").to_numpy()
+        cells = _bin_points(east[finite], north[finite], tier[finite])
+
+    return out.reset_index()[list(_empty_counts().columns)], cells, int(keep.sum()), skipped
+
+
+_WORKER_ZIP: zipfile.ZipFile | None = None
+_WORKER_TRANSFORMER = None
+
+
+def _init_worker(zip_path: str) -> None:
+    global _WORKER_ZIP, _WORKER_TRANSFORMER
+    from pyproj import Transformer
+
+    _WORKER_ZIP = zipfile.ZipFile(zip_path, "r")
+    _WORKER_TRANSFORMER = Transformer.from_crs("EPSG:4326", "EPSG:27700", always_xy=True)
+
+
+def _write_parquet(frame: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    frame.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+
+def _parse_member(member: str) -> Tuple[int, int]:
+    """Worker: parse one zip member and write its (month, force) cache files."""
+    assert _WORKER_ZIP is not None
+    counts, cells, processed, skipped = _parse_csv_bytes(_WORKER_ZIP.read(member), _WORKER_TRANSFORMER)
+    key = _member_key(member)
+    # Cells first: the LSOA file's presence alone must not mark the member cached
+    _write_parquet(cells, _cells_cache_path(*key))
+    _write_parquet(counts, _cache_path(*key))
+    return processed, skipped
 
-# Per-LSOA accumulators
-_LsoaAcc = Dict[str, object]  # lsoa_code → dict of counts + coord sums
-
-
-def _make_acc() -> dict:
-    return {
-        "lsoa_name": "",
-        "violent": 0,
-        "property": 0,
-        "asb": 0,
-        "other": 0,
-        "lat_sum": 0.0,
-        "lon_sum": 0.0,
-        "n_coords": 0,
-    }
-
-
-def _tier(crime_type: str) -> str:
-    t = crime_type.lower().strip()
-    if t in VIOLENT_TYPES:
-        return "violent"
-    if t in PROPERTY_TYPES:
-        return "property"
-    if t in ASB_TYPES:
-        return "asb"
-    return "other"
-
-
-def _parse_csv_bytes(raw: bytes, acc: Dict[str, dict]) -> Tuple[int, int]:
-    """Parse one force-month street CSV and accumulate into acc.
-    Returns (rows_processed, rows_skipped)."""
-    processed = 0
-    skipped = 0
-    reader = csv.DictReader(io.StringIO(raw.decode("utf-8", errors="replace")))
-    for row in reader:
-        lsoa_code = (row.get("LSOA code") or "").strip()
-        crime_type = (row.get("Crime type") or "").strip()
-        lat_s = (row.get("Latitude") or "").strip()
-        lon_s = (row.get("Longitude") or "").strip()
-
-        if not lsoa_code or not crime_type:
-            skipped += 1
-            continue
 
-        # Scotland: LSOA codes start with S (DataZones) — skip
-        if lsoa_code.startswith("S"):
-            skipped += 1
-            continue
-
-        if lsoa_code not in acc:
-            acc[lsoa_code] = _make_acc()
+def _update_cache(zip_path: Path, members: List[str], workers: int) -> Tuple[int, int]:
+    """Parse `members` across a process pool into the monthly count cache."""
+    total_rows = 0
+    total_skipped = 0
+    if not members:
+        return total_rows, total_skipped
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(str(zip_path),)
+    ) as pool:
+        for idx, (p, s) in enumerate(pool.map(_parse_member, members, chunksize=4), 1):
+            total_rows += p
+            total_skipped += s
+            if idx % 100 == 0 or idx == len(members):
+                print(f"\r  Parsed {idx:,}/{len(members):,} CSVs  |  "
+                      f"{total_rows:,} rows  ", end="", flush=True)
+    print()
+    return total_rows, total_skipped
 
-        entry = acc[lsoa_code]
-        if not entry["lsoa_name"]:
-            entry["lsoa_name"] = (row.get("LSOA name") or "").strip()
 
-        t = _tier(crime_type)
-        entry[t] += 1  # type: ignore[operator]
+def cached_months() -> List[str]:
+    """YYYY-MM months with at least one cached force file, sorted descending."""
+    if not INTERMEDIATE_CRIME_MONTHLY_DIR.exists():
+        return []
+    return sorted(
+        (d.name for d in INTERMEDIATE_CRIME_MONTHLY_DIR.iterdir() if d.is_dir() and any(d.glob("*.parquet"))),
+        reverse=True,
+    )
 
-        try:
-            lat = float(lat_s)
-            lon = float(lon_s)
-            if -90 <= lat <= 90 and -180 <= lon <= 180 and lat != 0 and lon != 0:
-                entry["lat_sum"] += lat  # type: ignore[operator]
-                entry["lon_sum"] += lon  # type: ignore[operator]
-                entry["n_coords"] += 1  # type: ignore[operator]
-        except (ValueError, TypeError):
-            pass
 
-        processed += 1
-    return processed, skipped
+def cached_window_keys(months: List[str]) -> List[Tuple[str, str]]:
+    """(month, force) keys of every cached force file in `months`."""
+    return [
+        (month, p.stem) for month in months
+        for p in sorted((INTERMEDIATE_CRIME_MONTHLY_DIR / month).glob("*.parquet"))
+        if not p.name.endswith(".cells.parquet")
+    ]
+
+
+def load_monthly_counts(keys: List[Tuple[str, str]]) -> pd.DataFrame:
+    """Cached (LSOA, crime type) counts for the given (month, force) keys, with a month column."""
+    frames = []
+    for month, force in keys:
+        path = _cache_path(month, force)
+        if path.exists():
+            frames.append(pd.read_parquet(path).assign(month=month))
+    if not frames:
+        return _empty_counts().assign(month=pd.Series(dtype="string"))
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_cell_counts(keys: List[Tuple[str, str]], grid_label: str) -> pd.DataFrame:
+    """Per-tier incident counts per cell of one grid, summed over the (month, force) keys."""
+    frames = []
+    for month, force in keys:
+        path = _cells_cache_path(month, force)
+        if path.exists():
+            frames.append(pd.read_parquet(path, filters=[("grid", "==", grid_label)]))
+    if not frames:
+        return _empty_cells().drop(columns="grid")
+    cells = pd.concat(frames, ignore_index=True)
+    return cells.groupby(["gx", "gy"], as_index=False)[list(TIERS)].sum()
+
+
+def _accumulate(counts: pd.DataFrame) -> Dict[str, dict]:
+    """Window totals per LSOA: {lsoa_code: {lsoa_name, violent, …, n_coords}}."""
+    if counts.empty:
+        return {}
+    tier = counts["crime_type"].map(TIER_BY_TYPE).fillna("other")
+    frame = pd.DataFrame({
+        "lsoa_code": counts["lsoa_code"],
+        "lsoa_name": counts["lsoa_name"],
+        **{t: counts["crimes"].where(tier == t, 0) for t in TIERS},
+        "lat_sum": counts["lat_sum"],
+        "lon_sum": counts["lon_sum"],
+        "n_coords": counts["n_coords"],
+    })
+    grouped = frame.groupby("lsoa_code", sort=False)
+    out = grouped[ACC_COLS].sum()
+    out.insert(0, "lsoa_name", grouped["lsoa_name"].first().fillna(""))
+    return out.to_dict("index")
 
 
 # ── Population data ────────────────────────────────────────────────────────────
@@ -447,44 +667,70 @@ def main() -> None:
         default=12,
         help="Number of most-recent months to include (default: 12)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for parsing street CSVs (default: CPU count)",
+    )
+    parser.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Build from the cached monthly counts only (no download, zip not read)",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Re-parse every member in the window even if its month/force is cached",
+    )
     args = parser.parse_args()
 
     ensure_pipeline_dirs()
 
-    # ── 1. Download ────────────────────────────────────────────────────────────
-    if args.no_download:
-        if not RAW_CRIME_LATEST_ZIP.exists():
-            sys.exit(f"ERROR: --no-download specified but file not found: {RAW_CRIME_LATEST_ZIP}")
-        print(f"Using cached zip: {RAW_CRIME_LATEST_ZIP}  ({RAW_CRIME_LATEST_ZIP.stat().st_size / (1024*1024):.0f} MB)")
+    if args.cache_only:
+        # ── Rolling window straight from the cache ────────────────────────────
+        chosen = cached_months()[: args.months]
+        if not chosen:
+            sys.exit(f"ERROR: --cache-only specified but no cached months in {INTERMEDIATE_CRIME_MONTHLY_DIR}")
+        print(f"Using cached months: {chosen[-1]} → {chosen[0]}  ({len(chosen)} months)")
+        window_keys = cached_window_keys(chosen)
+        total_rows = total_skipped = 0
     else:
-        _download(ARCHIVE_URL, RAW_CRIME_LATEST_ZIP)
-
-    # ── 2. Scan zip for street CSVs  ────────────────────────────────────────────
-    print("Scanning zip for street-level CSV members …")
-    with zipfile.ZipFile(RAW_CRIME_LATEST_ZIP, "r") as zf:
-        months_map = _collect_month_members(zf)
+        # ── 1. Download ────────────────────────────────────────────────────────
+        if args.no_download:
+            if not RAW_CRIME_LATEST_ZIP.exists():
+                sys.exit(f"ERROR: --no-download specified but file not found: {RAW_CRIME_LATEST_ZIP}")
+            print(f"Using cached zip: {RAW_CRIME_LATEST_ZIP}  ({RAW_CRIME_LATEST_ZIP.stat().st_size / (1024*1024):.0f} MB)")
+        else:
+            _download(ARCHIVE_URL, RAW_CRIME_LATEST_ZIP)
+
+        # ── 2. Scan zip for street CSVs  ────────────────────────────────────────
+        print("Scanning zip for street-level CSV members …")
+        with zipfile.ZipFile(RAW_CRIME_LATEST_ZIP, "r") as zf:
+            months_map = _collect_month_members(zf)
         all_months = sorted(months_map.keys(), reverse=True)
         print(f"  Available months: {all_months[0]} → {all_months[-1]}  ({len(all_months)} total)")
         chosen = _pick_latest_months(months_map, args.months)
         print(f"  Using months: {chosen[-1]} → {chosen[0]}  ({len(chosen)} months)")
-        members_to_process = [m for month in chosen for m in months_map[month]]
-        print(f"  CSV files to process: {len(members_to_process):,}")
-
-        # ── 3. Parse CSVs and accumulate per LSOA ─────────────────────────────
-        acc: Dict[str, dict] = {}
-        total_rows = 0
-        total_skipped = 0
-        for idx, member in enumerate(members_to_process, 1):
-            raw = zf.read(member)
-            p, s = _parse_csv_bytes(raw, acc)
-            total_rows += p
-            total_skipped += s
-            if idx % 100 == 0 or idx == len(members_to_process):
-                print(f"\r  Processed {idx:,}/{len(members_to_process):,} CSVs  |  "
-                      f"{total_rows:,} rows  |  {len(acc):,} LSOAs  ", end="", flush=True)
-        print()
+        window = [m for month in chosen for m in months_map[month]]
+        window_keys = [_member_key(m) for m in window]
+        members_to_process = [
+            m for m in window
+            if args.refresh_cache or not _is_cached(*_member_key(m))
+        ]
+        print(f"  CSV files in window: {len(window):,}  |  to parse: {len(members_to_process):,}  "
+              f"|  cached: {len(window) - len(members_to_process):,}")
+
+        # ── 3. Parse new members into the monthly count cache ─────────────────
+        workers = args.workers or os.cpu_count() or 1
+        if members_to_process:
+            print(f"  Parsing with {workers} workers")
+        total_rows, total_skipped = _update_cache(RAW_CRIME_LATEST_ZIP, members_to_process, workers)
+
+    # ── 3b. Window totals per LSOA from the cache ─────────────────────────────
+    acc = _accumulate(load_monthly_counts(window_keys))
 
-    print(f"\nTotal rows processed: {total_rows:,}  |  skipped: {total_skipped:,}")
+    print(f"\nRows parsed this run: {total_rows:,}  |  skipped: {total_skipped:,}")
     print(f"Unique LSOAs (England/Wales/NI): {len(acc):,}")
 
     # ── 4. Population data  ────────────────────────────────────────────────────
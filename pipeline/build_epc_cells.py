@@ -1,7 +1,8 @@
 """
 build_epc_cells.py
 
-Reads epc_enriched_all.csv.gz (built by build_epc_enriched.py), deduplicates to
+Reads the enriched EPC Parquet dataset (built by build_epc_enriched.py; a legacy
+epc_enriched_all.csv.gz is also accepted), deduplicates to
 one record per property, joins to ONSPD for grid coordinates, and produces two
 sets of per-cell JSON files for the ValueMap API:
 
@@ -15,7 +16,7 @@ Usage (from repo root, with .venv-7 active):
 
     # Explicit paths:
     python pipeline/build_epc_cells.py \
-        --epc    pipeline/data/raw/epc/epc_enriched_all.csv.gz \
+        --epc    pipeline/data/raw/epc/epc_enriched \
         --onspd  pipeline/data/raw/property/ONSPD_Online_latest_Postcode_Centroids_.csv \
         --output pipeline/data/model/epc
 
@@ -50,6 +51,12 @@ Notes
 • Deduplication: latest inspection date per UPRN (where populated); falls back
   to latest per (postcode_key, paon_key) so records without a UPRN are still
   deduplicated the same way the existing pipeline does it.
+• Incremental refresh (--incremental): the full build persists the latest
+  certificate per property and per-cell counts under data/intermediate/epc/.
+  New certificate batches from build_epc_enriched.py --incremental are upserted
+  by property key (latest INSPECTION_DATE, then LODGEMENT_DATE, then LMK_KEY),
+  and only the cells holding replaced or added properties have their counts
+  adjusted before the JSON is rewritten.
 • Minimum cell threshold: cells with fewer than MIN_PROPS properties are dropped
   to avoid noisy single-house signals.
 • England, Wales and Scotland postcodes are all included (the enriched file
@@ -65,10 +72,17 @@ import re
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent))
+import csv_ingest
+from build_epc_enriched import load_dataset as load_epc_dataset
+from build_epc_enriched import read_manifest as read_epc_manifest
 from paths import (
+    INTERMEDIATE_EPC_CELL_COUNTS_TEMPLATE,
+    INTERMEDIATE_EPC_LATEST,
+    INTERMEDIATE_EPC_STATE,
     MODEL_EPC_AGE_CELLS_TEMPLATE,
     MODEL_EPC_FUEL_CELLS_TEMPLATE,
     RAW_EPC_DIR,
@@ -78,7 +92,7 @@ from paths import (
 
 # ── Constants ─────────────────────────────────────────────────────────────────
 
-DEFAULT_EPC   = RAW_EPC_DIR / "epc_enriched_all.csv.gz"
+DEFAULT_EPC   = RAW_EPC_DIR / "epc_enriched"
 DEFAULT_ONSPD = RAW_PROPERTY_DIR / "ONSPD_Online_latest_Postcode_Centroids_.csv"
 
 GRID_SIZES: list[tuple[str, int]] = [
@@ -162,6 +176,11 @@ def normalize_postcode_key(value: str) -> str:
     return re.sub(r"\s+", "", str(value).upper()).strip()
 
 
+def postcode_keys(series: pd.Series) -> pd.Series:
+    """Vectorised normalize_postcode_key (missing values become "")."""
+    return series.astype("string").str.upper().str.replace(r"\s+", "", regex=True).fillna("")
+
+
 def normalize_paon(value: str) -> str:
     if value is None or pd.isna(value):
         return ""
@@ -188,111 +207,183 @@ def load_onspd(path: Path) -> pd.DataFrame:
     """Return DataFrame: postcode_key, east (BNG m), north (BNG m)."""
     if not path.exists():
         raise FileNotFoundError(f"ONSPD not found: {path}")
-    header = pd.read_csv(path, nrows=0)
-    cols = {c.lower().strip(): c for c in header.columns}
+    cols = {c.lower().strip(): c for c in csv_ingest.read_header(path)}
     pc_col    = cols.get("pcds") or cols.get("pcd7") or cols.get("pcd")
     east_col  = cols.get("east1m") or cols.get("eastings") or cols.get("x")
     north_col = cols.get("north1m") or cols.get("northings") or cols.get("y")
     if not all([pc_col, east_col, north_col]):
         raise RuntimeError("Cannot detect postcode/east/north in ONSPD")
 
-    frames: list[pd.DataFrame] = []
-    for chunk in pd.read_csv(
+    df = csv_ingest.read_csv(
         path,
-        usecols=[pc_col, east_col, north_col],
-        dtype={pc_col: "string", east_col: "string", north_col: "string"},
-        chunksize=500_000,
-    ):
-        chunk = chunk.rename(columns={pc_col: "postcode", east_col: "east", north_col: "north"})
-        chunk["postcode_key"] = chunk["postcode"].map(normalize_postcode_key)
-        chunk["east"]  = pd.to_numeric(chunk["east"],  errors="coerce")
-        chunk["north"] = pd.to_numeric(chunk["north"], errors="coerce")
-        chunk = chunk.dropna(subset=["postcode_key", "east", "north"])
-        chunk = chunk[chunk["postcode_key"].str.len() > 0]
-        frames.append(chunk[["postcode_key", "east", "north"]].drop_duplicates("postcode_key"))
-
-    df = pd.concat(frames, ignore_index=True)
-    return df.drop_duplicates("postcode_key")
+        {pc_col: "string", east_col: "float64", north_col: "float64"},
+        filters=[(pc_col, "notnull", None), (east_col, "notnull", None), (north_col, "notnull", None)],
+    )
+    df = df.rename(columns={east_col: "east", north_col: "north"})
+    df["postcode_key"] = postcode_keys(df[pc_col])
+    df = df[df["postcode_key"].str.len() > 0]
+    return df[["postcode_key", "east", "north"]].drop_duplicates("postcode_key").reset_index(drop=True)
 
 
 READ_COLS = [
     "POSTCODE", "ADDRESS1", "INSPECTION_DATE", "UPRN",
     "MAIN_FUEL", "MAINS_GAS_FLAG",
     "CONSTRUCTION_AGE_BAND",
+    "LMK_KEY", "LODGEMENT_DATE",
 ]
+DATE_READ_COLS = {"INSPECTION_DATE", "LODGEMENT_DATE"}
+
+# Sort order for "latest certificate wins" (ties broken by lodgement, then key)
+LATEST_ORDER = ["INSPECTION_DATE", "LODGEMENT_DATE", "LMK_KEY"]
+
+# Columns persisted in the latest-certificate-per-property table
+LATEST_COLS = [
+    "property_key", "postcode_key", "LMK_KEY", "INSPECTION_DATE", "LODGEMENT_DATE",
+    "fuel_group", "age_group",
+]
+
+
+def read_epc_rows(
+    path: Path,
+    batches: set[str] | None = None,
+    filters: list[tuple] | None = None,
+) -> pd.DataFrame:
+    """
+    Read the enriched EPC dataset (Parquet shard directory, or a legacy CSV),
+    keep only columns needed for aggregation and add the property_key used
+    for deduplication.  `batches` / `filters` only apply to the Parquet dataset.
+
+    property_key:
+      "U<uprn>"                 where UPRN is present
+      "P<postcode_key>|<paon>"  otherwise, mirroring the existing pipeline
+      (rows with neither are dropped)
+    """
+    if not path.exists():
+        raise FileNotFoundError(f"EPC enriched file not found: {path}")
+
+    if path.is_dir():
+        # Parquet shards: only the READ_COLS columns are decoded.
+        df = load_epc_dataset(path, columns=READ_COLS, batches=batches, filters=filters)
+        missing = [c for c in READ_COLS if c not in df.columns]
+    else:
+        # Probe which columns actually exist (the file may be a gzip CSV)
+        available = set(csv_ingest.read_header(path))
+        usecols = [c for c in READ_COLS if c in available]
+        missing  = [c for c in READ_COLS if c not in available]
+        df = csv_ingest.read_csv(
+            path,
+            {c: ("timestamp" if c in DATE_READ_COLS else "string") for c in usecols},
+            filters=[("POSTCODE", "notnull", None)] if "POSTCODE" in available else None,
+            null_values=csv_ingest.EPC_NULL_VALUES,
+        )
+    if missing:
+        print(f"  WARNING: columns not found in enriched file (will be blank): {missing}")
+
+    print(f"  Raw rows loaded: {len(df):,}")
+    # Ensure all expected columns exist
+    for col in READ_COLS:
+        if col not in df.columns:
+            df[col] = pd.NA
+
+    df["postcode_key"] = postcode_keys(df["POSTCODE"])
+    df["paon_key"]     = df["ADDRESS1"].map(extract_paon_from_epc_address).map(normalize_paon)
+    for col in DATE_READ_COLS:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+    df["LMK_KEY"]      = df["LMK_KEY"].astype("string")
+    uprn = df["UPRN"].astype("string").str.strip()
+
+    has_uprn = uprn.notna() & (uprn != "") & (uprn != "<NA>")
+    has_paon = df["paon_key"].str.len() > 0
+    df["property_key"] = ("P" + df["postcode_key"] + "|" + df["paon_key"]).where(has_paon)
+    df.loc[has_uprn, "property_key"] = "U" + uprn[has_uprn]
+
+    df = df[(df["postcode_key"].str.len() > 0) & df["property_key"].notna()]
+    return df[[
+        "property_key", "postcode_key", "LMK_KEY", "INSPECTION_DATE", "LODGEMENT_DATE",
+        "MAIN_FUEL", "MAINS_GAS_FLAG", "CONSTRUCTION_AGE_BAND",
+    ]]
+
+
+def latest_per_property(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the latest certificate per property_key (see LATEST_ORDER)."""
+    return (
+        df.sort_values(LATEST_ORDER, kind="mergesort")
+        .drop_duplicates(subset=["property_key"], keep="last")
+        .reset_index(drop=True)
+    )
+
 
 def load_epc_enriched(path: Path) -> pd.DataFrame:
     """
-    Stream-read the enriched EPC file, keep only columns needed for aggregation,
-    and return a deduplicated DataFrame (one row per property).
+    Return a deduplicated DataFrame (one row per property).
 
     Deduplication strategy:
       1. Where UPRN is present → keep latest INSPECTION_DATE per UPRN.
       2. Remaining rows (no UPRN) → keep latest INSPECTION_DATE per
          (postcode_key, paon_key), mirroring the existing pipeline.
     """
-    if not path.exists():
-        raise FileNotFoundError(f"EPC enriched file not found: {path}")
+    df = read_epc_rows(path)
+    if df.empty:
+        raise RuntimeError("No rows loaded from EPC enriched file")
+    deduped = latest_per_property(df)
+    print(f"  After deduplication: {len(deduped):,} unique properties")
+    return deduped
 
-    # Probe which columns actually exist (the file may be a gzip CSV)
-    header = pd.read_csv(path, nrows=0, compression="infer")
-    available = set(header.columns)
-    usecols = [c for c in READ_COLS if c in available]
-    missing  = [c for c in READ_COLS if c not in available]
-    if missing:
-        print(f"  WARNING: columns not found in enriched file (will be blank): {missing}")
 
-    frames: list[pd.DataFrame] = []
-    for chunk_num, chunk in enumerate(pd.read_csv(
-        path,
-        usecols=usecols,
-        dtype="string",
-        low_memory=False,
-        compression="infer",
-        chunksize=500_000,
-    ), 1):
-        print(f"  chunk {chunk_num:3d}  ({chunk_num * 500_000:,} rows scanned)", flush=True)
-        # Ensure all expected columns exist
-        for col in READ_COLS:
-            if col not in chunk.columns:
-                chunk[col] = pd.NA
-
-        chunk["postcode_key"]  = chunk["POSTCODE"].map(normalize_postcode_key)
-        chunk["paon_key"]      = chunk["ADDRESS1"].map(extract_paon_from_epc_address).map(normalize_paon)
-        chunk["INSPECTION_DATE"] = pd.to_datetime(chunk["INSPECTION_DATE"], errors="coerce")
-        chunk["uprn_clean"]    = chunk["UPRN"].astype("string").str.strip()
-
-        chunk = chunk[chunk["postcode_key"].str.len() > 0]
-        frames.append(chunk[[
-            "postcode_key", "paon_key", "uprn_clean",
-            "INSPECTION_DATE", "MAIN_FUEL", "MAINS_GAS_FLAG", "CONSTRUCTION_AGE_BAND",
-        ]])
-
-    if not frames:
-        raise RuntimeError("No rows loaded from EPC enriched file")
+def map_unique(series: pd.Series, fn) -> pd.Series:
+    """Apply a scalar classifier once per distinct value and broadcast back."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    # codes == -1 (missing) index the trailing fn(None) entry
+    mapped = np.array([fn(u) for u in uniques] + [fn(None)], dtype=object)
+    return pd.Series(mapped[codes], index=series.index)
 
-    print(f"  Raw rows loaded: {sum(len(f) for f in frames):,}")
-    df = pd.concat(frames, ignore_index=True)
 
-    # ── Deduplication pass 1: by UPRN ─────────────────────────────────────────
-    has_uprn = df["uprn_clean"].notna() & (df["uprn_clean"] != "") & (df["uprn_clean"] != "<NA>")
-    with_uprn    = df[has_uprn].sort_values("INSPECTION_DATE")
-    without_uprn = df[~has_uprn]
+def add_groups(df: pd.DataFrame) -> pd.DataFrame:
+    """Attach one group column per CATEGORY_LAYERS entry (None when unknown)."""
+    df = df.copy()
+    for layer in CATEGORY_LAYERS:
+        df[layer["column"]] = map_unique(df[layer["source"]], layer["classify"])
+    return df
 
-    with_uprn = with_uprn.drop_duplicates(subset=["uprn_clean"], keep="last")
 
-    # ── Deduplication pass 2: remaining rows by postcode+paon ─────────────────
-    without_uprn = without_uprn[without_uprn["paon_key"].str.len() > 0]
-    without_uprn = without_uprn.sort_values("INSPECTION_DATE").drop_duplicates(
-        subset=["postcode_key", "paon_key"], keep="last"
-    )
+# ── Aggregation helpers ────────────────────────────────────────────────────────
+#
+# Every EPC cell layer is a set of additive category counts, so they are
+# counted once per postcode and rolled up to each grid with bincounts.  A
+# grid whose size is a multiple of an already-built grid (10km, 25km from
+# 5km) is rolled up from those cell counts instead of from postcodes.
+#
+# To add a layer (e.g. EPC rating bands) append an entry to CATEGORY_LAYERS
+# and a MODEL_EPC_*_CELLS_TEMPLATE in paths.py.
+
+FUEL_GROUPS = ("gas", "electric", "oil", "lpg", "other")
+AGE_GROUPS  = ("pre1900", "1900_1950", "1950_1980", "1980_2000", "post2000")
+
+CATEGORY_LAYERS: list[dict] = [
+    {
+        "name": "fuel",
+        "source": "MAIN_FUEL",
+        "column": "fuel_group",
+        "classify": classify_fuel,
+        "groups": FUEL_GROUPS,
+        "template": MODEL_EPC_FUEL_CELLS_TEMPLATE,
+        "label": "Fuel cells",
+    },
+    {
+        "name": "age",
+        "source": "CONSTRUCTION_AGE_BAND",
+        "column": "age_group",
+        "classify": lambda band: classify_age_band(parse_age_band_start_year(band)),
+        "groups": AGE_GROUPS,
+        "template": MODEL_EPC_AGE_CELLS_TEMPLATE,
+        "label": "Age cells",
+    },
+]
 
-    deduped = pd.concat([with_uprn, without_uprn], ignore_index=True)
-    print(f"  After deduplication: {len(deduped):,} unique properties")
-    return deduped
 
+def count_columns(layer: dict) -> list[str]:
+    return [f"{layer['name']}_{g}" for g in layer["groups"]]
 
-# ── Aggregation helpers ────────────────────────────────────────────────────────
 
 def snap_to_grid(df: pd.DataFrame, onspd: pd.DataFrame, grid_m: int) -> pd.DataFrame:
     merged = df.merge(onspd, on="postcode_key", how="inner")
@@ -301,68 +392,138 @@ def snap_to_grid(df: pd.DataFrame, onspd: pd.DataFrame, grid_m: int) -> pd.DataF
     return merged
 
 
-def build_fuel_cells(snapped: pd.DataFrame) -> list[dict]:
-    df = snapped.copy()
-    df["fuel_group"] = df["MAIN_FUEL"].map(classify_fuel)
-
-    # Only keep rows where we have a meaningful fuel reading
-    df = df[df["fuel_group"].notna()]
-
-    agg = df.groupby(["gx", "gy", "fuel_group"]).size().unstack(fill_value=0)
-    # Ensure all columns exist
-    for col in ("gas", "electric", "oil", "lpg", "other"):
-        if col not in agg.columns:
-            agg[col] = 0
-
-    agg["n"] = agg.sum(axis=1)
-    agg = agg[agg["n"] >= MIN_PROPS]
-
-    rows: list[dict] = []
-    for (gx, gy), r in agg.iterrows():
-        n = int(r["n"])
-        rows.append({
-            "gx": int(gx),
-            "gy": int(gy),
-            "n":  n,
-            "pct_gas":      round(float(r.get("gas",      0)) / n * 100, 1),
-            "pct_electric": round(float(r.get("electric", 0)) / n * 100, 1),
-            "pct_oil":      round(float(r.get("oil",      0)) / n * 100, 1),
-            "pct_lpg":      round(float(r.get("lpg",      0)) / n * 100, 1),
-            "pct_other":    round(float(r.get("other",    0)) / n * 100, 1),
-        })
-    return rows
-
-
-def build_age_cells(snapped: pd.DataFrame) -> list[dict]:
-    df = snapped.copy()
-    df["start_year"] = df["CONSTRUCTION_AGE_BAND"].map(parse_age_band_start_year)
-    df["age_group"]  = df["start_year"].map(classify_age_band)
-
-    # Drop rows with unknown age band
-    df = df[df["age_group"].notna()]
-
-    agg = df.groupby(["gx", "gy", "age_group"]).size().unstack(fill_value=0)
-    for col in ("pre1900", "1900_1950", "1950_1980", "1980_2000", "post2000"):
-        if col not in agg.columns:
-            agg[col] = 0
-
-    agg["n"] = agg.sum(axis=1)
-    agg = agg[agg["n"] >= MIN_PROPS]
-
-    rows: list[dict] = []
-    for (gx, gy), r in agg.iterrows():
-        n = int(r["n"])
-        rows.append({
-            "gx": int(gx),
-            "gy": int(gy),
-            "n":  n,
-            "pct_pre1900":   round(float(r.get("pre1900",   0)) / n * 100, 1),
-            "pct_1900_1950": round(float(r.get("1900_1950", 0)) / n * 100, 1),
-            "pct_1950_1980": round(float(r.get("1950_1980", 0)) / n * 100, 1),
-            "pct_1980_2000": round(float(r.get("1980_2000", 0)) / n * 100, 1),
-            "pct_post2000":  round(float(r.get("post2000",  0)) / n * 100, 1),
-        })
-    return rows
+def postcode_counts(props: pd.DataFrame, onspd: pd.DataFrame) -> pd.DataFrame:
+    """
+    Category counts per postcode with its coordinates: postcode_key, east,
+    north, <layer>_<group>...  Postcodes without coordinates are dropped.
+
+    Rows may carry a signed weight column "w" (incremental mode: -1 for a
+    replaced certificate, +1 for its successor); otherwise each row counts 1.
+    """
+    pc_idx, postcodes = pd.factorize(props["postcode_key"])
+    n_pc = len(postcodes)
+    weights = props["w"].to_numpy(dtype="float64") if "w" in props.columns else None
+
+    out = pd.DataFrame({"postcode_key": postcodes})
+    for layer in CATEGORY_LAYERS:
+        k = len(layer["groups"])
+        codes = pd.Categorical(props[layer["column"]], categories=list(layer["groups"])).codes
+        known = codes >= 0
+        flat = np.bincount(
+            pc_idx[known] * k + codes[known],
+            weights=None if weights is None else weights[known],
+            minlength=n_pc * k,
+        ).reshape(n_pc, k)
+        for j, col in enumerate(count_columns(layer)):
+            out[col] = np.rint(flat[:, j]).astype("int64")
+
+    out = out.merge(onspd, on="postcode_key", how="inner")
+    return out
+
+
+def rollup(
+    points: pd.DataFrame,
+    x_col: str,
+    y_col: str,
+    grid_m: int,
+    value_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Sum the count columns of `points` (postcodes or finer cells) into grid_m
+    cells.  Returns a frame indexed by (gx, gy), sorted.  value_cols defaults
+    to the CATEGORY_LAYERS count columns.
+    """
+    if value_cols is None:
+        value_cols = [c for layer in CATEGORY_LAYERS for c in count_columns(layer)]
+    gx = (points[x_col].to_numpy() // grid_m * grid_m).astype("int64")
+    gy = (points[y_col].to_numpy() // grid_m * grid_m).astype("int64")
+    keys, inv = np.unique(np.stack([gx, gy], axis=1), axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+
+    data = {
+        col: np.rint(np.bincount(inv, weights=points[col].to_numpy(dtype="float64"), minlength=len(keys))).astype("int64")
+        for col in value_cols
+    }
+    index = pd.MultiIndex.from_arrays([keys[:, 0], keys[:, 1]], names=["gx", "gy"])
+    return pd.DataFrame(data, index=index)
+
+
+def grid_counts(pc_counts: pd.DataFrame, value_cols: list[str] | None = None) -> dict[str, pd.DataFrame]:
+    """Counts per grid label, rolling nested grids up from finer cell counts."""
+    out: dict[str, pd.DataFrame] = {}
+    built: list[tuple[int, str]] = []
+    for grid_label, grid_m in GRID_SIZES:
+        finer = [(m, lbl) for m, lbl in built if grid_m % m == 0]
+        if finer:
+            src_m, src_label = max(finer)
+            out[grid_label] = rollup(out[src_label].reset_index(), "gx", "gy", grid_m, value_cols)
+        else:
+            out[grid_label] = rollup(pc_counts, "east", "north", grid_m, value_cols)
+        built.append((grid_m, grid_label))
+    return out
+
+
+def build_layer_rows(counts: pd.DataFrame, layer: dict) -> list[dict]:
+    """Vectorised {gx, gy, n, pct_<group>...} rows for cells with n ≥ MIN_PROPS."""
+    cols = count_columns(layer)
+    values = counts[cols].to_numpy(dtype="float64")
+    n = values.sum(axis=1)
+    keep = n >= MIN_PROPS
+    values, n = values[keep], n[keep]
+    idx = counts.index[keep]
+
+    frame = pd.DataFrame({
+        "gx": idx.get_level_values("gx").astype("int64"),
+        "gy": idx.get_level_values("gy").astype("int64"),
+        "n":  n.astype("int64"),
+    })
+    pct = np.round(values / n[:, None] * 100, 1)
+    for j, group in enumerate(layer["groups"]):
+        frame[f"pct_{group}"] = pct[:, j]
+    return frame.to_dict("records")
+
+
+def build_fuel_rows(counts: pd.DataFrame) -> list[dict]:
+    return build_layer_rows(counts, CATEGORY_LAYERS[0])
+
+
+def build_age_rows(counts: pd.DataFrame) -> list[dict]:
+    return build_layer_rows(counts, CATEGORY_LAYERS[1])
+
+
+def write_cell_outputs(counts: pd.DataFrame, grid_label: str, output_dir: Path) -> None:
+    for layer in CATEGORY_LAYERS:
+        rows = build_layer_rows(counts, layer)
+        path = output_dir / layer["template"].name.replace("{grid}", grid_label)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        print(f"  {layer['label']:<11}: {len(rows):>6,}  →  {path.name}  ({path.stat().st_size // 1024:,} KB)")
+
+
+# ── Incremental state ──────────────────────────────────────────────────────────
+
+def counts_path(grid_label: str) -> Path:
+    return Path(str(INTERMEDIATE_EPC_CELL_COUNTS_TEMPLATE).replace("{grid}", grid_label))
+
+
+def dataset_batches(epc_path: Path) -> list[str]:
+    manifest = read_epc_manifest(epc_path) if epc_path.is_dir() else None
+    if manifest is None:
+        return []
+    return sorted({s.get("batch", "full") for s in manifest["shards"]})
+
+
+def save_state(latest: pd.DataFrame, epc_path: Path, applied_batches: list[str]) -> None:
+    watermark = latest["LODGEMENT_DATE"].max()
+    state = {
+        "epc_path": str(epc_path),
+        "lodgement_watermark": watermark.strftime("%Y-%m-%d") if pd.notna(watermark) else None,
+        "applied_batches": sorted(applied_batches),
+        "properties": int(len(latest)),
+        "updated_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
+    INTERMEDIATE_EPC_STATE.parent.mkdir(parents=True, exist_ok=True)
+    INTERMEDIATE_EPC_STATE.write_text(json.dumps(state, indent=2), encoding="utf-8")
 
 
 # ── Main ───────────────────────────────────────────────────────────────────────
@@ -376,45 +537,102 @@ def main(epc_path: Path, onspd_path: Path, output_dir: Path) -> None:
     print(f"  ONSPD postcodes: {len(onspd):,}")
 
     print(f"\nLoading EPC enriched: {epc_path}")
-    epc = load_epc_enriched(epc_path)
+    latest = add_groups(load_epc_enriched(epc_path))[LATEST_COLS]
 
-    # Join to ONSPD for coordinates — done once, then snapped per grid size
-    epc_geo = epc.merge(onspd, on="postcode_key", how="inner")
-    print(f"  Rows with coordinates: {len(epc_geo):,}")
+    # Count once per postcode, then roll up to every grid size
+    pc_counts = postcode_counts(latest, onspd)
+    print(f"  Postcodes with coordinates: {len(pc_counts):,}")
 
-    for grid_label, grid_m in GRID_SIZES:
+    for grid_label, counts in grid_counts(pc_counts).items():
         print(f"\n── {grid_label} ──────────────────────────────────────────────")
+        counts.reset_index().to_parquet(counts_path(grid_label), index=False)
+        write_cell_outputs(counts, grid_label, output_dir)
 
-        snapped = epc_geo.copy()
-        snapped["gx"] = ((snapped["east"]  // grid_m) * grid_m).astype("int64")
-        snapped["gy"] = ((snapped["north"] // grid_m) * grid_m).astype("int64")
+    latest.to_parquet(INTERMEDIATE_EPC_LATEST, index=False)
+    save_state(latest, epc_path, dataset_batches(epc_path))
+    print("\nDone.")
 
-        # ── Fuel cells ────────────────────────────────────────────────────────
-        fuel_rows = build_fuel_cells(snapped)
-        fuel_path = output_dir / MODEL_EPC_FUEL_CELLS_TEMPLATE.name.replace("{grid}", grid_label)
-        with gzip.open(fuel_path, "wt", encoding="utf-8") as f:
-            json.dump(fuel_rows, f, separators=(",", ":"))
-        print(f"  Fuel cells : {len(fuel_rows):>6,}  →  {fuel_path.name}  ({fuel_path.stat().st_size // 1024:,} KB)")
 
-        # ── Age cells ─────────────────────────────────────────────────────────
-        age_rows = build_age_cells(snapped)
-        age_path = output_dir / MODEL_EPC_AGE_CELLS_TEMPLATE.name.replace("{grid}", grid_label)
-        with gzip.open(age_path, "wt", encoding="utf-8") as f:
-            json.dump(age_rows, f, separators=(",", ":"))
-        print(f"  Age cells  : {len(age_rows):>6,}  →  {age_path.name}  ({age_path.stat().st_size // 1024:,} KB)")
+def main_incremental(epc_path: Path, onspd_path: Path, output_dir: Path) -> None:
+    """
+    Fold certificates from batches not yet applied into the persisted
+    latest-per-property table and adjust only the cells they touch.
+    """
+    ensure_pipeline_dirs()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if not INTERMEDIATE_EPC_STATE.exists() or not INTERMEDIATE_EPC_LATEST.exists():
+        sys.exit("ERROR: no incremental state found — run a full build_epc_cells.py first")
+    state = json.loads(INTERMEDIATE_EPC_STATE.read_text(encoding="utf-8"))
+    applied = set(state.get("applied_batches", []))
+    pending = set(dataset_batches(epc_path)) - applied
+    if not pending:
+        print("No new EPC batches to apply.")
+        return
+
+    watermark = state.get("lodgement_watermark")
+    # Date-only watermark: re-read its whole day; the LMK_KEY upsert is idempotent
+    filters = [("LODGEMENT_DATE", ">=", pd.Timestamp(watermark))] if watermark else None
+    print(f"Applying batches {sorted(pending)} (lodged on or after {watermark})")
+    new = read_epc_rows(epc_path, batches=pending, filters=filters)
+
+    latest = pd.read_parquet(INTERMEDIATE_EPC_LATEST)
+    if new.empty:
+        print("  No new certificates.")
+        save_state(latest, epc_path, sorted(applied | pending))
+        return
+
+    print(f"Loading ONSPD: {onspd_path}")
+    onspd = load_onspd(onspd_path)
+    new = add_groups(latest_per_property(new))[LATEST_COLS]
+
+    # ── Keyed upsert: a new certificate replaces the stored one only if it
+    #    sorts later under LATEST_ORDER ──────────────────────────────────────────
+    old = latest[latest["property_key"].isin(new["property_key"])]
+    contest = pd.concat([old.assign(_new=False), new.assign(_new=True)], ignore_index=True)
+    winners = latest_per_property(contest)
+    winners = winners[winners["_new"]].drop(columns="_new")
+    replaced = old[old["property_key"].isin(winners["property_key"])]
+    print(f"  New certificates: {len(new):,}  → updated properties: {len(winners):,} "
+          f"({len(replaced):,} replaced, {len(winners) - len(replaced):,} added)")
+
+    latest = pd.concat(
+        [latest[~latest["property_key"].isin(winners["property_key"])], winners],
+        ignore_index=True,
+    )
 
+    delta = pd.concat([replaced.assign(w=-1), winners.assign(w=1)], ignore_index=True)
+    changes = grid_counts(postcode_counts(delta, onspd))
+
+    for grid_label, change in changes.items():
+        print(f"\n── {grid_label} ──────────────────────────────────────────────")
+        counts = pd.read_parquet(counts_path(grid_label)).set_index(["gx", "gy"])
+        change = change[(change != 0).any(axis=1)]
+        counts = counts.add(change, fill_value=0).astype("int64")
+        counts = counts[(counts != 0).any(axis=1)].sort_index()
+        print(f"  Cells changed: {len(change):,}")
+        counts.reset_index().to_parquet(counts_path(grid_label), index=False)
+        write_cell_outputs(counts, grid_label, output_dir)
+
+    latest.to_parquet(INTERMEDIATE_EPC_LATEST, index=False)
+    save_state(latest, epc_path, sorted(applied | pending))
     print("\nDone.")
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Build per-cell EPC fuel & age aggregates")
-    parser.add_argument("--epc",    default=str(DEFAULT_EPC),   help="Path to epc_enriched_all.csv.gz")
+    parser.add_argument("--epc",    default=str(DEFAULT_EPC),   help="EPC dataset dir (or legacy epc_enriched_all.csv.gz)")
     parser.add_argument("--onspd",  default=str(DEFAULT_ONSPD), help="Path to ONSPD CSV")
     parser.add_argument("--output", default=str(MODEL_EPC_FUEL_CELLS_TEMPLATE.parent),
                         help="Output directory (default: pipeline/data/model/epc)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Apply only new EPC batches to the persisted latest-per-property table")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    main(Path(args.epc), Path(args.onspd), Path(args.output))
+    if args.incremental:
+        main_incremental(Path(args.epc), Path(args.onspd), Path(args.output))
+    else:
+        main(Path(args.epc), Path(args.onspd), Path(args.output))
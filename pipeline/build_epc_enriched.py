@@ -2,10 +2,18 @@
 build_epc_enriched.py
 
 Reads all 347 domestic EPC LA certificate files from the MHCLG bulk download ZIP
-and produces a single enriched, gzip-compressed CSV containing the fields needed
+and produces an enriched, typed Parquet dataset containing the fields needed
 for the ValueMap pipeline (existing fields + fuel type, EPC rating, property
 characteristics, retrofit signals and renewables).
 
+Each LA member is extracted by a separate worker process (one read per member)
+into its own Parquet shard; _manifest.json lists the shards, their row counts
+and the column types so readers can load only the columns they need.
+
+With --incremental only certificates lodged after the manifest's
+max_lodgement_date are kept; they are written as a new batch of shards next to
+the existing ones and build_epc_cells.py --incremental folds them in.
+
 No deduplication is done here — all historical records are kept so that the
 downstream model step can take the latest inspection per property.
 
@@ -14,11 +22,14 @@ Usage (from repo root, with .venv-7 active):
 
     # Override defaults:
     python pipeline/build_epc_enriched.py \
-        --input  pipeline/data/raw/epc/all-domestic-certificates.zip \
-        --output pipeline/data/raw/epc/epc_enriched_all.csv.gz
+        --input   pipeline/data/raw/epc/all-domestic-certificates.zip \
+        --output  pipeline/data/raw/epc/epc_enriched \
+        --workers 8
 
 Output:
-    pipeline/data/raw/epc/epc_enriched_all.csv.gz   (~500 MB, ~17 M rows, 31 cols)
+    pipeline/data/raw/epc/epc_enriched/
+        _manifest.json
+        000_<la>.parquet … 346_<la>.parquet      (~17 M rows, 31 cols)
 
 Columns saved
 ─────────────────────────────────────────────────────────────────────────────
@@ -69,18 +80,21 @@ Renewables (NEW):
 
 Deduplication key (NEW):
   UPRN                Unique Property Reference Number (blank for older records)
+
+Incremental refresh keys (NEW):
+  LMK_KEY             Certificate key — tie-break when two certificates share dates
+  LODGEMENT_DATE      Date the certificate was lodged — incremental watermark
 ─────────────────────────────────────────────────────────────────────────────
 
 COLUMNS REVIEWED BUT EXCLUDED (and why)
 ─────────────────────────────────────────────────────────────────────────────
-LMK_KEY                       Internal certificate key — UPRN preferred
 ADDRESS2 / ADDRESS3           Not needed for PAON matching
 BUILDING_REFERENCE_NUMBER     Internal
 LOCAL_AUTHORITY / _LABEL      Derivable from postcode
 CONSTITUENCY / _LABEL         Derivable from postcode
 COUNTY                        Derivable from postcode
 POSTTOWN                      Derivable from postcode
-LODGEMENT_DATE / _DATETIME    Using INSPECTION_DATE instead
+LODGEMENT_DATETIME            LODGEMENT_DATE is enough for the watermark
 ENVIRONMENT_IMPACT_CURRENT/POTENTIAL  Less meaningful for lay users
 ENERGY_CONSUMPTION_CURRENT/POTENTIAL  SAP score + CO2 already capture this
 LIGHTING_COST_CURRENT/POTENTIAL       Minor cost component
@@ -112,17 +126,20 @@ REPORT_TYPE                   Not needed
 RECOMMENDATIONS.CSV (not processed here)
   Each certificate can have 0–n improvement recommendations with
   IMPROVEMENT_SUMMARY_TEXT, IMPROVEMENT_DESCR_TEXT, INDICATIVE_COST.
-  Could power a future "retrofit potential" overlay but requires a
-  separate aggregation pass (join on LMK_KEY). Left for a later stage.
+  Aggregated separately by build_epc_retrofit_cells.py, which streams each
+  LA's recommendations.csv and joins on LMK_KEY.
 ─────────────────────────────────────────────────────────────────────────────
 """
 
 from __future__ import annotations
 
 import argparse
-import gzip
+import json
+import os
+import re
 import sys
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import pandas as pd
@@ -134,7 +151,9 @@ PIPELINE_DIR = Path(__file__).parent
 RAW_EPC_DIR = PIPELINE_DIR / "data" / "raw" / "epc"
 
 DEFAULT_INPUT = RAW_EPC_DIR / "all-domestic-certificates.zip"
-DEFAULT_OUTPUT = RAW_EPC_DIR / "epc_enriched_all.csv.gz"
+DEFAULT_OUTPUT = RAW_EPC_DIR / "epc_enriched"
+MANIFEST_NAME = "_manifest.json"
+FULL_BATCH = "full"
 
 # ---------------------------------------------------------------------------
 # Column selection
@@ -180,8 +199,34 @@ KEEP_COLS: list[str] = [
     "WIND_TURBINE_COUNT",
     # ── Deduplication key ─────────────────────────────────────────────────────
     "UPRN",
+    # ── Incremental refresh keys ──────────────────────────────────────────────
+    "LMK_KEY",
+    "LODGEMENT_DATE",
+]
+
+# Output column order: MAIN_FUEL_RAW sits right after the normalised MAIN_FUEL.
+OUTPUT_COLS: list[str] = [
+    c for col in KEEP_COLS for c in ((col, "MAIN_FUEL_RAW") if col == "MAIN_FUEL" else (col,))
 ]
 
+# Typed columns in the Parquet shards (everything else is a string).
+NUMERIC_COLS: set[str] = {
+    "TOTAL_FLOOR_AREA",
+    "NUMBER_HABITABLE_ROOMS",
+    "FLOOR_HEIGHT",
+    "CURRENT_ENERGY_EFFICIENCY",
+    "POTENTIAL_ENERGY_EFFICIENCY",
+    "CO2_EMISSIONS_CURRENT",
+    "CO2_EMISS_CURR_PER_FLOOR_AREA",
+    "HEATING_COST_CURRENT",
+    "NUMBER_HEATED_ROOMS",
+    "MULTI_GLAZE_PROPORTION",
+    "LOW_ENERGY_LIGHTING",
+    "PHOTO_SUPPLY",
+    "WIND_TURBINE_COUNT",
+}
+DATE_COLS: set[str] = {"INSPECTION_DATE", "LODGEMENT_DATE"}
+
 # ---------------------------------------------------------------------------
 # Fuel normalisation map
 # The raw MAIN_FUEL field contains legacy "backwards compatibility" variants.
@@ -237,83 +282,198 @@ def normalise_fuel(raw: str | None) -> str:
     return FUEL_MAP.get(key, "other")
 
 
+def normalise_fuel_series(raw: pd.Series) -> pd.Series:
+    """Vectorised normalise_fuel."""
+    key = raw.astype("string").str.strip().str.lower()
+    out = key.map(FUEL_MAP).astype("string").fillna("other")
+    return out.mask(raw.isna(), "unknown")
+
+
+def column_types() -> dict[str, str]:
+    """Column → dtype name as written to the shards (recorded in the manifest)."""
+    return {
+        c: ("float64" if c in NUMERIC_COLS else "datetime64[ns]" if c in DATE_COLS else "string")
+        for c in OUTPUT_COLS
+    }
+
+
+def shard_name(idx: int, la_name: str, batch: str = FULL_BATCH) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", la_name).strip("_").lower() or "la"
+    prefix = "" if batch == FULL_BATCH else f"{batch}_"
+    return f"{prefix}{idx:03d}_{slug}.parquet"
+
+
+def read_manifest(dataset_dir: Path) -> dict | None:
+    path = dataset_dir / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
 # ---------------------------------------------------------------------------
 # Processing
 # ---------------------------------------------------------------------------
 
-def process_zip(input_path: Path, output_path: Path) -> None:
+def extract_member(input_path: str, entry: str, shard_path: str, since: str | None = None) -> int:
+    """Worker: read one LA certificates.csv once and write it as a typed shard.
+
+    With `since`, only certificates lodged on or after that date are kept and no
+    shard is written when none are left.
+    """
+    with zipfile.ZipFile(input_path, "r") as outer_zip, outer_zip.open(entry) as csv_fh:
+        df = pd.read_csv(
+            csv_fh,
+            usecols=lambda c: c in KEEP_COLS,
+            dtype="string",
+            low_memory=False,
+        )
+
+    # Add any KEEP_COLS missing from this LA as blank columns
+    for col in KEEP_COLS:
+        if col not in df.columns:
+            df[col] = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    df["MAIN_FUEL_RAW"] = df["MAIN_FUEL"]
+    df["MAIN_FUEL"] = normalise_fuel_series(df["MAIN_FUEL_RAW"])
+    for col in NUMERIC_COLS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in DATE_COLS:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
+
+    if since is not None:
+        # The watermark is a date: re-take its whole day (the upsert on LMK_KEY is idempotent)
+        df = df[df["LODGEMENT_DATE"] >= pd.Timestamp(since)]
+        if df.empty:
+            return 0
+
+    df[OUTPUT_COLS].to_parquet(shard_path, index=False)
+    return len(df)
+
+
+def process_zip(
+    input_path: Path,
+    output_dir: Path,
+    workers: int | None = None,
+    incremental: bool = False,
+) -> None:
     print(f"Input : {input_path}")
-    print(f"Output: {output_path}")
+    print(f"Output: {output_dir}")
 
     if not input_path.exists():
         sys.exit(f"ERROR: Input file not found: {input_path}")
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    previous = read_manifest(output_dir) if incremental else None
+    if incremental and (previous is None or not previous.get("max_lodgement_date")):
+        sys.exit(f"ERROR: --incremental needs an existing dataset with a lodgement watermark in {output_dir}")
+
+    if previous is None:
+        batch = FULL_BATCH
+        since = None
+        for stale in output_dir.glob("*.parquet"):
+            stale.unlink()
+    else:
+        batch = "delta" + pd.Timestamp.now().strftime("%Y%m%d%H%M%S")
+        since = previous["max_lodgement_date"]
+        print(f"Incremental batch {batch}: certificates lodged on or after {since}")
 
     with zipfile.ZipFile(input_path, "r") as outer_zip:
         cert_entries = sorted(
             [n for n in outer_zip.namelist() if n.endswith("certificates.csv")]
         )
-        total_las = len(cert_entries)
-        print(f"Found {total_las} LA certificate files\n")
-
-        # Open output once and stream-write
-        with gzip.open(output_path, "wt", encoding="utf-8", newline="") as out_fh:
-            header_written = False
-            grand_total = 0
-
-            for idx, entry in enumerate(cert_entries, 1):
-                la_name = entry.split("/")[0]
-                try:
-                    with outer_zip.open(entry) as csv_fh:
-                        # Read header to know which KEEP_COLS are present
-                        header_row = pd.read_csv(csv_fh, nrows=0, dtype="string")
-                        present_cols = [c for c in KEEP_COLS if c in header_row.columns]
-
-                    # Re-open to read data (can't seek in ZipExtFile)
-                    with outer_zip.open(entry) as csv_fh:
-                        chunks = pd.read_csv(
-                            csv_fh,
-                            usecols=present_cols,
-                            dtype="string",
-                            low_memory=False,
-                            chunksize=100_000,
-                        )
-                        la_rows = 0
-                        for chunk in chunks:
-                            # Add any KEEP_COLS missing from this LA as blank columns
-                            for col in KEEP_COLS:
-                                if col not in chunk.columns:
-                                    chunk[col] = pd.NA
-
-                            # Reorder to canonical order
-                            chunk = chunk[KEEP_COLS].copy()
-
-                            # Fuel normalisation
-                            chunk.insert(
-                                chunk.columns.get_loc("MAIN_FUEL") + 1,
-                                "MAIN_FUEL_RAW",
-                                chunk["MAIN_FUEL"],
-                            )
-                            chunk["MAIN_FUEL"] = chunk["MAIN_FUEL_RAW"].map(normalise_fuel)
-
-                            chunk.to_csv(
-                                out_fh,
-                                index=False,
-                                header=not header_written,
-                            )
-                            header_written = True
-                            la_rows += len(chunk)
-
-                    grand_total += la_rows
-                    print(f"  [{idx:3d}/{total_las}] {la_name:<55} {la_rows:>8,} rows")
-
-                except Exception as exc:  # noqa: BLE001
-                    print(f"  [{idx:3d}/{total_las}] WARNING: skipped {la_name}: {exc}")
-
-    print(f"\nDone. Total rows written: {grand_total:,}")
-    size_mb = output_path.stat().st_size / 1_048_576
-    print(f"Output file size: {size_mb:.1f} MB  ({output_path})")
+    total_las = len(cert_entries)
+    workers = workers or os.cpu_count() or 1
+    print(f"Found {total_las} LA certificate files, extracting with {workers} workers\n")
+
+    shards: list[dict] = []
+    failed: list[str] = []
+    grand_total = 0
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for idx, entry in enumerate(cert_entries):
+            la_name = entry.split("/")[0]
+            name = shard_name(idx, la_name, batch)
+            fut = pool.submit(extract_member, str(input_path), entry, str(output_dir / name), since)
+            futures[fut] = (la_name, name)
+
+        for fut in as_completed(futures):
+            la_name, name = futures[fut]
+            done += 1
+            try:
+                la_rows = fut.result()
+            except Exception as exc:  # noqa: BLE001
+                print(f"  [{done:3d}/{total_las}] WARNING: skipped {la_name}: {exc}")
+                failed.append(la_name)
+                (output_dir / name).unlink(missing_ok=True)
+                continue
+            if la_rows:
+                shards.append({"la": la_name, "file": name, "rows": la_rows, "batch": batch})
+            grand_total += la_rows
+            print(f"  [{done:3d}/{total_las}] {la_name:<55} {la_rows:>8,} rows")
+
+    if incremental and failed:
+        # Advancing the watermark past a missed LA would drop its certificates
+        # for good, so discard the whole batch and leave the manifest untouched.
+        for shard in shards:
+            (output_dir / shard["file"]).unlink(missing_ok=True)
+        sys.exit(f"ERROR: {len(failed)} LA file(s) failed ({', '.join(failed)}); "
+                 f"incremental batch discarded, watermark left at {since}")
+
+    shards.sort(key=lambda s: s["file"])
+    max_lodged = previous["max_lodgement_date"] if previous else None
+    for shard in shards:
+        lodged = pd.read_parquet(output_dir / shard["file"], columns=["LODGEMENT_DATE"])["LODGEMENT_DATE"].max()
+        if pd.notna(lodged):
+            lodged_str = lodged.strftime("%Y-%m-%d")
+            max_lodged = lodged_str if max_lodged is None else max(max_lodged, lodged_str)
+
+    stat = input_path.stat()
+    manifest = {
+        "source": input_path.name,
+        "source_size": stat.st_size,
+        "source_mtime": int(stat.st_mtime),
+        "columns": column_types(),
+        "max_lodgement_date": max_lodged,
+        "total_rows": (previous["total_rows"] if previous else 0) + grand_total,
+        "shards": (previous["shards"] if previous else []) + shards,
+    }
+    with open(output_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"\nDone. Rows written: {grand_total:,} in {len(shards)} shards (batch {batch})")
+    print(f"Lodgement watermark: {max_lodged}")
+    size_mb = sum((output_dir / s["file"]).stat().st_size for s in shards) / 1_048_576
+    print(f"Batch size: {size_mb:.1f} MB  ({output_dir})")
+
+
+def load_dataset(
+    dataset_dir: Path,
+    columns: list[str] | None = None,
+    batches: set[str] | None = None,
+    filters: list[tuple] | None = None,
+) -> pd.DataFrame:
+    """Read the shards listed in the manifest, loading only `columns`.
+
+    batches: restrict to these batch names (e.g. the deltas not yet applied).
+    filters: pyarrow row filters, e.g. [("LODGEMENT_DATE", ">", ts)].
+    """
+    manifest = read_manifest(dataset_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"EPC dataset manifest not found: {dataset_dir / MANIFEST_NAME}")
+
+    wanted = None
+    if columns is not None:
+        wanted = [c for c in columns if c in manifest["columns"]]
+    frames = [
+        pd.read_parquet(dataset_dir / shard["file"], columns=wanted, filters=filters)
+        for shard in manifest["shards"]
+        if batches is None or shard.get("batch", FULL_BATCH) in batches
+    ]
+    if not frames:
+        return pd.DataFrame(columns=wanted or list(manifest["columns"]))
+    return pd.concat(frames, ignore_index=True)
 
 
 # ---------------------------------------------------------------------------
@@ -332,14 +492,25 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output",
         default=str(DEFAULT_OUTPUT),
-        help=f"Output .csv.gz path (default: {DEFAULT_OUTPUT})",
+        help=f"Output Parquet dataset directory (default: {DEFAULT_OUTPUT})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes, one LA member each (default: CPU count)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only extract certificates lodged after the existing dataset's watermark",
     )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
-    process_zip(Path(args.input), Path(args.output))
+    process_zip(Path(args.input), Path(args.output), workers=args.workers, incremental=args.incremental)
 
 
 if __name__ == "__main__":
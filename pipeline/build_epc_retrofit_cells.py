@@ -0,0 +1,245 @@
+"""
+build_epc_retrofit_cells.py
+
+Streams the per-LA recommendations.csv members of all-domestic-certificates.zip,
+joins each recommendation to the latest certificate per property (the table
+persisted by build_epc_cells.py) on LMK_KEY, and produces per-cell retrofit
+potential layers for the ValueMap API:
+
+  epc_retrofit_cells_{grid}.json.gz  – share of homes recommended each measure
+
+Output location: pipeline/data/model/epc/
+
+Usage (from repo root, with .venv-7 active; run build_epc_cells.py first):
+    python pipeline/build_epc_retrofit_cells.py
+
+    # Explicit paths:
+    python pipeline/build_epc_retrofit_cells.py \
+        --input  pipeline/data/raw/epc/all-domestic-certificates.zip \
+        --latest pipeline/data/intermediate/epc/epc_latest_by_property.parquet \
+        --onspd  pipeline/data/raw/property/ONSPD_Online_latest_Postcode_Centroids_.csv \
+        --output pipeline/data/model/epc
+
+Output JSON schema
+──────────────────
+epc_retrofit_cells_{grid}.json.gz  — array of:
+  {
+    "gx": <int>,          BNG easting  of SW corner of cell
+    "gy": <int>,          BNG northing of SW corner of cell
+    "n":  <int>,          number of properties in the cell with a current EPC
+    "pct_loft":        <float>,   % recommended loft insulation
+    "pct_cavity_wall": <float>,   % recommended cavity wall insulation
+    "pct_solid_wall":  <float>,   % recommended internal / external wall insulation
+    "pct_floor":       <float>,   % recommended floor insulation
+    "pct_glazing":     <float>,   % recommended double / secondary glazing
+    "pct_heat_pump":   <float>,   % recommended an air / ground source heat pump
+    "pct_solar_water": <float>,   % recommended solar water heating
+    "pct_solar_pv":    <float>    % recommended solar photovoltaic panels
+  }
+
+Notes
+─────
+• Only recommendations on the latest certificate per property count, so a
+  measure recommended on an older certificate and since carried out drops out.
+• Memory is bounded by the latest-certificate table: recommendations are read
+  one LA member at a time in chunks and folded into a per-property bitmask of
+  recommended measures; the recommendations table itself is never held whole.
+• A home is counted once per measure however many recommendations of that
+  type its certificate carries, so percentages do not sum to 100.
+• Minimum cell threshold: cells with fewer than MIN_PROPS properties are dropped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+from build_epc_cells import DEFAULT_ONSPD, MIN_PROPS, grid_counts, load_onspd, map_unique
+from build_epc_enriched import DEFAULT_INPUT
+from paths import (
+    INTERMEDIATE_EPC_LATEST,
+    MODEL_EPC_RETROFIT_CELLS_TEMPLATE,
+    ensure_pipeline_dirs,
+)
+
+# ── Constants ─────────────────────────────────────────────────────────────────
+
+RECS_COLS = ["LMK_KEY", "IMPROVEMENT_SUMMARY_TEXT", "IMPROVEMENT_ID_TEXT"]
+RECS_CHUNKSIZE = 500_000
+
+# ── Measure classification ─────────────────────────────────────────────────────
+# IMPROVEMENT_SUMMARY_TEXT examples from the raw data:
+#   "Increase loft insulation to 270 mm"
+#   "Cavity wall insulation"
+#   "Internal or external wall insulation"
+#   "Solar photovoltaic panels, 2.5 kWp"
+#   "Solar water heating"
+# Older certificates leave the summary blank and only fill IMPROVEMENT_ID_TEXT.
+# First match wins, so more specific patterns come first.
+
+MEASURES: list[tuple[str, re.Pattern]] = [
+    ("loft",        re.compile(r"\bloft\b|roof (room )?insulation", re.IGNORECASE)),
+    ("cavity_wall", re.compile(r"cavity wall", re.IGNORECASE)),
+    ("solid_wall",  re.compile(r"solid wall|(internal|external) wall insulation", re.IGNORECASE)),
+    ("floor",       re.compile(r"floor insulation", re.IGNORECASE)),
+    ("glazing",     re.compile(r"glazing|glazed", re.IGNORECASE)),
+    ("heat_pump",   re.compile(r"heat pump", re.IGNORECASE)),
+    ("solar_water", re.compile(r"solar water", re.IGNORECASE)),
+    ("solar_pv",    re.compile(r"photovoltaic|solar pv|\bpv\b", re.IGNORECASE)),
+]
+MEASURE_NAMES = [name for name, _ in MEASURES]
+COUNT_COLS = [f"retrofit_{name}" for name in MEASURE_NAMES]
+HOMES_COL = "retrofit_homes"
+
+
+def classify_measure(text: str | None) -> int:
+    """Index into MEASURES for a recommendation text, or -1 if not tracked."""
+    if text is None or pd.isna(text):
+        return -1
+    for i, (_, pattern) in enumerate(MEASURES):
+        if pattern.search(str(text)):
+            return i
+    return -1
+
+
+# ── Streaming join ─────────────────────────────────────────────────────────────
+
+def load_latest(path: Path) -> pd.DataFrame:
+    """Latest certificate per property: LMK_KEY, postcode_key."""
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Latest-certificate table not found: {path} (run build_epc_cells.py first)"
+        )
+    latest = pd.read_parquet(path, columns=["LMK_KEY", "postcode_key"])
+    latest = latest[latest["LMK_KEY"].notna()].drop_duplicates("LMK_KEY")
+    return latest.reset_index(drop=True)
+
+
+def fold_recommendations(chunk: pd.DataFrame, lmk_index: pd.Index, flags: np.ndarray) -> int:
+    """OR each matched recommendation's measure bit into `flags`; returns rows matched."""
+    pos = lmk_index.get_indexer(chunk["LMK_KEY"])
+    text = chunk["IMPROVEMENT_SUMMARY_TEXT"].fillna(chunk["IMPROVEMENT_ID_TEXT"])
+    codes = map_unique(text, classify_measure).to_numpy(dtype="int64")
+    keep = (pos >= 0) & (codes >= 0)
+    if not keep.any():
+        return 0
+    # Collapse repeats of the same (certificate, measure) before the scatter
+    pairs = np.unique(pos[keep] * len(MEASURES) + codes[keep])
+    np.bitwise_or.at(flags, pairs // len(MEASURES), (1 << (pairs % len(MEASURES))).astype(flags.dtype))
+    return int(keep.sum())
+
+
+def stream_recommendations(input_path: Path, lmk_index: pd.Index) -> np.ndarray:
+    """Per-certificate bitmask of recommended measures, aligned with lmk_index."""
+    flags = np.zeros(len(lmk_index), dtype=np.uint16)
+    with zipfile.ZipFile(input_path, "r") as outer_zip:
+        entries = sorted(n for n in outer_zip.namelist() if n.endswith("recommendations.csv"))
+        print(f"Found {len(entries)} LA recommendation files")
+        for i, entry in enumerate(entries, start=1):
+            la_name = entry.split("/")[0]
+            rows = matched = 0
+            try:
+                with outer_zip.open(entry) as csv_fh:
+                    for chunk in pd.read_csv(
+                        csv_fh,
+                        usecols=lambda c: c in RECS_COLS,
+                        dtype="string",
+                        chunksize=RECS_CHUNKSIZE,
+                    ):
+                        for col in RECS_COLS:
+                            if col not in chunk.columns:
+                                chunk[col] = pd.Series(pd.NA, index=chunk.index, dtype="string")
+                        rows += len(chunk)
+                        matched += fold_recommendations(chunk, lmk_index, flags)
+            except Exception as exc:  # noqa: BLE001
+                print(f"  [{i:3d}/{len(entries)}] WARNING: skipped {la_name}: {exc}")
+                continue
+            print(f"  [{i:3d}/{len(entries)}] {la_name:<55} {rows:>9,} rows  {matched:>9,} on latest")
+    return flags
+
+
+# ── Aggregation ────────────────────────────────────────────────────────────────
+
+def postcode_counts(latest: pd.DataFrame, flags: np.ndarray, onspd: pd.DataFrame) -> pd.DataFrame:
+    """Homes and per-measure counts per postcode, with coordinates."""
+    pc_idx, postcodes = pd.factorize(latest["postcode_key"])
+    n_pc = len(postcodes)
+    out = pd.DataFrame({"postcode_key": postcodes})
+    out[HOMES_COL] = np.bincount(pc_idx, minlength=n_pc).astype("int64")
+    for j, col in enumerate(COUNT_COLS):
+        has = ((flags >> j) & 1).astype("float64")
+        out[col] = np.rint(np.bincount(pc_idx, weights=has, minlength=n_pc)).astype("int64")
+    return out.merge(onspd, on="postcode_key", how="inner")
+
+
+def build_retrofit_rows(counts: pd.DataFrame) -> list[dict]:
+    """{gx, gy, n, pct_<measure>...} rows for cells with n ≥ MIN_PROPS."""
+    counts = counts[counts[HOMES_COL] >= MIN_PROPS]
+    n = counts[HOMES_COL].to_numpy(dtype="float64")
+    frame = pd.DataFrame({
+        "gx": counts.index.get_level_values("gx").astype("int64"),
+        "gy": counts.index.get_level_values("gy").astype("int64"),
+        "n":  n.astype("int64"),
+    })
+    pct = np.round(counts[COUNT_COLS].to_numpy(dtype="float64") / n[:, None] * 100, 1)
+    for j, name in enumerate(MEASURE_NAMES):
+        frame[f"pct_{name}"] = pct[:, j]
+    return frame.to_dict("records")
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main(input_path: Path, latest_path: Path, onspd_path: Path, output_dir: Path) -> None:
+    ensure_pipeline_dirs()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if not input_path.exists():
+        sys.exit(f"ERROR: Input file not found: {input_path}")
+
+    print(f"Loading latest certificates: {latest_path}")
+    latest = load_latest(latest_path)
+    print(f"  Properties: {len(latest):,}")
+    lmk_index = pd.Index(latest["LMK_KEY"])
+
+    print(f"\nStreaming recommendations: {input_path}")
+    flags = stream_recommendations(input_path, lmk_index)
+    for j, name in enumerate(MEASURE_NAMES):
+        print(f"  {name:<12}: {int(((flags >> j) & 1).sum()):>10,} homes")
+
+    print(f"\nLoading ONSPD: {onspd_path}")
+    onspd = load_onspd(onspd_path)
+    pc_counts = postcode_counts(latest, flags, onspd)
+    print(f"  Postcodes with coordinates: {len(pc_counts):,}")
+
+    for grid_label, counts in grid_counts(pc_counts, [HOMES_COL, *COUNT_COLS]).items():
+        rows = build_retrofit_rows(counts)
+        path = output_dir / MODEL_EPC_RETROFIT_CELLS_TEMPLATE.name.replace("{grid}", grid_label)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        print(f"  {grid_label:<5} retrofit cells: {len(rows):>6,}  →  {path.name}  ({path.stat().st_size // 1024:,} KB)")
+
+    print("\nDone.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build per-cell EPC retrofit recommendation shares")
+    parser.add_argument("--input",  default=str(DEFAULT_INPUT), help="Path to all-domestic-certificates.zip")
+    parser.add_argument("--latest", default=str(INTERMEDIATE_EPC_LATEST),
+                        help="Latest-certificate-per-property table written by build_epc_cells.py")
+    parser.add_argument("--onspd",  default=str(DEFAULT_ONSPD), help="Path to ONSPD CSV")
+    parser.add_argument("--output", default=str(MODEL_EPC_RETROFIT_CELLS_TEMPLATE.parent),
+                        help="Output directory (default: pipeline/data/model/epc)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(Path(args.input), Path(args.latest), Path(args.onspd), Path(args.output))
@@ -0,0 +1,160 @@
+"""
+build_flood_cells.py
+
+Joins the postcode flood-risk bands (the same deduplicated table that
+build_flood_postcode_assets.py publishes) to the ONSPD gazetteer and computes,
+per grid cell, the share of postcodes in each Risk of Flooding from Rivers and
+Sea band:
+
+  flood_cells_{grid}.json.gz   grid = 1mile / 5km / 10km / 25km
+
+Output location: pipeline/data/model/flood/
+
+Usage (from repo root):
+    python pipeline/build_flood_cells.py
+
+    # Explicit paths:
+    python pipeline/build_flood_cells.py \
+        --input  pipeline/data/raw/flood/<flood postcode csv> \
+        --onspd  pipeline/data/raw/property/ONSPD_Online_latest_Postcode_Centroids_.csv \
+        --output pipeline/data/model/flood
+
+Output JSON schema
+──────────────────
+flood_cells_{grid}.json.gz  — array of:
+  {
+    "gx": <int>,                   BNG easting  of SW corner of cell
+    "gy": <int>,                   BNG northing of SW corner of cell
+    "flood_n":           <int>,    active postcodes in the cell
+    "flood_pct_high":    <float>,  % of postcodes in the high band
+    "flood_pct_medium":  <float>,  % medium
+    "flood_pct_low":     <float>,  % low
+    "flood_pct_very_low":<float>,  % very low
+    "flood_pct_any":     <float>   % in any band above none
+  }
+
+Notes
+─────
+• The denominator is every active gazetteer postcode in the cell; postcodes
+  absent from the flood data count as no risk.
+• The flood dataset covers England only, so cells are built from English
+  postcodes; Welsh and Scottish cells are absent rather than reported as 0%.
+• Minimum cell threshold: cells with fewer than MIN_POSTCODES postcodes are dropped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+from build_country_lookup_assets import COUNTRIES, ONSPD_CSV, load_gazetteer
+from build_flood_postcode_assets import BANDS, DEFAULT_INPUT, load_flood_postcodes
+from paths import MODEL_FLOOD_CELLS_TEMPLATE, ensure_pipeline_dirs
+
+# ── Constants ─────────────────────────────────────────────────────────────────
+
+GRID_SIZES = {"1mile": 1600, "5km": 5000, "10km": 10000, "25km": 25000}
+MIN_POSTCODES = 3
+
+# Countries the flood bands cover (Environment Agency RoFRS: England)
+COVERED_COUNTRIES = {"E"}
+
+# Output field per band, in output order ("none" is the remainder)
+BAND_FIELDS = {
+    "high": "flood_pct_high",
+    "medium": "flood_pct_medium",
+    "low": "flood_pct_low",
+    "very low": "flood_pct_very_low",
+}
+
+
+# ── Join ───────────────────────────────────────────────────────────────────────
+
+def postcode_bands(gaz: pd.DataFrame, flood: pd.DataFrame) -> pd.DataFrame:
+    """Covered, gridded gazetteer postcodes with band_code (index into BANDS; none if unmatched)."""
+    covered = gaz["country_code"].isin([COUNTRIES.index(c) for c in COVERED_COUNTRIES])
+    covered &= gaz["east"].notna() & gaz["north"].notna() & (gaz["east"] > 0) & (gaz["north"] > 0)
+    pcs = gaz.loc[covered, ["postcode_key", "east", "north"]].drop_duplicates("postcode_key")
+
+    pos = pd.Index(flood["postcode_key"]).get_indexer(pcs["postcode_key"])
+    codes = flood["band_code"].to_numpy()
+    none_code = BANDS.index("none")
+    band = np.where(pos >= 0, codes[np.maximum(pos, 0)], none_code)
+    # Unrecognised bands (-1) count as none, matching their risk_score of 0
+    pcs = pcs.assign(band_code=np.where(band >= 0, band, none_code))
+    matched = int((pos >= 0).sum())
+    print(f"  Covered postcodes: {len(pcs):,}  with a flood band: {matched:,}")
+    return pcs.reset_index(drop=True)
+
+
+def build_flood_rows(pcs: pd.DataFrame, g: int) -> list[dict]:
+    """{gx, gy, flood_n, flood_pct_*} rows for grid size g with ≥ MIN_POSTCODES postcodes."""
+    gx = (pcs["east"].to_numpy() // g * g).astype(np.int64)
+    gy = (pcs["north"].to_numpy() // g * g).astype(np.int64)
+    keys, inv = np.unique(np.stack([gx, gy], axis=1), axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    k = len(BANDS)
+    counts = np.bincount(inv * k + pcs["band_code"].to_numpy(), minlength=len(keys) * k).reshape(len(keys), k)
+    n = counts.sum(axis=1)
+
+    keep = n >= MIN_POSTCODES
+    keys, counts, n = keys[keep], counts[keep], n[keep]
+    pct = np.round(counts / n[:, None] * 100, 1)
+    any_risk = np.round((n - counts[:, BANDS.index("none")]) / n * 100, 1)
+
+    frame = pd.DataFrame({"gx": keys[:, 0], "gy": keys[:, 1], "flood_n": n.astype(np.int64)})
+    for band, field in BAND_FIELDS.items():
+        frame[field] = pct[:, BANDS.index(band)]
+    frame["flood_pct_any"] = any_risk
+    return frame.to_dict("records")
+
+
+# ── Main ───────────────────────────────────────────────────────────────────────
+
+def main(input_path: Path, onspd_path: Path, output_dir: Path) -> None:
+    ensure_pipeline_dirs()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if not input_path.exists():
+        sys.exit(f"ERROR: Flood CSV not found: {input_path}")
+
+    print(f"Loading flood bands: {input_path}")
+    flood = load_flood_postcodes(input_path)
+    print(f"  Postcodes: {len(flood):,}")
+
+    print(f"\nLoading ONSPD: {onspd_path}")
+    pcs = postcode_bands(load_gazetteer(onspd_path), flood)
+    del flood
+
+    for grid_label, g in GRID_SIZES.items():
+        rows = build_flood_rows(pcs, g)
+        path = output_dir / MODEL_FLOOD_CELLS_TEMPLATE.name.replace("{grid}", grid_label)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        print(f"  {grid_label:<5} flood cells: {len(rows):>6,}  →  {path.name}  ({path.stat().st_size // 1024:,} KB)")
+
+    print("\nDone.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build per-cell flood risk band shares")
+    parser.add_argument("--input",  default=str(DEFAULT_INPUT), help="Path to the postcode flood CSV")
+    parser.add_argument("--onspd",  default=str(ONSPD_CSV), help="Path to ONSPD CSV")
+    parser.add_argument("--output", default=str(MODEL_FLOOD_CELLS_TEMPLATE.parent),
+                        help="Output directory (default: pipeline/data/model/flood)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    onspd = Path(args.onspd)
+    if not onspd.exists():
+        print(f"ONSPD not found at {onspd} — skipping flood cells")
+        sys.exit(0)
+    main(Path(args.input), onspd, Path(args.output))
@@ -5,7 +5,9 @@ import gzip
 import json
 import re
 from pathlib import Path
+from typing import Iterable
 
+import numpy as np
 import pandas as pd
 from paths import MODEL_FLOOD_DIR, RAW_FLOOD_POSTCODE_CSV, ensure_pipeline_dirs
 
@@ -37,39 +39,6 @@ def normalize_postcode_key(value: str) -> str:
     return re.sub(r"\s+", "", str(value).upper()).strip()
 
 
-def derive_outcode(postcode_key: str) -> str:
-    text = postcode_key.strip().upper()
-    if not text:
-        return ""
-    match = re.match(r"^([A-Z]{1,2}\d[A-Z\d]?)\d[A-Z]{2}$", text)
-    if match:
-        return match.group(1)
-    return text[:-3] if len(text) > 3 else text
-
-
-def to_float_or_none(value: object) -> float | None:
-    try:
-        number = float(value)
-    except (TypeError, ValueError):
-        return None
-    if pd.isna(number):
-        return None
-    return number
-
-
-def to_int_or_none(value: object) -> int | None:
-    number = to_float_or_none(value)
-    if number is None:
-        return None
-    return int(round(number))
-
-
-def to_str_or_none(value: object) -> str | None:
-    if pd.isna(value):
-        return None
-    return str(value)
-
-
 def write_json_gz(path: Path, payload: object) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with gzip.open(path, "wt", encoding="utf-8") as f:
@@ -120,6 +89,218 @@ def load_allowed_postcode_keys(path: Path) -> set[str]:
     return {normalize_postcode_key(v) for v in lines if v.strip()}
 
 
+FLOOD_COLUMNS = {
+    "postcode": ["postcode", "pcds", "pcd7", "pcd8"],
+    "risk_band": ["prob_4band", "prob4band", "risk_band"],
+    "pub_date": ["pub_date", "publish_date", "publication_date"],
+    "suitability": ["suitability"],
+    "risk_for_insurance_sop": ["risk_for_insurance_sop", "risk_for_insurance", "insurance_risk"],
+    "easting": ["easting", "east1m", "x"],
+    "northing": ["northing", "north1m", "y"],
+    "latitude": ["latitude", "lat"],
+    "longitude": ["longitude", "lon", "lng"],
+}
+NUMERIC_COLUMNS = ["easting", "northing", "latitude", "longitude"]
+
+# Outcode summary count columns, in output order, keyed by normalised band
+BAND_COUNT_COLUMNS = {
+    "high": "high_count",
+    "medium": "medium_count",
+    "low": "low_count",
+    "very low": "very_low_count",
+    "none": "none_count",
+}
+BANDS = list(RISK_SCORE)
+
+# Per-outcode lookup shards (fetched one at a time by functions/api/flood.ts)
+SHARD_DIRNAME = "flood_lookup"
+SHARD_INDEX_NAME = "_index.json"
+SHARD_OUTCODE_RE = re.compile(r"^[A-Z0-9]{2,4}$")
+
+
+def read_flood_csv(input_csv: Path) -> pd.DataFrame:
+    """Only the columns the assets use, renamed to their canonical names; coordinates as float."""
+    header = list(pd.read_csv(input_csv, nrows=0).columns)
+    by_norm = {normalize_colname(c): c for c in header}
+    source = {name: by_norm[pick_column(list(by_norm), candidates)] for name, candidates in FLOOD_COLUMNS.items()}
+    work = pd.read_csv(input_csv, usecols=list(source.values()), dtype="string")
+    work = work.rename(columns={orig: name for name, orig in source.items()})[list(FLOOD_COLUMNS)]
+    for col in NUMERIC_COLUMNS:
+        work[col] = pd.to_numeric(work[col], errors="coerce").astype("float64")
+    return work
+
+
+def derive_outcodes(postcode_keys: pd.Series) -> pd.Series:
+    """Outward code per postcode key (regex match, else all but the last three characters)."""
+    matched = postcode_keys.str.extract(r"^([A-Z]{1,2}\d[A-Z\d]?)\d[A-Z]{2}$", expand=False)
+    fallback = postcode_keys.where(postcode_keys.str.len() <= 3, postcode_keys.str[:-3])
+    return matched.fillna(fallback)
+
+
+def parse_pub_dates(pub_date: pd.Series) -> np.ndarray:
+    """pub_date as int64 nanoseconds (NaT → INT64 min), parsing each distinct string once."""
+    codes, uniques = pd.factorize(pub_date)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype="string"), errors="coerce", format="mixed", dayfirst=True)
+    values = np.append(parsed.to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns")).view("int64")
+    return values[codes]
+
+
+def latest_riskiest_rows(work: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per postcode_key (highest risk_score, then latest pub_date; NaT
+    last), ordered by postcode_key.  Same rows as a stable sort + dedupe.
+    """
+    key_codes, _ = pd.factorize(work["postcode_key"], sort=True)
+    ts = parse_pub_dates(work["pub_date"])
+    nat = ts == np.iinfo(np.int64).min
+    newest_first = np.where(nat, np.iinfo(np.int64).max, -ts)
+    order = np.lexsort((newest_first, -work["risk_score"].to_numpy(), key_codes))
+    sorted_keys = key_codes[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return work.iloc[order[first]].reset_index(drop=True)
+
+
+def nullable_list(series: pd.Series, kind: str = "str") -> list:
+    """Column as a Python list with missing values as None (kind: str / int / float)."""
+    if kind == "str":
+        values = series.astype(object)
+        return values.where(series.notna(), None).tolist()
+    arr = series.to_numpy(dtype="float64")
+    missing = np.isnan(arr)
+    if kind == "int":
+        ints = np.rint(np.where(missing, 0, arr)).astype("int64").tolist()
+        return [None if m else v for v, m in zip(ints, missing.tolist())]
+    return [None if m else v for v, m in zip(arr.tolist(), missing.tolist())]
+
+
+def outcode_summary_rows(dedup: pd.DataFrame) -> list[dict[str, object]]:
+    """Per-outcode counts: one outcode × band crosstab from categorical codes."""
+    out_codes, outcodes = pd.factorize(dedup["outcode"], sort=True)
+    n = len(outcodes)
+    band_codes = dedup["band_code"].to_numpy()
+    known = band_codes >= 0
+    crosstab = np.bincount(
+        out_codes[known] * len(BANDS) + band_codes[known], minlength=n * len(BANDS)
+    ).reshape(n, len(BANDS))
+
+    score = dedup["risk_score"].to_numpy()
+    postcode_count = np.bincount(out_codes, minlength=n)
+    max_score = np.zeros(n, dtype="int64")
+    np.maximum.at(max_score, out_codes, score)
+    mean_score = np.bincount(out_codes, weights=score, minlength=n) / np.maximum(postcode_count, 1)
+
+    columns: dict[str, list] = {
+        "outcode": [str(o) for o in outcodes],
+        "postcode_count": postcode_count.tolist(),
+        "max_risk_score": max_score.tolist(),
+        "mean_risk_score": [round(v, 3) for v in mean_score.tolist()],
+    }
+    for band, col in BAND_COUNT_COLUMNS.items():
+        columns[col] = crosstab[:, BANDS.index(band)].tolist()
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def write_json_items_gz(path: Path, items: Iterable[tuple[str, object]]) -> int:
+    """Stream a JSON object {key: value, ...} without holding it whole; returns entries written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("{")
+        for key, value in items:
+            if n:
+                f.write(", ")
+            f.write(json.dumps(key, ensure_ascii=False))
+            f.write(": ")
+            f.write(json.dumps(value, ensure_ascii=False))
+            n += 1
+        f.write("}")
+    return n
+
+
+def write_feature_collection_gz(path: Path, features: Iterable[dict]) -> int:
+    """Stream a GeoJSON FeatureCollection one feature at a time; returns features written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "features": [')
+        for feature in features:
+            if n:
+                f.write(", ")
+            f.write(json.dumps(feature, ensure_ascii=False))
+            n += 1
+        f.write("]}")
+    return n
+
+
+def write_lookup_shards(shard_dir: Path, keys: list[str], fields: dict[str, list]) -> dict[str, object]:
+    """
+    Split the postcode lookup into one {postcode_key: item} file per outcode
+    under shard_dir, plus SHARD_INDEX_NAME listing each shard's object key,
+    postcode count and compressed size.  Returns the index.
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for stale in shard_dir.glob("*.json.gz"):
+        stale.unlink()
+
+    names = list(fields)
+    outcodes = fields["outcode"]
+    codes, uniques = pd.factorize(pd.Series(outcodes, dtype="string"), sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    entries: dict[str, dict[str, object]] = {}
+    skipped = 0
+    for j, outcode in enumerate(uniques):
+        rows = order[bounds[j]:bounds[j + 1]].tolist()
+        if not SHARD_OUTCODE_RE.match(str(outcode)):
+            skipped += len(rows)
+            continue
+        name = f"{outcode}.json.gz"
+        count = write_json_items_gz(
+            shard_dir / name,
+            ((keys[i], {col: fields[col][i] for col in names}) for i in rows),
+        )
+        entries[str(outcode)] = {
+            "key": f"{SHARD_DIRNAME}/{name}",
+            "postcodes": count,
+            "bytes": (shard_dir / name).stat().st_size,
+        }
+    if skipped:
+        print(f"  Skipped {skipped:,} lookup rows with unusable outcodes for sharding")
+
+    index = {
+        "shards": len(entries),
+        "postcodes": sum(int(e["postcodes"]) for e in entries.values()),
+        "bytes": sum(int(e["bytes"]) for e in entries.values()),
+        "outcodes": entries,
+    }
+    (shard_dir / SHARD_INDEX_NAME).write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    return index
+
+
+def load_flood_postcodes(input_csv: Path) -> pd.DataFrame:
+    """
+    One row per postcode_key from the flood CSV (riskiest, then latest band),
+    with outcode, band_code (index into BANDS, -1 if unrecognised) and risk_score.
+    """
+    work = read_flood_csv(input_csv)
+
+    work["postcode"] = work["postcode"].str.strip().str.upper()
+    work = work[work["postcode"].notna() & (work["postcode"].str.len() > 0)].reset_index(drop=True)
+    work["postcode_key"] = work["postcode"].str.replace(r"\s+", "", regex=True)
+    work["outcode"] = derive_outcodes(work["postcode_key"])
+
+    work["risk_band"] = work["risk_band"].str.strip()
+    band = pd.Categorical(work["risk_band"].str.lower().fillna("none"), categories=BANDS)
+    work["band_code"] = band.codes.astype("int64")
+    scores = np.array([RISK_SCORE[b] for b in BANDS] + [0], dtype="int64")
+    work["risk_score"] = scores[work["band_code"].to_numpy()]
+
+    return latest_riskiest_rows(work)
+
+
 def build_assets(
     input_csv: Path,
     out_dir: Path,
@@ -128,153 +309,78 @@ def build_assets(
     include_no_risk_lookup: bool = False,
     include_lookup_text_fields: bool = False,
 ) -> None:
-    df = pd.read_csv(input_csv, dtype=str)
-    df.columns = [normalize_colname(c) for c in df.columns]
-
-    cols = list(df.columns)
-    postcode_col = pick_column(cols, ["postcode", "pcds", "pcd7", "pcd8"])
-    band_col = pick_column(cols, ["prob_4band", "prob4band", "risk_band"])
-    pub_date_col = pick_column(cols, ["pub_date", "publish_date", "publication_date"])
-    suitability_col = pick_column(cols, ["suitability"])
-    ins_col = pick_column(cols, ["risk_for_insurance_sop", "risk_for_insurance", "insurance_risk"])
-    east_col = pick_column(cols, ["easting", "east1m", "x"])
-    north_col = pick_column(cols, ["northing", "north1m", "y"])
-    lat_col = pick_column(cols, ["latitude", "lat"])
-    lon_col = pick_column(cols, ["longitude", "lon", "lng"])
-
-    work = df[[postcode_col, band_col, pub_date_col, suitability_col, ins_col, east_col, north_col, lat_col, lon_col]].copy()
-    work = work.rename(
-        columns={
-            postcode_col: "postcode",
-            band_col: "risk_band",
-            pub_date_col: "pub_date",
-            suitability_col: "suitability",
-            ins_col: "risk_for_insurance_sop",
-            east_col: "easting",
-            north_col: "northing",
-            lat_col: "latitude",
-            lon_col: "longitude",
-        }
-    )
-
-    work["postcode"] = work["postcode"].astype("string").str.strip().str.upper()
-    work = work[work["postcode"].notna() & (work["postcode"].str.len() > 0)]
-    work["postcode_key"] = work["postcode"].map(normalize_postcode_key)
-    work["outcode"] = work["postcode_key"].map(derive_outcode)
-
-    work["risk_band"] = work["risk_band"].astype("string").str.strip()
-    work["risk_band_norm"] = work["risk_band"].str.lower().fillna("none")
-    work["risk_score"] = work["risk_band_norm"].map(RISK_SCORE).fillna(0).astype(int)
-
-    work["pub_date_ts"] = pd.to_datetime(
-        work["pub_date"],
-        errors="coerce",
-        format="mixed",
-        dayfirst=True,
-    )
-
-    work = work.sort_values(["postcode_key", "risk_score", "pub_date_ts"], ascending=[True, False, False])
-    dedup = work.drop_duplicates(subset=["postcode_key"], keep="first").copy()
+    dedup = load_flood_postcodes(input_csv)
 
     allowed_keys: set[str] | None = None
     if restrict_postcodes_file is not None:
         allowed_keys = load_allowed_postcode_keys(restrict_postcodes_file)
-        dedup = dedup[dedup["postcode_key"].isin(allowed_keys)].copy()
+        dedup = dedup[dedup["postcode_key"].isin(allowed_keys)].reset_index(drop=True)
 
+    # Postcode lookup, converted column-wise and streamed to disk
     lookup_rows = dedup if include_no_risk_lookup else dedup[dedup["risk_score"] > 0]
-
-    postcode_lookup: dict[str, dict[str, object]] = {}
-    for row in lookup_rows.itertuples(index=False):
-        item: dict[str, object] = {
-            "postcode": row.postcode,
-            "outcode": row.outcode,
-            "risk_band": to_str_or_none(row.risk_band),
-            "risk_score": int(row.risk_score),
-            "pub_date": to_str_or_none(row.pub_date),
-            "easting": to_int_or_none(row.easting),
-            "northing": to_int_or_none(row.northing),
-            "latitude": to_float_or_none(row.latitude),
-            "longitude": to_float_or_none(row.longitude),
-        }
-        if include_lookup_text_fields:
-            item["suitability"] = to_str_or_none(row.suitability)
-            item["risk_for_insurance_sop"] = to_str_or_none(row.risk_for_insurance_sop)
-        postcode_lookup[row.postcode_key] = item
-
-    outcode_summary = (
-        dedup.groupby("outcode", dropna=False)
-        .agg(
-            postcode_count=("postcode_key", "count"),
-            max_risk_score=("risk_score", "max"),
-            mean_risk_score=("risk_score", "mean"),
-            high_count=("risk_band_norm", lambda s: int((s == "high").sum())),
-            medium_count=("risk_band_norm", lambda s: int((s == "medium").sum())),
-            low_count=("risk_band_norm", lambda s: int((s == "low").sum())),
-            very_low_count=("risk_band_norm", lambda s: int((s == "very low").sum())),
-            none_count=("risk_band_norm", lambda s: int((s == "none").sum())),
-        )
-        .reset_index()
+    fields: dict[str, list] = {
+        "postcode": nullable_list(lookup_rows["postcode"]),
+        "outcode": nullable_list(lookup_rows["outcode"]),
+        "risk_band": nullable_list(lookup_rows["risk_band"]),
+        "risk_score": lookup_rows["risk_score"].tolist(),
+        "pub_date": nullable_list(lookup_rows["pub_date"]),
+        "easting": nullable_list(lookup_rows["easting"], "int"),
+        "northing": nullable_list(lookup_rows["northing"], "int"),
+        "latitude": nullable_list(lookup_rows["latitude"], "float"),
+        "longitude": nullable_list(lookup_rows["longitude"], "float"),
+    }
+    if include_lookup_text_fields:
+        fields["suitability"] = nullable_list(lookup_rows["suitability"])
+        fields["risk_for_insurance_sop"] = nullable_list(lookup_rows["risk_for_insurance_sop"])
+    names = list(fields)
+    lookup_keys = lookup_rows["postcode_key"].tolist()
+    lookup_count = write_json_items_gz(
+        out_dir / "flood_postcode_lookup.json.gz",
+        zip(lookup_keys, (dict(zip(names, v)) for v in zip(*fields.values()))),
     )
+    shard_index = write_lookup_shards(out_dir / SHARD_DIRNAME, lookup_keys, fields)
+    del fields, lookup_keys
 
-    outcode_payload = []
-    for row in outcode_summary.itertuples(index=False):
-        outcode_payload.append(
-            {
-                "outcode": "" if pd.isna(row.outcode) else str(row.outcode),
-                "postcode_count": int(row.postcode_count),
-                "max_risk_score": int(row.max_risk_score),
-                "mean_risk_score": round(float(row.mean_risk_score), 3),
-                "high_count": int(row.high_count),
-                "medium_count": int(row.medium_count),
-                "low_count": int(row.low_count),
-                "very_low_count": int(row.very_low_count),
-                "none_count": int(row.none_count),
-            }
-        )
+    outcode_payload = outcode_summary_rows(dedup)
+    write_json_gz(out_dir / "flood_outcode_summary.json.gz", outcode_payload)
 
+    # Point features, built from arrays
     point_rows = dedup if include_no_risk_points else dedup[dedup["risk_score"] > 0]
-
-    point_features = []
-    for row in point_rows.itertuples(index=False):
-        lon = to_float_or_none(row.longitude)
-        lat = to_float_or_none(row.latitude)
-        if lon is None or lat is None:
-            continue
-        point_features.append(
+    point_rows = point_rows[point_rows["longitude"].notna() & point_rows["latitude"].notna()]
+    props: dict[str, list] = {
+        "postcode": nullable_list(point_rows["postcode"]),
+        "postcode_key": nullable_list(point_rows["postcode_key"]),
+        "outcode": nullable_list(point_rows["outcode"]),
+        "risk_band": nullable_list(point_rows["risk_band"]),
+        "risk_score": point_rows["risk_score"].tolist(),
+        "suitability": nullable_list(point_rows["suitability"]),
+        "risk_for_insurance_sop": nullable_list(point_rows["risk_for_insurance_sop"]),
+        "pub_date": nullable_list(point_rows["pub_date"]),
+        "easting": nullable_list(point_rows["easting"], "int"),
+        "northing": nullable_list(point_rows["northing"], "int"),
+    }
+    prop_names = list(props)
+    point_count = write_feature_collection_gz(
+        out_dir / "flood_postcode_points.geojson.gz",
+        (
             {
                 "type": "Feature",
-                "properties": {
-                    "postcode": row.postcode,
-                    "postcode_key": row.postcode_key,
-                    "outcode": row.outcode,
-                    "risk_band": to_str_or_none(row.risk_band),
-                    "risk_score": int(row.risk_score),
-                    "suitability": to_str_or_none(row.suitability),
-                    "risk_for_insurance_sop": to_str_or_none(row.risk_for_insurance_sop),
-                    "pub_date": to_str_or_none(row.pub_date),
-                    "easting": to_int_or_none(row.easting),
-                    "northing": to_int_or_none(row.northing),
-                },
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [lon, lat],
-                },
+                "properties": dict(zip(prop_names, values)),
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
             }
-        )
-
-    geojson = {"type": "FeatureCollection", "features": point_features}
-
-    write_json_gz(out_dir / "flood_postcode_lookup.json.gz", postcode_lookup)
-    write_json_gz(out_dir / "flood_outcode_summary.json.gz", outcode_payload)
-    write_json_gz(out_dir / "flood_postcode_points.geojson.gz", geojson)
+            for lon, lat, *values in zip(
+                point_rows["longitude"].tolist(), point_rows["latitude"].tolist(), *props.values()
+            )
+        ),
+    )
 
     manifest = {
         "input_csv": str(input_csv),
-        "postcodes": len(postcode_lookup),
+        "postcodes": lookup_count,
         "outcodes": len(outcode_payload),
-        "geojson_points": len(point_features),
+        "geojson_points": point_count,
         "include_no_risk_points": bool(include_no_risk_points),
-        "lookup_postcodes": len(postcode_lookup),
+        "lookup_postcodes": lookup_count,
         "include_no_risk_lookup": bool(include_no_risk_lookup),
         "include_lookup_text_fields": bool(include_lookup_text_fields),
         "restrict_postcodes_file": str(restrict_postcodes_file) if restrict_postcodes_file else None,
@@ -283,7 +389,9 @@ def build_assets(
             "postcode_lookup": "flood_postcode_lookup.json.gz",
             "outcode_summary": "flood_outcode_summary.json.gz",
             "postcode_points_geojson": "flood_postcode_points.geojson.gz",
+            "postcode_lookup_shards": f"{SHARD_DIRNAME}/{SHARD_INDEX_NAME}",
         },
+        "lookup_shards": shard_index["shards"],
     }
     (out_dir / "flood_manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
 
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Build every OSM amenity overlay (pubs, supermarkets, …) from one Overpass extraction.
+
+Each GB chunk is fetched once with a single union query covering the tag
+filters of every registered layer (via overpass_client.py: concurrent, cached
+by query hash, resumable).  Elements are then routed to each layer whose
+filters they match, so adding a layer adds a couple of lines to the union
+query rather than another national scan.
+
+Layers (AMENITY_LAYERS registry):
+  pubs          amenity=pub | amenity=bar
+                → data/model/transit/pub_overlay_points.geojson.gz
+                  Properties: name, amenity, brand
+  supermarkets  shop=supermarket | shop=convenience
+                (convenience stores included as a "food access" proximity
+                signal — for most people the nearest food shop is not a full
+                supermarket)
+                → data/model/transit/supermarket_overlay_points.geojson.gz
+                  Properties: name, shop, brand
+
+To add a layer, add an entry with its tag filters, the tag key copied into the
+properties, and its output path.
+
+Data source: OpenStreetMap contributors via Overpass API
+Licence: ODbL (Open Database Licence) — https://opendatacommons.org/licenses/odbl/
+
+Usage:
+    python pipeline/build_osm_amenity_points.py
+    python pipeline/build_osm_amenity_points.py --layers pubs --offline
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+from pathlib import Path
+
+from overpass_client import GB_CHUNKS, add_client_args, client_from_args, tag_query
+from paths import MODEL_PUB_OVERLAY_POINTS, MODEL_SUPERMARKET_OVERLAY_POINTS, ensure_pipeline_dirs
+
+# GB bounding box sanity check
+LON_MIN, LON_MAX = -8.2, 2.0
+LAT_MIN, LAT_MAX = 49.8, 61.0
+
+# layer → tag filters (any match), the tag key copied into the properties
+# (with its fallback value), output path and a label for progress output.
+AMENITY_LAYERS: dict[str, dict] = {
+    "pubs": {
+        "tags": [("amenity", "pub"), ("amenity", "bar")],
+        "kind": ("amenity", "pub"),
+        "output": MODEL_PUB_OVERLAY_POINTS,
+        "label": "pubs/bars",
+    },
+    "supermarkets": {
+        "tags": [("shop", "supermarket"), ("shop", "convenience")],
+        "kind": ("shop", "supermarket"),
+        "output": MODEL_SUPERMARKET_OVERLAY_POINTS,
+        "label": "food shops",
+    },
+}
+
+
+def union_tag_filters(layers: list[str]) -> list[tuple[str, str]]:
+    """Every layer's tag filters, deduplicated, in registry order."""
+    return list(dict.fromkeys(tag for name in layers for tag in AMENITY_LAYERS[name]["tags"]))
+
+
+def element_coords(el: dict) -> tuple[float, float] | None:
+    """Return (lon, lat) for a node or a way (via 'center')."""
+    if el["type"] == "node":
+        lon, lat = el.get("lon"), el.get("lat")
+    else:
+        c = el.get("center", {})
+        lon, lat = c.get("lon"), c.get("lat")
+    if lon is None or lat is None:
+        return None
+    return lon, lat
+
+
+def split_by_layer(elements: list[dict], layers: list[str]) -> dict[str, list[dict]]:
+    """Route each element to every layer with a matching tag filter."""
+    filters = {name: set(AMENITY_LAYERS[name]["tags"]) for name in layers}
+    out: dict[str, list[dict]] = {name: [] for name in layers}
+    for el in elements:
+        tags = el.get("tags", {})
+        for name, wanted in filters.items():
+            if any(tags.get(k) == v for k, v in wanted):
+                out[name].append(el)
+    return out
+
+
+def build_features(elements: list[dict], layer: dict) -> list[dict]:
+    kind_key, kind_default = layer["kind"]
+    features: list[dict] = []
+    seen_coords: set[tuple[float, float]] = set()
+    for el in elements:
+        coords = element_coords(el)
+        if coords is None:
+            continue
+        lon, lat = coords
+        if not (LON_MIN <= lon <= LON_MAX) or not (LAT_MIN <= lat <= LAT_MAX):
+            continue
+        point = (round(lon, 7), round(lat, 7))
+        # Deduplicate by coordinates (e.g. a node and a way for the same venue)
+        if point in seen_coords:
+            continue
+        seen_coords.add(point)
+
+        tags: dict = el.get("tags", {})
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "name": (tags.get("name") or "").strip(),
+                kind_key: tags.get(kind_key, kind_default),
+                "brand": (tags.get("brand") or tags.get("brand:en") or "").strip(),
+            },
+            "geometry": {
+                "type": "Point",
+                "coordinates": list(point),
+            },
+        })
+    return features
+
+
+def write_geojson_gz(path: Path, features: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"type": "FeatureCollection", "features": features}
+    with gzip.open(str(path), "wt", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, separators=(",", ":"))
+    print(f"  Written {len(features):,} features → {path} ({path.stat().st_size / 1024:.0f} KB)")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Build OSM amenity overlay GeoJSON layers from one Overpass extraction")
+    p.add_argument("--layers", default=",".join(AMENITY_LAYERS),
+                   help=f"Comma-separated layers to write (default: all of {', '.join(AMENITY_LAYERS)})")
+    p.add_argument("--output-dir", default=None,
+                   help="Write layers here instead of their registry paths (same file names)")
+    add_client_args(p)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    ensure_pipeline_dirs()
+    layers = [name.strip() for name in args.layers.split(",") if name.strip()]
+    unknown = [name for name in layers if name not in AMENITY_LAYERS]
+    if unknown:
+        sys.exit(f"ERROR: unknown layer(s) {', '.join(unknown)}; known: {', '.join(AMENITY_LAYERS)}")
+
+    # Always query the full registry so every layer shares one cached extraction
+    tag_filters = union_tag_filters(list(AMENITY_LAYERS))
+    print(f"Fetching {len(tag_filters)} tag filters in {len(GB_CHUNKS)} chunks …")
+    client = client_from_args(args)
+    elements, failed = client.fetch_chunks(tag_query(tag_filters), GB_CHUNKS)
+    if failed:
+        sys.exit(f"ERROR: {len(failed)}/{len(GB_CHUNKS)} Overpass chunks failed; rerun to resume from the cache")
+    print(f"  {len(elements):,} unique OSM elements")
+
+    for name, layer_elements in split_by_layer(elements, layers).items():
+        layer = AMENITY_LAYERS[name]
+        features = build_features(layer_elements, layer)
+        print(f"\n  {name}: {len(features):,} {layer['label']} (from {len(layer_elements):,} raw)")
+        output = Path(layer["output"])
+        if args.output_dir:
+            output = Path(args.output_dir) / output.name
+        write_geojson_gz(output, features)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ Data source: NHS BSA Open Data — "Consolidated Pharmaceutical List"
   Licence: Open Government Licence v3.0 — free, no API key required
   Coverage: England only (Scotland/Wales covered separately)
 
-Geocoding: postcodes.io bulk API (100 postcodes per request), free, no key needed.
+Geocoding: local ONSPD postcode centroids (postcode_geocoder.py), no network calls;
+  terminated postcodes still resolve, --outcode-fallback places the rest at
+  their outward-code centroid.
 
 Output: data/model/transit/pharmacy_overlay_points.geojson.gz
   Properties per feature: name, ods_code, post_code, weekly_total
@@ -23,15 +25,14 @@ import csv
 import gzip
 import io
 import json
-import time
 import urllib.request
 from pathlib import Path
 
 from paths import MODEL_TRANSIT_DIR, ensure_pipeline_dirs
+from postcode_geocoder import DEFAULT_ONSPD, coords_by_query, geocode, load_postcode_table, summarize
 
 # ── NHS BSA CKAN package ID for bulk download ──────────────────────────────
 BSA_CKAN_API = "https://opendata.nhsbsa.net/api/3/action/package_show?id=240d142d-df82-4e97-b051-12371519e4e1"
-POSTCODES_IO_BULK = "https://api.postcodes.io/postcodes"
 
 # GB bounding box sanity check
 LON_MIN, LON_MAX = -8.2, 2.0
@@ -91,57 +92,18 @@ def parse_pharmacy_csv(csv_text: str) -> list[dict]:
     return records
 
 
-def geocode_postcodes(postcodes: list[str]) -> dict[str, tuple[float, float]]:
+def geocode_postcodes(
+    postcodes: list[str],
+    onspd_path: Path = DEFAULT_ONSPD,
+    outcode_fallback: bool = False,
+) -> dict[str, tuple[float, float]]:
     """
-    Bulk geocode a list of postcodes via postcodes.io.
-    Returns dict of normalised_postcode → (lon, lat).
-    Batches in groups of 100; retries once on failure.
+    Geocode a list of postcodes against the local ONSPD centroid table.
+    Returns dict of postcode (as given) → (lon, lat) for those that resolved.
     """
-    result: dict[str, tuple[float, float]] = {}
-    batch_size = 100
-    total = len(postcodes)
-    done = 0
-
-    for i in range(0, total, batch_size):
-        batch = postcodes[i : i + batch_size]
-        payload = json.dumps({"postcodes": batch}).encode()
-        req = urllib.request.Request(
-            POSTCODES_IO_BULK,
-            data=payload,
-            method="POST",
-            headers={"Content-Type": "application/json", "User-Agent": "valuemap-uk/1.0"},
-        )
-        try:
-            with urllib.request.urlopen(req, timeout=30) as r:
-                data = json.loads(r.read())
-        except Exception as e:
-            print(f"  Warning: batch {i // batch_size + 1} failed ({e}), retrying once...")
-            time.sleep(2)
-            try:
-                with urllib.request.urlopen(req, timeout=30) as r:
-                    data = json.loads(r.read())
-            except Exception as e2:
-                print(f"  Batch failed permanently: {e2}")
-                continue
-
-        for item in data.get("result") or []:
-            if item is None:
-                continue
-            res = item.get("result")
-            if not res:
-                continue
-            pc  = str(res.get("postcode") or "").upper().replace(" ", "")
-            lon = res.get("longitude")
-            lat = res.get("latitude")
-            if pc and lon is not None and lat is not None:
-                result[pc] = (float(lon), float(lat))
-
-        done += len(batch)
-        if (i // batch_size) % 10 == 0:
-            print(f"  Geocoded {done}/{total} postcodes ...")
-        time.sleep(0.1)  # be polite
-
-    return result
+    frame = geocode(postcodes, load_postcode_table(onspd_path), outcode_fallback=outcode_fallback)
+    print(f"  Match status: {summarize(frame)}")
+    return coords_by_query(frame)
 
 
 def build_geojson(records: list[dict], geo: dict[str, tuple[float, float]]) -> tuple[list[dict], int, int]:
@@ -201,6 +163,16 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Direct NHS BSA CSV URL (if not set, auto-detected via CKAN API)",
     )
+    p.add_argument(
+        "--onspd",
+        default=str(DEFAULT_ONSPD),
+        help="ONSPD postcode centroids CSV used for geocoding",
+    )
+    p.add_argument(
+        "--outcode-fallback",
+        action="store_true",
+        help="Place postcodes missing from ONSPD at their outward-code centroid",
+    )
     return p.parse_args()
 
 
@@ -220,10 +192,10 @@ def main() -> None:
     records = parse_pharmacy_csv(csv_text)
     print(f"  Community pharmacies found: {len(records):,}")
 
-    print("Step 4: Geocode postcodes via postcodes.io...")
+    print("Step 4: Geocode postcodes against ONSPD...")
     unique_postcodes = list({r["postcode_raw"] for r in records})
     print(f"  Unique postcodes to geocode: {len(unique_postcodes):,}")
-    geo = geocode_postcodes(unique_postcodes)
+    geo = geocode_postcodes(unique_postcodes, Path(args.onspd), args.outcode_fallback)
     print(f"  Successfully geocoded: {len(geo):,} postcodes")
 
     print("Step 5: Build GeoJSON features...")
@@ -15,10 +15,10 @@ Confidence tiers (stored as model_confidence):
   1 = Medium: n_years ≥ 2  AND ratio_cv < 0.30
   0 = Low   : fewer data or high variance — injected but treated with caution
 
-NOTE on the 1mile parquet:
-  The current grid_1mile_annual.parquet was built with years_back=1, giving at most
-  2 historical snapshots per cell. This caps n_years at 2 and max confidence at Medium.
-  Re-build with years_back=10 (matching the 5km/10km parquets) to unlock High confidence.
+Input:
+  data/model/property/grid_{1mile,5km,10km}_annual.parquet, written by
+  build_property_artifacts.py in the same pass as the grid JSON.  History depth is
+  set with --annual-years-back (default 10); n_years ≥ 4 is needed for High confidence.
 
 Output (per property_type × new_build combination):
   data/model/property/modelled_1mile_{PT}_{NB}.json.gz
@@ -10,7 +10,8 @@ Data source (download manually or via --download flag):
 Input:  ofsted_mi_state_schools.csv
 Output: primary_school_overlay_points.geojson.gz
 
-Uses postcodes.io batch lookup with the shared local cache to avoid repeated geocoding.
+Geocodes postcodes offline against the ONSPD centroid table (postcode_geocoder.py),
+sharing the school postcode cache so unchanged postcodes skip the lookup.
 
 Ofsted Overall Effectiveness grades:
     1 = Outstanding
@@ -26,7 +27,6 @@ import csv
 import gzip
 import json
 import re
-import time
 import urllib.request
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -37,6 +37,16 @@ from paths import (
     RAW_OFSTED_MI,
     ensure_pipeline_dirs,
 )
+from geocode_cache import GeocodeCache
+from postcode_geocoder import (
+    DEFAULT_ONSPD,
+    cache_entries,
+    geocode,
+    improved_entries,
+    is_exact_entry,
+    load_postcode_table,
+    summarize,
+)
 
 # ── Data constants ──────────────────────────────────────────────────────────
 
@@ -152,55 +162,6 @@ def parse_ungraded_outcome(raw: str) -> Optional[int]:
     return None
 
 
-def read_cache(path: Path) -> Dict[str, dict]:
-    if not path.exists():
-        return {}
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-
-def write_cache(path: Path, payload: Dict[str, dict]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
-
-
-def batch(iterable: List[str], size: int) -> List[List[str]]:
-    return [iterable[i : i + size] for i in range(0, len(iterable), size)]
-
-
-def fetch_postcodes_batch(keys: List[str], timeout: int = 40) -> Dict[str, dict]:
-    url = "https://api.postcodes.io/postcodes"
-    payload = {"postcodes": keys}
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        parsed = json.loads(resp.read().decode("utf-8"))
-
-    out: Dict[str, dict] = {}
-    for item in (parsed.get("result") or []):
-        query = normalize_postcode_key(item.get("query") or "")
-        result = item.get("result")
-        if not query:
-            continue
-        if not result:
-            out[query] = {"ok": False}
-            continue
-        lon = result.get("longitude")
-        lat = result.get("latitude")
-        if lon is None or lat is None:
-            out[query] = {"ok": False}
-            continue
-        out[query] = {
-            "ok": True,
-            "postcode": result.get("postcode"),
-            "longitude": float(lon),
-            "latitude": float(lat),
-        }
-    return out
-
-
 def download_ofsted_csv(dest: Path) -> None:
     """Download the latest Ofsted MI CSV to dest."""
     print(f"Downloading Ofsted MI CSV from gov.uk …")
@@ -338,10 +299,10 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build primary school Ofsted overlay GeoJSON")
     p.add_argument("--input",      default=str(RAW_OFSTED_MI),                       help="Ofsted MI CSV path")
     p.add_argument("--output",     default=str(MODEL_PRIMARY_SCHOOL_OVERLAY_POINTS),  help="Output GeoJSON .gz path")
-    p.add_argument("--cache",      default=str(INTERMEDIATE_SCHOOL_POSTCODE_CACHE),   help="Postcode coordinate cache JSON")
+    p.add_argument("--cache",      default=str(INTERMEDIATE_SCHOOL_POSTCODE_CACHE),   help="Postcode coordinate cache (SQLite)")
     p.add_argument("--download",   action="store_true",                               help="Download latest Ofsted MI CSV first")
-    p.add_argument("--batch-size", type=int, default=100,                             help="Postcodes.io batch size (max 100)")
-    p.add_argument("--pause-ms",   type=int, default=40,                              help="Pause between API batches (ms)")
+    p.add_argument("--onspd",      default=str(DEFAULT_ONSPD),                       help="ONSPD postcode centroids CSV used for geocoding")
+    p.add_argument("--outcode-fallback", action="store_true",                         help="Place postcodes missing from ONSPD at their outward-code centroid")
     p.add_argument("--all-phases", action="store_true",                               help="Include all school phases (not just primary)")
     return p.parse_args()
 
@@ -380,27 +341,22 @@ def main() -> None:
     all_postcodes = sorted({row["postcode_key"] for row in rows if row["postcode_key"]})
     print(f"Unique postcodes to geocode: {len(all_postcodes)}")
 
-    cache = read_cache(cache_path)
-    missing = [pc for pc in all_postcodes if pc not in cache]
-    print(f"Postcodes missing from cache: {len(missing)}")
-
-    batch_size = max(1, min(100, int(args.batch_size)))
-    pause_secs = max(0, int(args.pause_ms)) / 1000
-
-    for i, chunk in enumerate(batch(missing, batch_size), start=1):
-        try:
-            fetched = fetch_postcodes_batch(chunk)
-            cache.update(fetched)
-        except Exception as exc:
-            print(f"  Batch {i} error: {exc}")
-            for pc in chunk:
-                cache.setdefault(pc, {"ok": False})
-        if pause_secs > 0:
-            time.sleep(pause_secs)
-        if i % 20 == 0:
-            print(f"  Geocoding batch {i}, cache size={len(cache)}")
-
-    write_cache(cache_path, cache)
+    with GeocodeCache(cache_path) as store:
+        cache = store.get_many(all_postcodes)
+    missing = [pc for pc in all_postcodes if not is_exact_entry(cache.get(pc))]
+    print(f"Postcodes missing from cache (or only approximate): {len(missing)}")
+
+    if missing:
+        frame = geocode(
+            missing,
+            load_postcode_table(Path(args.onspd)),
+            outcode_fallback=args.outcode_fallback,
+        )
+        fetched = improved_entries(cache, cache_entries(frame))
+        cache.update(fetched)
+        with GeocodeCache(cache_path) as store:
+            store.put_many(fetched)
+        print(f"  ONSPD match status: {summarize(frame)}")
 
     geojson = build_geojson(rows, cache)
     write_geojson_gz(output_path, geojson)
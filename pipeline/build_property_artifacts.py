@@ -10,6 +10,8 @@ from typing import Iterable
 
 import pandas as pd
 
+import csv_ingest
+from cell_universe import build_cell_universe, write_cell_universe
 from paths import MODEL_PROPERTY_DIR, RAW_EPC_DIR, RAW_PROPERTY_DIR, ensure_pipeline_dirs
 
 GRID_SIZES = [1600, 5000, 10000, 25000]
@@ -17,6 +19,9 @@ DELTA_GRID_SIZES = [5000, 10000, 25000]
 GRID_LABEL_MAP = {1600: "1mile", 5000: "5km", 10000: "10km", 25000: "25km"}
 MEDIAN_YEARS_BACK_BY_GRID = {1600: 0, 5000: 5, 10000: 5, 25000: 5}
 PPSF_YEARS_BACK_BY_GRID = {1600: 0, 5000: 5, 10000: 5, 25000: 5}
+# Yearly snapshots written to grid_{label}_annual.parquet for build_price_model.py.
+# Windows beyond the JSON depth only need median + count, so extra years are cheap.
+ANNUAL_YEARS_BACK = 10
 # 1mile cells with fewer than this many transactions borrow their percentile shape
 # from the parent 5km cell (scaled to the 1mile cell's own median).
 PERCENTILE_DIRECT_TX_THRESHOLD = 10
@@ -43,6 +48,7 @@ PP_COLS = [
     "ppd_category",
     "record_status",
 ]
+PP_DATE_FORMATS = ["%Y-%m-%d %H:%M", "%Y-%m-%d"]
 
 
 def normalize_postcode_key(value: str) -> str:
@@ -61,6 +67,11 @@ def derive_outcode(postcode: str) -> str:
     return text[:-3] if len(text) > 3 else text
 
 
+def postcode_keys(series: pd.Series) -> pd.Series:
+    """Vectorised normalize_postcode_key (missing values become "")."""
+    return series.astype("string").str.upper().str.replace(r"\s+", "", regex=True).fillna("")
+
+
 def normalize_paon(value: str) -> str:
     if value is None or pd.isna(value):
         return ""
@@ -150,87 +161,75 @@ def load_onspd(path: Path) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"ONSPD input not found: {path}")
 
-    header = pd.read_csv(path, nrows=0)
-    cols = {c.lower().strip(): c for c in header.columns}
+    cols = {c.lower().strip(): c for c in csv_ingest.read_header(path)}
 
     postcode_col = cols.get("pcd7") or cols.get("pcds")
     east_col = cols.get("east1m") or cols.get("x")
     north_col = cols.get("north1m") or cols.get("y")
+    # Optional: country code (E92000001 …), used for the cell universe
+    ctry_col = cols.get("ctry") or next((c for k, c in cols.items() if re.fullmatch(r"ctry\d*cd", k)), None)
 
     if not postcode_col or not east_col or not north_col:
         raise RuntimeError("Unable to detect postcode/east/north columns in ONSPD")
 
-    frames: list[pd.DataFrame] = []
-    for chunk in pd.read_csv(
+    wanted = {postcode_col: "string", east_col: "float64", north_col: "float64"}
+    if ctry_col:
+        wanted[ctry_col] = "string"
+    out = csv_ingest.read_csv(
         path,
-        usecols=[postcode_col, east_col, north_col],
-        dtype={postcode_col: "string", east_col: "string", north_col: "string"},
-        chunksize=500_000,
-    ):
-        chunk = chunk.rename(columns={postcode_col: "postcode", east_col: "east", north_col: "north"})
-        chunk["postcode_key"] = chunk["postcode"].astype("string").map(normalize_postcode_key)
-        chunk["east"] = pd.to_numeric(chunk["east"], errors="coerce")
-        chunk["north"] = pd.to_numeric(chunk["north"], errors="coerce")
-        chunk = chunk.dropna(subset=["postcode_key", "east", "north"])
-        chunk = chunk[["postcode_key", "east", "north"]].drop_duplicates("postcode_key")
-        frames.append(chunk)
-
-    if not frames:
+        wanted,
+        filters=[(postcode_col, "notnull", None), (east_col, "notnull", None), (north_col, "notnull", None)],
+    )
+    if out.empty:
         raise RuntimeError("No valid rows found in ONSPD")
 
-    out = pd.concat(frames, ignore_index=True)
-    out = out.drop_duplicates("postcode_key")
-    return out
+    out = out.rename(columns={east_col: "east", north_col: "north"})
+    out["postcode_key"] = postcode_keys(out[postcode_col])
+    out = out[out["postcode_key"].str.len() > 0]
+    keep = ["postcode_key", "east", "north"]
+    if ctry_col:
+        out["country"] = out[ctry_col].str.strip().str[:1].str.upper().astype("category")
+        keep.append("country")
+    return out[keep].drop_duplicates("postcode_key").reset_index(drop=True)
 
 
 def load_pp(path: Path, years_back: int) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"PP input not found: {path}")
 
-    today = pd.Timestamp.today().normalize().date()
-    cutoff = (pd.Timestamp.today().normalize() - pd.DateOffset(years=years_back)).date()
-    frames: list[pd.DataFrame] = []
+    today = pd.Timestamp.today().normalize()
+    cutoff = today - pd.DateOffset(years=years_back)
 
-    for chunk in pd.read_csv(
+    df = csv_ingest.read_csv(
         path,
-        header=None,
-        names=PP_COLS,
-        usecols=["price", "date", "postcode", "paon", "property_type", "new_build", "record_status"],
-        dtype={
-            "price": "string",
-            "date": "string",
+        {
+            "price": "float64",
+            "date": "timestamp",
             "postcode": "string",
             "paon": "string",
             "property_type": "string",
             "new_build": "string",
             "record_status": "string",
         },
-        chunksize=500_000,
-    ):
-        chunk["date"] = pd.to_datetime(chunk["date"], errors="coerce")
-        chunk = chunk[chunk["date"].notna()]
-        chunk = chunk[chunk["record_status"].astype("string") == "A"]
-        chunk = chunk[chunk["date"].dt.date >= cutoff]
-        chunk = chunk[chunk["date"].dt.date <= today]
-
-        if chunk.empty:
-            continue
-
-        chunk["price"] = pd.to_numeric(chunk["price"], errors="coerce")
-        chunk = chunk[chunk["price"].notna() & (chunk["price"] > 0)]
-        chunk["postcode_key"] = chunk["postcode"].astype("string").map(normalize_postcode_key)
-        chunk = chunk[chunk["postcode_key"].astype("string").str.len() > 0]
-        chunk["paon_key"] = chunk["paon"].astype("string").map(normalize_paon)
-        chunk["month"] = chunk["date"].dt.to_period("M").dt.to_timestamp()
-        chunk["property_type"] = chunk["property_type"].astype("string").fillna("ALL")
-        chunk["new_build"] = chunk["new_build"].astype("string").fillna("ALL")
-
-        frames.append(chunk[["price", "date", "month", "postcode", "postcode_key", "paon_key", "property_type", "new_build"]])
-
-    if not frames:
+        column_names=PP_COLS,
+        timestamp_formats=PP_DATE_FORMATS,
+        filters=[
+            ("record_status", "==", "A"),
+            ("date", ">=", cutoff),
+            ("date", "<", today + pd.Timedelta(days=1)),
+            ("price", ">", 0),
+        ],
+    )
+    df["postcode_key"] = postcode_keys(df["postcode"])
+    df = df[df["postcode_key"].str.len() > 0]
+    if df.empty:
         raise RuntimeError("No valid rows found in PP file after filtering")
 
-    return pd.concat(frames, ignore_index=True)
+    df["paon_key"] = df["paon"].map(normalize_paon)
+    df["month"] = df["date"].dt.to_period("M").dt.to_timestamp()
+    df["property_type"] = df["property_type"].fillna("ALL")
+    df["new_build"] = df["new_build"].fillna("ALL")
+    return df[["price", "date", "month", "postcode", "postcode_key", "paon_key", "property_type", "new_build"]].reset_index(drop=True)
 
 
 def load_scotland_properties(
@@ -243,48 +242,32 @@ def load_scotland_properties(
         return pd.DataFrame(columns=["price", "month", "postcode", "postcode_key", "paon_key", "property_type", "new_build"])
 
     today = pd.Timestamp.today().normalize()
-    frames: list[pd.DataFrame] = []
 
-    for chunk in pd.read_csv(
+    # Date and Price are free-form text (dd-mm-yyyy / "£123,000"), so they are
+    # read as strings and parsed here rather than typed by the reader.
+    scotland = csv_ingest.read_csv(
         path,
-        usecols=["Postcode", "Date", "Price"],
-        dtype={"Postcode": "string", "Date": "string", "Price": "string"},
-        chunksize=500_000,
-    ):
-        chunk = chunk.rename(columns={"Postcode": "postcode", "Date": "date", "Price": "price"})
-        chunk["date"] = parse_scot_date(chunk["date"])
-        chunk = chunk[chunk["date"].notna()]
-        chunk = chunk[chunk["date"] <= today]
-
-        if chunk.empty:
-            continue
-
-        chunk["price"] = (
-            chunk["price"]
-            .astype("string")
-            .str.replace(r"[^\d\.-]", "", regex=True)
-            .replace("", pd.NA)
-        )
-        chunk["price"] = pd.to_numeric(chunk["price"], errors="coerce")
-        chunk = chunk[chunk["price"].notna() & (chunk["price"] > 0)]
-
-        if chunk.empty:
-            continue
-
-        chunk["postcode_key"] = chunk["postcode"].astype("string").map(normalize_postcode_key)
-        chunk = chunk[chunk["postcode_key"].astype("string").str.len() > 0]
-        chunk["month"] = chunk["date"].dt.to_period("M").dt.to_timestamp()
-
-        chunk["property_type"] = "D"
-        chunk["new_build"] = "N"
-        chunk["paon_key"] = ""
-
-        frames.append(chunk[["price", "date", "month", "postcode", "postcode_key", "paon_key", "property_type", "new_build"]])
+        {"Postcode": "string", "Date": "string", "Price": "string"},
+        filters=[("Postcode", "notnull", None), ("Date", "notnull", None), ("Price", "notnull", None)],
+    )
+    scotland = scotland.rename(columns={"Postcode": "postcode", "Date": "date", "Price": "price"})
+    scotland["date"] = parse_scot_date(scotland["date"])
+    scotland = scotland[scotland["date"].notna() & (scotland["date"] <= today)]
+    scotland["price"] = pd.to_numeric(
+        scotland["price"].str.replace(r"[^\d\.-]", "", regex=True).replace("", pd.NA),
+        errors="coerce",
+    )
+    scotland = scotland[scotland["price"].notna() & (scotland["price"] > 0)].copy()
+    scotland["postcode_key"] = postcode_keys(scotland["postcode"])
+    scotland = scotland[scotland["postcode_key"].str.len() > 0]
 
-    if not frames:
+    if scotland.empty:
         return pd.DataFrame(columns=["price", "month", "postcode", "postcode_key", "paon_key", "property_type", "new_build"])
 
-    scotland = pd.concat(frames, ignore_index=True)
+    scotland["month"] = scotland["date"].dt.to_period("M").dt.to_timestamp()
+    scotland["property_type"] = "D"
+    scotland["new_build"] = "N"
+    scotland["paon_key"] = ""
 
     daily_counts = scotland.groupby(scotland["date"].dt.normalize()).size().sort_index()
     if daily_counts.empty:
@@ -322,8 +305,7 @@ def load_epc_latest(path: Path) -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"EPC input not found: {path}")
 
-    header = pd.read_csv(path, nrows=0)
-    cols = {c.lower().strip(): c for c in header.columns}
+    cols = {c.lower().strip(): c for c in csv_ingest.read_header(path)}
 
     postcode_col = cols.get("postcode")
     address_col = cols.get("address1") or cols.get("address")
@@ -334,42 +316,39 @@ def load_epc_latest(path: Path) -> pd.DataFrame:
     if not postcode_col or not address_col or not floor_area_col:
         raise RuntimeError("Unable to detect required EPC columns (postcode/address/total_floor_area)")
 
-    usecols = [postcode_col, address_col, floor_area_col]
+    columns = {postcode_col: "string", address_col: "string", floor_area_col: "float64"}
     if rooms_col:
-        usecols.append(rooms_col)
+        columns[rooms_col] = "float64"
     if inspection_col:
-        usecols.append(inspection_col)
-
-    frames: list[pd.DataFrame] = []
-    for chunk in pd.read_csv(path, usecols=usecols, dtype="string", low_memory=False, chunksize=500_000):
-        chunk = chunk.rename(
-            columns={
-                postcode_col: "postcode",
-                address_col: "address",
-                floor_area_col: "TOTAL_FLOOR_AREA",
-                rooms_col: "NUMBER_HABITABLE_ROOMS" if rooms_col else "NUMBER_HABITABLE_ROOMS",
-                inspection_col: "INSPECTION_DATE" if inspection_col else "INSPECTION_DATE",
-            }
-        )
-        chunk["postcode_key"] = chunk["postcode"].map(normalize_postcode_key)
-        chunk["paon_raw"] = chunk["address"].map(extract_paon_from_epc_address)
-        chunk["paon_key"] = chunk["paon_raw"].map(normalize_paon)
-        chunk["TOTAL_FLOOR_AREA"] = pd.to_numeric(chunk["TOTAL_FLOOR_AREA"], errors="coerce")
-        if "NUMBER_HABITABLE_ROOMS" in chunk.columns:
-            chunk["NUMBER_HABITABLE_ROOMS"] = pd.to_numeric(chunk["NUMBER_HABITABLE_ROOMS"], errors="coerce")
-        else:
-            chunk["NUMBER_HABITABLE_ROOMS"] = pd.NA
-        if "INSPECTION_DATE" in chunk.columns:
-            chunk["INSPECTION_DATE"] = pd.to_datetime(chunk["INSPECTION_DATE"], errors="coerce")
-        else:
-            chunk["INSPECTION_DATE"] = pd.NaT
-        chunk = chunk[(chunk["postcode_key"].astype("string").str.len() > 0) & (chunk["paon_key"].astype("string").str.len() > 0)]
-        frames.append(chunk[["postcode_key", "paon_key", "TOTAL_FLOOR_AREA", "NUMBER_HABITABLE_ROOMS", "INSPECTION_DATE"]])
+        columns[inspection_col] = "timestamp"
 
-    if not frames:
+    epc = csv_ingest.read_csv(
+        path,
+        columns,
+        filters=[(postcode_col, "notnull", None), (address_col, "notnull", None)],
+        null_values=csv_ingest.EPC_NULL_VALUES,
+    )
+    epc = epc.rename(
+        columns={
+            postcode_col: "postcode",
+            address_col: "address",
+            floor_area_col: "TOTAL_FLOOR_AREA",
+            **({rooms_col: "NUMBER_HABITABLE_ROOMS"} if rooms_col else {}),
+            **({inspection_col: "INSPECTION_DATE"} if inspection_col else {}),
+        }
+    )
+    if "NUMBER_HABITABLE_ROOMS" not in epc.columns:
+        epc["NUMBER_HABITABLE_ROOMS"] = pd.NA
+    if "INSPECTION_DATE" not in epc.columns:
+        epc["INSPECTION_DATE"] = pd.NaT
+
+    epc["postcode_key"] = postcode_keys(epc["postcode"])
+    epc["paon_key"] = epc["address"].map(extract_paon_from_epc_address).map(normalize_paon)
+    epc = epc[(epc["postcode_key"].str.len() > 0) & (epc["paon_key"].str.len() > 0)]
+    if epc.empty:
         return pd.DataFrame(columns=["postcode_key", "paon_key", "TOTAL_FLOOR_AREA", "NUMBER_HABITABLE_ROOMS", "INSPECTION_DATE"])
 
-    epc = pd.concat(frames, ignore_index=True)
+    epc = epc[["postcode_key", "paon_key", "TOTAL_FLOOR_AREA", "NUMBER_HABITABLE_ROOMS", "INSPECTION_DATE"]]
     epc = epc.sort_values("INSPECTION_DATE").drop_duplicates(subset=["postcode_key", "paon_key"], keep="last")
     return epc
 
@@ -554,28 +533,71 @@ def yearly_end_months(month_col: pd.Series, years_back: int) -> list[pd.Timestam
     return end_months
 
 
-def build_grid_outputs(df: pd.DataFrame, output_dir: Path, latest_end_month: pd.Timestamp) -> None:
+def month_window(df: pd.DataFrame, end_month: pd.Timestamp) -> pd.DataFrame:
+    """Trailing 12-month window ending at end_month.  df must be sorted by month."""
+    start_month = (end_month - pd.DateOffset(months=11)).to_period("M").to_timestamp()
+    months = df["month"].to_numpy()
+    lo = months.searchsorted(start_month.to_datetime64(), side="left")
+    hi = months.searchsorted(pd.Timestamp(end_month).to_datetime64(), side="right")
+    return df.iloc[lo:hi]
+
+
+def write_annual_stack(parts: list[pd.DataFrame], path: Path) -> None:
+    """Write the yearly median stack consumed by build_price_model.py."""
+    if parts:
+        annual = pd.concat(parts, ignore_index=True)
+    else:
+        annual = pd.DataFrame(columns=["property_type", "new_build", "median_price_12m", "sales_12m", "end_month"])
+    annual["property_type"] = annual["property_type"].astype(str)
+    annual["new_build"] = annual["new_build"].astype(str)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    annual.to_parquet(path, index=False)
+    print(f"  Annual stack written: {path.name} ({len(annual):,} rows)")
+
+
+def build_grid_outputs(
+    df: pd.DataFrame,
+    output_dir: Path,
+    latest_end_month: pd.Timestamp,
+    annual_years_back: int = ANNUAL_YEARS_BACK,
+) -> None:
+    if not df["month"].is_monotonic_increasing:
+        df = df.sort_values("month", kind="stable")
+
     # Pre-compute 5km aggregate for the latest 12-month window.  Used to borrow
     # percentile shapes into 1mile cells with < PERCENTILE_DIRECT_TX_THRESHOLD sales.
-    latest_start = (latest_end_month - pd.DateOffset(months=11)).to_period("M").to_timestamp()
-    latest_window = df[(df["month"] >= latest_start) & (df["month"] <= latest_end_month)].copy()
+    latest_window = month_window(df, latest_end_month)
     parent_5km_agg = aggregate_segments(latest_window, 5000) if not latest_window.empty else pd.DataFrame()
     national_ratios = compute_national_ratios(parent_5km_agg)
 
     for g in GRID_SIZES:
         years_back = MEDIAN_YEARS_BACK_BY_GRID.get(g, 0)
-        end_months = yearly_end_months(df["month"], years_back=years_back)
+        end_months = yearly_end_months(df["month"], years_back=max(years_back, annual_years_back))
         gx = f"gx_{g}"
         gy = f"gy_{g}"
 
         rows: list[dict] = []
-        for end_month in end_months:
-            start_month = (end_month - pd.DateOffset(months=11)).to_period("M").to_timestamp()
-            window = df[(df["month"] >= start_month) & (df["month"] <= end_month)].copy()
+        annual_parts: list[pd.DataFrame] = []
+        for i, end_month in enumerate(end_months):
+            window = month_window(df, end_month)
             if window.empty:
                 continue
 
+            if i > years_back:
+                # Annual-only snapshot: no JSON rows, so skip the percentile pass.
+                agg = aggregate_segments_metric(window, g, metric_col="price", out_metric_col="median")
+                annual_parts.append(
+                    agg.rename(columns={"median": "median_price_12m", "tx_count": "sales_12m"}).assign(end_month=end_month)
+                )
+                continue
+
             agg = aggregate_segments(window, g)
+            if i <= annual_years_back:
+                annual_parts.append(
+                    agg[[gx, gy, "property_type", "new_build", "median", "tx_count"]]
+                    .rename(columns={"median": "median_price_12m", "tx_count": "sales_12m"})
+                    .assign(end_month=end_month)
+                )
             if g == 1600:
                 agg = apply_1mile_percentile_borrowing(agg, parent_5km_agg, national_ratios)
             end_month_str = pd.to_datetime(end_month).strftime("%Y-%m-%d")
@@ -599,6 +621,7 @@ def build_grid_outputs(df: pd.DataFrame, output_dir: Path, latest_end_month: pd.
                 rows.append(row)
 
         dump_json_gz(output_dir / f"grid_{GRID_LABEL_MAP[g]}_full.json.gz", rows)
+        write_annual_stack(annual_parts, output_dir / f"grid_{GRID_LABEL_MAP[g]}_annual.parquet")
 
         if g == 1600:
             # Build a compact percentile lookup for right-click lookups.
@@ -754,6 +777,24 @@ def build_delta_outputs(df: pd.DataFrame, output_dir: Path, latest_end_month: pd
         dump_json_gz(output_dir / f"deltas_overall_{GRID_LABEL_MAP[g]}.json.gz", rows)
 
 
+def build_cell_universes(df: pd.DataFrame, output_dir: Path, latest_end_month: pd.Timestamp) -> None:
+    """
+    Write cell_universe_{label}.parquet: the populated cells downstream builders
+    iterate over.  Each grid's universe spans the same yearly windows as its
+    grid_{label}_full rows (MEDIAN_YEARS_BACK_BY_GRID), so it holds exactly the
+    cells the map can show.  df must be sorted by month.
+    """
+    latest_start_month = (latest_end_month - pd.DateOffset(months=11)).to_period("M").to_timestamp()
+    months = df["month"].to_numpy()
+    for g in GRID_SIZES:
+        end_months = yearly_end_months(df["month"], years_back=MEDIAN_YEARS_BACK_BY_GRID.get(g, 0))
+        start_month = (end_months[-1] - pd.DateOffset(months=11)).to_period("M").to_timestamp()
+        published = df.iloc[months.searchsorted(start_month.to_datetime64(), side="left"):]
+        universe = build_cell_universe(published, g, latest_start_month)
+        path = write_cell_universe(universe, GRID_LABEL_MAP[g], output_dir)
+        print(f"  Cell universe written: {path.name} ({len(universe):,} cells)")
+
+
 def build_postcode_indexes(onspd: pd.DataFrame, output_dir: Path) -> None:
     work = onspd.copy()
     work["outcode"] = work["postcode_key"].map(derive_outcode)
@@ -792,6 +833,12 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--output-dir", default=str(MODEL_PROPERTY_DIR), help="Output directory for property artifacts")
     parser.add_argument("--years-back", type=int, default=10, help="Number of years of PP data to include")
+    parser.add_argument(
+        "--annual-years-back",
+        type=int,
+        default=ANNUAL_YEARS_BACK,
+        help="Yearly snapshots (besides the latest) in grid_{label}_annual.parquet for the price model",
+    )
     return parser.parse_args()
 
 
@@ -816,11 +863,13 @@ def main() -> None:
     )
     if not scotland.empty:
         pp = pd.concat([pp, scotland], ignore_index=True)
-    merged = with_grid_cells(pp, onspd)
+    # Sorted by month so each 12-month window is a contiguous slice (see month_window).
+    merged = with_grid_cells(pp, onspd).sort_values("month", kind="stable", ignore_index=True)
 
     latest_end_month = merged["month"].max()
 
-    build_grid_outputs(merged, output_dir, latest_end_month)
+    build_cell_universes(merged, output_dir, latest_end_month)
+    build_grid_outputs(merged, output_dir, latest_end_month, annual_years_back=max(0, int(args.annual_years_back)))
     build_ppsf_outputs(merged, epc_latest, output_dir)
     build_delta_outputs(merged, output_dir, latest_end_month)
     build_postcode_indexes(onspd, output_dir)
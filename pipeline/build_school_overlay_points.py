@@ -3,9 +3,10 @@
 Build school overlay GeoJSON points from postcode-scored school rows.
 
 Input:  school_postcode_scores_202425_mainstream.csv (or compatible)
-Output: school_overlay_points.geojson.gz + optional postcode coord cache JSON
+Output: school_overlay_points.geojson.gz + shared postcode coord cache (SQLite)
 
-Uses postcodes.io batch lookup with a local cache to avoid repeated geocoding.
+Geocodes postcodes offline against the ONSPD centroid table (postcode_geocoder.py),
+with a local cache so unchanged postcodes skip the lookup entirely.
 """
 
 from __future__ import annotations
@@ -16,8 +17,6 @@ import gzip
 import json
 import math
 import re
-import time
-import urllib.request
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -27,6 +26,16 @@ from paths import (
     MODEL_SCHOOL_OVERLAY_POINTS,
     ensure_pipeline_dirs,
 )
+from geocode_cache import GeocodeCache
+from postcode_geocoder import (
+    DEFAULT_ONSPD,
+    cache_entries,
+    geocode,
+    improved_entries,
+    is_exact_entry,
+    load_postcode_table,
+    summarize,
+)
 
 MISSING = {"", "na", "np", "ne", "supp", "null", "x", "z", "c"}
 
@@ -49,55 +58,6 @@ def to_float(value: Optional[str]) -> Optional[float]:
         return None
 
 
-def read_cache(path: Path) -> Dict[str, Dict[str, object]]:
-    if not path.exists():
-        return {}
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return {}
-
-
-def write_cache(path: Path, payload: Dict[str, Dict[str, object]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
-
-
-def batch(iterable: List[str], size: int) -> List[List[str]]:
-    return [iterable[i : i + size] for i in range(0, len(iterable), size)]
-
-
-def fetch_postcodes_batch(keys: List[str], timeout: int = 40) -> Dict[str, Dict[str, object]]:
-    url = "https://api.postcodes.io/postcodes"
-    payload = {"postcodes": keys}
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        parsed = json.loads(resp.read().decode("utf-8"))
-
-    out: Dict[str, Dict[str, object]] = {}
-    for item in parsed.get("result") or []:
-        query = normalize_postcode_key(item.get("query") or "")
-        result = item.get("result")
-        if not query:
-            continue
-        if not result:
-            out[query] = {"ok": False}
-            continue
-        lon = result.get("longitude")
-        lat = result.get("latitude")
-        if lon is None or lat is None:
-            out[query] = {"ok": False}
-            continue
-        out[query] = {
-            "ok": True,
-            "postcode": result.get("postcode"),
-            "longitude": float(lon),
-            "latitude": float(lat),
-        }
-    return out
-
-
 def load_rows(path: Path, min_quality: float) -> List[dict]:
     rows: List[dict] = []
     with path.open("r", encoding="utf-8-sig", newline="") as f:
@@ -184,9 +144,9 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Build school overlay GeoJSON points from postcode score CSV")
     p.add_argument("--input", default=str(INTERMEDIATE_SCHOOL_POSTCODE_SCORES_MAINSTREAM), help="Input school postcode score CSV")
     p.add_argument("--output", default=str(MODEL_SCHOOL_OVERLAY_POINTS), help="Output GeoJSON .gz path")
-    p.add_argument("--cache", default=str(INTERMEDIATE_SCHOOL_POSTCODE_CACHE), help="Postcode coordinate cache JSON path")
-    p.add_argument("--batch-size", type=int, default=100, help="Postcodes.io batch size (max 100)")
-    p.add_argument("--pause-ms", type=int, default=40, help="Pause between API batches")
+    p.add_argument("--cache", default=str(INTERMEDIATE_SCHOOL_POSTCODE_CACHE), help="Postcode coordinate cache (SQLite) path")
+    p.add_argument("--onspd", default=str(DEFAULT_ONSPD), help="ONSPD postcode centroids CSV used for geocoding")
+    p.add_argument("--outcode-fallback", action="store_true", help="Place postcodes missing from ONSPD at their outward-code centroid")
     p.add_argument("--good-threshold", type=float, default=0.60, help="Quality score threshold for good schools")
     p.add_argument("--min-quality", type=float, default=0.0, help="Optional filter to keep only rows >= this quality")
     return p.parse_args()
@@ -202,25 +162,21 @@ def main() -> None:
     rows = load_rows(input_path, min_quality=args.min_quality)
     all_postcodes = sorted({row["postcode_key"] for row in rows if row["postcode_key"]})
 
-    cache = read_cache(cache_path)
-    missing = [pc for pc in all_postcodes if pc not in cache]
-
-    batch_size = max(1, min(100, int(args.batch_size)))
-    pause_secs = max(0, int(args.pause_ms)) / 1000
-
-    for i, chunk in enumerate(batch(missing, batch_size), start=1):
-        try:
-            fetched = fetch_postcodes_batch(chunk)
-            cache.update(fetched)
-        except Exception:
-            for pc in chunk:
-                cache.setdefault(pc, {"ok": False})
-        if pause_secs > 0:
-            time.sleep(pause_secs)
-        if i % 20 == 0:
-            print(f"Geocoding batch {i}, cached={len(cache)}")
-
-    write_cache(cache_path, cache)
+    with GeocodeCache(cache_path) as store:
+        cache = store.get_many(all_postcodes)
+    missing = [pc for pc in all_postcodes if not is_exact_entry(cache.get(pc))]
+
+    if missing:
+        frame = geocode(
+            missing,
+            load_postcode_table(Path(args.onspd)),
+            outcode_fallback=args.outcode_fallback,
+        )
+        fetched = improved_entries(cache, cache_entries(frame))
+        cache.update(fetched)
+        with GeocodeCache(cache_path) as store:
+            store.put_many(fetched)
+        print(f"Geocoded {len(missing)} postcodes against ONSPD ({summarize(frame)})")
 
     geojson = build_geojson(rows, cache, good_threshold=float(args.good_threshold))
     write_geojson_gz(output_path, geojson)
@@ -2,18 +2,28 @@
 import argparse
 import gzip
 import json
-import math
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 from pyproj import Transformer
+from cell_universe import load_cell_universe
 from paths import (
+    MODEL_PROPERTY_DIR,
     MODEL_VOTE_BLOCKS_MAP_GEOJSON,
     MODEL_VOTE_DIR,
     PUBLIC_DATA_DIR,
     ensure_pipeline_dirs,
 )
+from polygon_raster import (
+    DEFAULT_SUPERSAMPLE,
+    PolygonPart,
+    geometry_parts,
+    cached_weights,
+    load_json_maybe_gz,
+    match_polygons,
+)
 
 
 @dataclass
@@ -25,135 +35,133 @@ class VoteValues:
     country: Optional[str]  # single char: E/W/S/N (from PCON24CD prefix)
 
 
-@dataclass
-class PolygonPart:
-    outer: List[Tuple[float, float]]
-    holes: List[List[Tuple[float, float]]]
-
-
 @dataclass
 class PolygonRecord:
+    key: str                   # ons_id / PCON24CD
     bbox: Tuple[float, float, float, float]
     parts: List[PolygonPart]
     values: VoteValues
 
 
-def load_json_maybe_gz(path: Path):
-    if path.suffix == ".gz":
-        with gzip.open(path, "rt", encoding="utf-8") as f:
-            return json.load(f)
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def point_in_ring(lon: float, lat: float, ring: List[Tuple[float, float]]) -> bool:
-    inside = False
-    n = len(ring)
-    if n < 3:
-        return False
-    j = n - 1
-    for i in range(n):
-        xi, yi = ring[i]
-        xj, yj = ring[j]
-        intersects = ((yi > lat) != (yj > lat)) and (
-            lon < (xj - xi) * (lat - yi) / ((yj - yi) if (yj - yi) != 0 else 1e-18) + xi
-        )
-        if intersects:
-            inside = not inside
-        j = i
-    return inside
-
-
-def point_in_polygon_parts(lon: float, lat: float, parts: List[PolygonPart]) -> bool:
-    for part in parts:
-        if not point_in_ring(lon, lat, part.outer):
-            continue
-        in_hole = any(point_in_ring(lon, lat, hole) for hole in part.holes)
-        if not in_hole:
-            return True
-    return False
-
-
-def ring_bbox(ring: List[Tuple[float, float]]) -> Tuple[float, float, float, float]:
-    lons = [p[0] for p in ring]
-    lats = [p[1] for p in ring]
-    return min(lons), min(lats), max(lons), max(lats)
-
-
-def merge_bbox(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]):
-    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
-
-
 def parse_vote_polygons(vote_geojson: dict) -> List[PolygonRecord]:
     records: List[PolygonRecord] = []
     for feature in vote_geojson.get("features", []):
         props = feature.get("properties", {})
-        geom = feature.get("geometry") or {}
-        gtype = geom.get("type")
-        coords = geom.get("coordinates")
-        if gtype not in {"Polygon", "MultiPolygon"} or not coords:
+        parts, bbox = geometry_parts(feature.get("geometry") or {})
+        if not parts or bbox is None:
             continue
 
+        key = str(props.get("ons_id") or props.get("PCON24CD") or "").strip()
         values = VoteValues(
             pct_progressive=float(props.get("pct_progressive", 0) or 0),
             pct_conservative=float(props.get("pct_conservative", 0) or 0),
             pct_popular_right=float(props.get("pct_popular_right", 0) or 0),
             constituency=props.get("constituency") or props.get("PCON24NM"),
-            country=(props.get("ons_id") or props.get("PCON24CD") or "")[:1].upper() or None,
+            country=key[:1].upper() or None,
         )
-
-        polygon_sets = [coords] if gtype == "Polygon" else coords
-        parts: List[PolygonPart] = []
-        bbox: Optional[Tuple[float, float, float, float]] = None
-
-        for poly in polygon_sets:
-            if not poly:
-                continue
-            outer = [(float(x), float(y)) for x, y in poly[0]]
-            holes = [[(float(x), float(y)) for x, y in ring] for ring in poly[1:]]
-            parts.append(PolygonPart(outer=outer, holes=holes))
-            outer_bbox = ring_bbox(outer)
-            bbox = outer_bbox if bbox is None else merge_bbox(bbox, outer_bbox)
-
-        if parts and bbox is not None:
-            records.append(PolygonRecord(bbox=bbox, parts=parts, values=values))
+        records.append(PolygonRecord(key=key, bbox=bbox, parts=parts, values=values))
 
     return records
 
 
-def build_tile_index(polygons: List[PolygonRecord], tile_deg: float) -> Dict[Tuple[int, int], List[int]]:
-    index: Dict[Tuple[int, int], List[int]] = {}
-    for idx, poly in enumerate(polygons):
-        min_lon, min_lat, max_lon, max_lat = poly.bbox
-        x0 = math.floor(min_lon / tile_deg)
-        x1 = math.floor(max_lon / tile_deg)
-        y0 = math.floor(min_lat / tile_deg)
-        y1 = math.floor(max_lat / tile_deg)
-        for tx in range(x0, x1 + 1):
-            for ty in range(y0, y1 + 1):
-                index.setdefault((tx, ty), []).append(idx)
-    return index
+def unique_cells(rows: list) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct (gx, gy) of the grid rows, in order of first appearance.
+
+    grid_<size>_full rows repeat each cell once per month / property type.
+    """
+    gxy = np.array([(int(r["gx"]), int(r["gy"])) for r in rows], dtype=np.int64).reshape(-1, 2)
+    _, first = np.unique(gxy, axis=0, return_index=True)
+    cells = gxy[np.sort(first)]
+    return cells[:, 0], cells[:, 1]
+
+
+def load_cells(
+    grid_rows_path: Path, grid_label: Optional[str], universe_dir: Optional[Path]
+) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Cells to compute: the property build's cell universe if present, else the grid rows."""
+    if grid_label is not None:
+        try:
+            universe = load_cell_universe(grid_label, universe_dir, columns=["gx", "gy"])
+        except FileNotFoundError:
+            pass
+        else:
+            return (
+                universe["gx"].to_numpy(np.int64),
+                universe["gy"].to_numpy(np.int64),
+                f"cell_universe_{grid_label}",
+            )
+    gx, gy = unique_cells(load_json_maybe_gz(grid_rows_path))
+    return gx, gy, grid_rows_path.name
+
+
+def vote_row(gx: int, gy: int, values: VoteValues) -> dict:
+    return {
+        "gx": gx,
+        "gy": gy,
+        "pct_progressive": values.pct_progressive,
+        "pct_conservative": values.pct_conservative,
+        "pct_popular_right": values.pct_popular_right,
+        "constituency": values.constituency,
+        "country": values.country,
+    }
+
+
+def centroid_rows(
+    polygons: List[PolygonRecord], gx: np.ndarray, gy: np.ndarray, grid_meters: int
+) -> Tuple[List[dict], int]:
+    """Each cell takes the values of the constituency containing its centroid."""
+    transformer = Transformer.from_crs("EPSG:27700", "EPSG:4326", always_xy=True)
+    # One centroid per distinct cell, projected in a single array transform
+    lon, lat = transformer.transform(gx + grid_meters / 2, gy + grid_meters / 2)
+    match = match_polygons(np.asarray(lon), np.asarray(lat), polygons)
+
+    output_rows = [
+        vote_row(cell_gx, cell_gy, polygons[idx].values)
+        for cell_gx, cell_gy, idx in zip(gx.tolist(), gy.tolist(), match.tolist())
+        if idx >= 0
+    ]
+    return output_rows, int((match < 0).sum())
 
 
-def match_polygon(
-    lon: float,
-    lat: float,
+def area_rows(
     polygons: List[PolygonRecord],
-    tile_index: Dict[Tuple[int, int], List[int]],
-    tile_deg: float,
-) -> Optional[PolygonRecord]:
-    tx = math.floor(lon / tile_deg)
-    ty = math.floor(lat / tile_deg)
-    candidate_ids = tile_index.get((tx, ty), [])
-
-    for idx in candidate_ids:
-        poly = polygons[idx]
-        min_lon, min_lat, max_lon, max_lat = poly.bbox
-        if lon < min_lon or lon > max_lon or lat < min_lat or lat > max_lat:
+    gx: np.ndarray,
+    gy: np.ndarray,
+    grid_meters: int,
+    supersample: int,
+) -> Tuple[List[dict], int]:
+    """
+    Vote shares are the area-weighted mean over the constituencies covering
+    each cell (polygon_raster weights, cached); constituency and country are
+    those of the constituency covering the largest share of the cell.
+
+    The weights are keyed on the polygons' keys and geometry only, so new vote
+    figures on the same boundaries reuse the cached raster.
+    """
+    keyed = [p for p in polygons if p.key]
+    if not keyed:
+        raise SystemExit("No vote polygons with an ons_id or PCON24CD key; cannot build area weights.")
+    weights = cached_weights(keyed, gx, gy, grid_meters, supersample, name="constituencies")
+    by_key = {p.key: p.values for p in keyed}
+    shares = weights.apply(weights.align({
+        key: [v.pct_progressive, v.pct_conservative, v.pct_popular_right]
+        for key, v in by_key.items()
+    }))
+    dominant = weights.dominant()
+
+    output_rows = []
+    misses = 0
+    for i, idx in enumerate(dominant.tolist()):
+        values = by_key.get(weights.keys[idx]) if idx >= 0 else None
+        if values is None or np.isnan(shares[i]).any():
+            misses += 1
             continue
-        if point_in_polygon_parts(lon, lat, poly.parts):
-            return poly
-    return None
+        prog, cons, right = (round(float(x), 2) for x in shares[i])
+        output_rows.append(vote_row(
+            int(gx[i]), int(gy[i]),
+            VoteValues(prog, cons, right, values.constituency, values.country),
+        ))
+    return output_rows, misses
 
 
 def build_vote_cells(
@@ -161,41 +169,19 @@ def build_vote_cells(
     grid_rows_path: Path,
     output_path: Path,
     grid_meters: int,
-    tile_deg: float,
+    assign: str = "area",
+    supersample: int = DEFAULT_SUPERSAMPLE,
+    grid_label: Optional[str] = None,
+    universe_dir: Optional[Path] = None,
 ):
     vote_geojson = load_json_maybe_gz(vote_geojson_path)
-    rows = load_json_maybe_gz(grid_rows_path)
 
     polygons = parse_vote_polygons(vote_geojson)
-    tile_index = build_tile_index(polygons, tile_deg)
-    transformer = Transformer.from_crs("EPSG:27700", "EPSG:4326", always_xy=True)
-
-    output_rows = []
-    misses = 0
-
-    for row in rows:
-        gx = int(row["gx"])
-        gy = int(row["gy"])
-        cx = gx + grid_meters / 2
-        cy = gy + grid_meters / 2
-        lon, lat = transformer.transform(cx, cy)
-
-        poly = match_polygon(lon, lat, polygons, tile_index, tile_deg)
-        if not poly:
-            misses += 1
-            continue
-
-        output_rows.append(
-            {
-                "gx": gx,
-                "gy": gy,
-                "pct_progressive": poly.values.pct_progressive,
-                "pct_conservative": poly.values.pct_conservative,
-                "pct_popular_right": poly.values.pct_popular_right,
-                "constituency": poly.values.constituency,
-                "country": poly.values.country,
-            }
-        )
+    gx, gy, source = load_cells(grid_rows_path, grid_label, universe_dir)
+    if assign == "centroid":
+        output_rows, misses = centroid_rows(polygons, gx, gy, grid_meters)
+    else:
+        output_rows, misses = area_rows(polygons, gx, gy, grid_meters, supersample)
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with gzip.open(output_path, "wt", encoding="utf-8") as f:
@@ -203,7 +189,7 @@ def build_vote_cells(
 
     print(
         f"wrote {len(output_rows):,} vote cells to {output_path} "
-        f"(misses: {misses:,}, total rows: {len(rows):,})"
+        f"({assign}; misses: {misses:,}, cells: {len(gx):,} from {source})"
     )
 
 
@@ -215,7 +201,13 @@ def parse_args():
     parser.add_argument("--output", help="Output .json.gz path for single-grid mode")
     parser.add_argument("--input-dir", default=str(PUBLIC_DATA_DIR), help="Directory containing grid_1mile_full.json.gz etc (all-grid mode)")
     parser.add_argument("--output-dir", default=str(MODEL_VOTE_DIR), help="Output directory for vote_cells_<grid>.json.gz (all-grid mode)")
-    parser.add_argument("--tile-deg", type=float, default=0.25, help="Spatial index tile size in degrees")
+    parser.add_argument("--cell-universe-dir", default=str(MODEL_PROPERTY_DIR),
+                        help="Directory with cell_universe_<grid>.parquet (all-grid mode; falls back to --input-dir grid rows)")
+    parser.add_argument("--assign", choices=["area", "centroid"], default="area",
+                        help="area: area-weighted shares across constituencies (cached raster weights); "
+                             "centroid: constituency containing the cell centroid")
+    parser.add_argument("--supersample", type=int, default=DEFAULT_SUPERSAMPLE,
+                        help="Samples per cell side for --assign area")
     return parser.parse_args()
 
 
@@ -238,12 +230,14 @@ def main():
             grid_rows_path=Path(args.grid_rows),
             output_path=Path(args.output),
             grid_meters=int(args.grid_meters),
-            tile_deg=float(args.tile_deg),
+            assign=args.assign,
+            supersample=args.supersample,
         )
         return
 
     input_dir = Path(args.input_dir)
     output_dir = Path(args.output_dir)
+    universe_dir = Path(args.cell_universe_dir)
     jobs = [
         ("1mile", 1600),
         ("5km", 5000),
@@ -259,7 +253,10 @@ def main():
             grid_rows_path=grid_rows_path,
             output_path=output_path,
             grid_meters=meters,
-            tile_deg=float(args.tile_deg),
+            assign=args.assign,
+            supersample=args.supersample,
+            grid_label=label,
+            universe_dir=universe_dir,
         )
 
 
@@ -8,9 +8,11 @@ from pathlib import Path
 from paths import (
     MODEL_VOTE_BLOCKS_BY_CONSTITUENCY_CSV,
     MODEL_VOTE_BLOCKS_MAP_GEOJSON,
+    MODEL_VOTE_BLOCKS_MAP_ZOOM_TEMPLATE,
     RAW_WESTMINSTER_BOUNDARY_GEOJSON,
     ensure_pipeline_dirs,
 )
+from topo_simplify import DEFAULT_QUANTIZATION, build_topology, zoom_min_area, zoom_precision
 
 
 def load_votes(path: Path) -> dict[str, dict[str, float | str]]:
@@ -36,32 +38,17 @@ def load_votes(path: Path) -> dict[str, dict[str, float | str]]:
     return votes
 
 
-def thin_ring(ring: list, step: int) -> list:
-    if step <= 1 or len(ring) <= 8:
-        return ring
-    keep = [ring[0]]
-    keep.extend(ring[i] for i in range(step, len(ring) - 1, step))
-    keep.append(ring[-1])
-    if keep[0] != keep[-1]:
-        keep.append(keep[0])
-    return keep
+def parse_zooms(text: str) -> list[int]:
+    zooms = sorted({int(z) for z in text.split(",") if z.strip()})
+    if not zooms:
+        raise ValueError("--zooms must list at least one zoom level")
+    return zooms
 
 
-def thin_geometry(geom: dict, step: int) -> dict:
-    gtype = geom.get("type")
-    coords = geom.get("coordinates", [])
-
-    if gtype == "Polygon":
-        return {
-            "type": "Polygon",
-            "coordinates": [thin_ring(ring, step) for ring in coords],
-        }
-    if gtype == "MultiPolygon":
-        return {
-            "type": "MultiPolygon",
-            "coordinates": [[thin_ring(ring, step) for ring in poly] for poly in coords],
-        }
-    return geom
+def write_geojson(path: Path, features: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False, separators=(",", ":"))
 
 
 def main() -> None:
@@ -83,10 +70,17 @@ def main() -> None:
         default=str(MODEL_VOTE_BLOCKS_MAP_GEOJSON),
     )
     parser.add_argument(
-        "--thin-step",
+        "--zooms",
+        type=str,
+        default="6,9,12",
+        help="Comma-separated web-map zoom levels to write simplified variants for; "
+        "--out gets the highest",
+    )
+    parser.add_argument(
+        "--quantization",
         type=int,
-        default=6,
-        help="Keep every Nth coordinate in polygon rings to reduce file size",
+        default=DEFAULT_QUANTIZATION,
+        help="Integer lattice size used to detect shared borders (per axis, over the layer bbox)",
     )
     args = parser.parse_args()
 
@@ -105,8 +99,8 @@ def main() -> None:
         boundary = json.load(f)
 
     features = boundary.get("features", [])
-    out_features = []
-    matched = 0
+    out_props = []
+    out_geoms = []
 
     for feature in features:
         props = feature.get("properties") or {}
@@ -115,37 +109,42 @@ def main() -> None:
         if not vote:
             continue
 
-        matched += 1
-        geom = thin_geometry(feature.get("geometry") or {}, max(1, int(args.thin_step)))
-        out_features.append(
+        out_props.append(
             {
-                "type": "Feature",
-                "properties": {
-                    "ons_id": pcon,
-                    "constituency": vote["constituency"],
-                    "region": vote["region"],
-                    "country": vote["country"],
-                    "pct_progressive": vote["pct_progressive"],
-                    "pct_conservative": vote["pct_conservative"],
-                    "pct_popular_right": vote["pct_popular_right"],
-                    "pct_other": vote["pct_other"],
-                    "votes_total": vote["votes_total"],
-                },
-                "geometry": geom,
+                "ons_id": pcon,
+                "constituency": vote["constituency"],
+                "region": vote["region"],
+                "country": vote["country"],
+                "pct_progressive": vote["pct_progressive"],
+                "pct_conservative": vote["pct_conservative"],
+                "pct_popular_right": vote["pct_popular_right"],
+                "pct_other": vote["pct_other"],
+                "votes_total": vote["votes_total"],
             }
         )
-
-    out_geo = {
-        "type": "FeatureCollection",
-        "features": out_features,
-    }
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(out_geo, f, ensure_ascii=False, separators=(",", ":"))
+        out_geoms.append(feature.get("geometry") or {})
+
+    # Simplify shared borders once for all constituencies so neighbours stay
+    # watertight at every zoom.
+    zooms = parse_zooms(args.zooms)
+    topology = build_topology(out_geoms, max(2, int(args.quantization)))
+    print(f"Arcs: {len(topology.arcs):,}  vertices: {sum(len(a) for a in topology.arcs):,}")
+
+    for zoom in zooms:
+        geoms = topology.simplify(zoom_min_area(topology, zoom), zoom_precision(zoom))
+        out_features = [
+            {"type": "Feature", "properties": props, "geometry": geom}
+            for props, geom in zip(out_props, geoms)
+            if geom is not None
+        ]
+        zoom_path = out_path.parent / MODEL_VOTE_BLOCKS_MAP_ZOOM_TEMPLATE.name.replace("{zoom}", str(zoom))
+        write_geojson(zoom_path, out_features)
+        print(f"  z{zoom:<2} {len(out_features):>4} features  →  {zoom_path.name}  ({zoom_path.stat().st_size // 1024:,} KB)")
+        if zoom == zooms[-1]:
+            write_geojson(out_path, out_features)
 
     print(f"Wrote: {out_path}")
-    print(f"Matched features: {matched} / {len(features)}")
+    print(f"Matched features: {len(out_props)} / {len(features)}")
 
 
 if __name__ == "__main__":
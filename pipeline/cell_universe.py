@@ -0,0 +1,86 @@
+"""
+cell_universe.py — the set of populated cells per grid, as a tiny Parquet file.
+
+Written by build_property_artifacts.py alongside grid_{label}_full.json.gz,
+from the same yearly windows as those rows, so downstream builders (currently
+the vote cells) can load the cells to compute without decompressing the full
+property JSON.
+
+cell_universe_{label}.parquet columns:
+  cell       "<gx>_<gy>" (the key used by cells.ts lookups)
+  gx, gy     BNG SW corner of the cell (m)
+  cx, cy     BNG centroid of the cell (m)
+  tx_count   transactions in the cell over the grid's published windows
+  tx_12m     transactions in the latest 12-month window
+  country    E / W / S / N — majority ONSPD country of the cell's transactions
+             (null when ONSPD has no country column)
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from paths import MODEL_CELL_UNIVERSE_TEMPLATE
+
+GRID_METERS = {"1mile": 1600, "5km": 5000, "10km": 10000, "25km": 25000}
+
+
+def cell_universe_path(grid_label: str, base_dir: Path | None = None) -> Path:
+    name = MODEL_CELL_UNIVERSE_TEMPLATE.name.replace("{grid}", grid_label)
+    return (base_dir or MODEL_CELL_UNIVERSE_TEMPLATE.parent) / name
+
+
+def build_cell_universe(df: pd.DataFrame, g: int, latest_start_month: pd.Timestamp) -> pd.DataFrame:
+    """
+    One row per cell of grid `g` with at least one transaction in `df`
+    (the merged property frame with gx_{g}, gy_{g}, month and optional country).
+    """
+    gx = df[f"gx_{g}"].to_numpy(dtype=np.int64)
+    gy = df[f"gy_{g}"].to_numpy(dtype=np.int64)
+    keys, inv = np.unique(np.stack([gx, gy], axis=1), axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    recent = (df["month"] >= latest_start_month).to_numpy()
+
+    out = pd.DataFrame({
+        "gx": keys[:, 0],
+        "gy": keys[:, 1],
+        "cx": keys[:, 0] + g // 2,
+        "cy": keys[:, 1] + g // 2,
+        "tx_count": np.bincount(inv, minlength=len(keys)).astype(np.int64),
+        "tx_12m": np.bincount(inv, weights=recent, minlength=len(keys)).astype(np.int64),
+    })
+    out.insert(0, "cell", out["gx"].astype("string") + "_" + out["gy"].astype("string"))
+
+    out["country"] = pd.Series(pd.NA, index=out.index, dtype="string")
+    if "country" in df.columns:
+        codes, countries = pd.factorize(df["country"], use_na_sentinel=True)
+        known = codes >= 0
+        if known.any():
+            k = len(countries)
+            counts = np.bincount(inv[known] * k + codes[known], minlength=len(keys) * k).reshape(len(keys), k)
+            has = counts.sum(axis=1) > 0
+            majority = np.asarray(countries, dtype=object)[counts.argmax(axis=1)]
+            out.loc[has, "country"] = majority[has]
+    return out
+
+
+def write_cell_universe(universe: pd.DataFrame, grid_label: str, base_dir: Path | None = None) -> Path:
+    path = cell_universe_path(grid_label, base_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    universe.to_parquet(path, index=False)
+    return path
+
+
+def load_cell_universe(
+    grid_label: str,
+    base_dir: Path | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Read cell_universe_{label}.parquet (FileNotFoundError if the property build has not run)."""
+    path = cell_universe_path(grid_label, base_dir)
+    if not path.exists():
+        raise FileNotFoundError(f"Cell universe not found: {path} (run build_property_artifacts.py)")
+    return pd.read_parquet(path, columns=columns)
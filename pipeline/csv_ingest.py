@@ -0,0 +1,273 @@
+"""
+csv_ingest.py — shared reader for the large raw CSV inputs (PPD, ONSPD, EPC).
+
+Callers describe what they need (columns + types, optional row filters) and
+get back a typed DataFrame.  Two backends are available:
+
+  arrow   pyarrow.csv.read_csv — multi-threaded parse, columns typed and
+          timestamps parsed by Arrow, filters applied before conversion to
+          pandas so dropped rows are never materialised as Python objects.
+  pandas  chunked pd.read_csv (the previous behaviour), used when pyarrow is
+          not installed or when CSV_BACKEND=pandas is set.
+
+Column types: "string", "float64", "int64", "timestamp".  Every backend
+returns them as pandas string, float64, float64 (so "int64" columns can hold
+NaN) and datetime64[ns] respectively.
+Filters are (column, op, value) tuples with op one of
+==, !=, >=, >, <=, <, notnull.  All filters are ANDed.
+
+If Arrow rejects a value (e.g. "NO DATA!" in a numeric EPC column) the file is
+re-read with those columns as strings and coerced the same way pd.to_numeric /
+pd.to_datetime(errors="coerce") would, so both backends return the same frame.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+BACKEND_ENV = "CSV_BACKEND"
+PANDAS_CHUNKSIZE = 500_000
+
+Filter = tuple[str, str, object]
+
+# Sentinels the EPC register writes into numeric/date columns
+EPC_NULL_VALUES = ["NO DATA!", "NODATA!", "INVALID!", "N/A"]
+
+
+def default_backend() -> str:
+    wanted = os.getenv(BACKEND_ENV, "").strip().lower()
+    if wanted in BACKENDS:
+        return wanted
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return "pandas"
+    return "arrow"
+
+
+def read_csv(
+    path: Path,
+    columns: dict[str, str],
+    *,
+    column_names: list[str] | None = None,
+    timestamp_formats: list[str] | None = None,
+    filters: Iterable[Filter] | None = None,
+    null_values: Iterable[str] | None = None,
+    backend: str | None = None,
+) -> pd.DataFrame:
+    """Read `columns` (name → type) from a CSV, applying `filters`.
+
+    column_names: full header for headerless files (e.g. pp-*.txt).
+    timestamp_formats: strptime formats tried for "timestamp" columns; ISO-8601
+        is always accepted.
+    null_values: extra strings read as null in every column (e.g.
+        EPC_NULL_VALUES), so sentinel text in numeric columns does not force
+        the slow string fallback.
+    """
+    name = backend or default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown CSV backend {name!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name](
+        Path(path),
+        columns,
+        column_names=column_names,
+        timestamp_formats=timestamp_formats or [],
+        filters=list(filters or []),
+        null_values=list(null_values or []),
+    )
+
+
+def read_header(path: Path) -> list[str]:
+    """Column names of a CSV with a header row (compression inferred from suffix)."""
+    return list(pd.read_csv(path, nrows=0, compression="infer").columns)
+
+
+# ── Shared coercion / filtering ────────────────────────────────────────────────
+
+# Returned pandas dtype per column type, identical for every backend and path
+DTYPES = {"string": "string", "float64": "float64", "int64": "float64", "timestamp": "datetime64[ns]"}
+
+
+def _with_dtypes(df: pd.DataFrame, columns: dict[str, str]) -> pd.DataFrame:
+    return df[list(columns)].astype({c: DTYPES[k] for c, k in columns.items()})
+
+
+def _coerce_series(series: pd.Series, kind: str, timestamp_formats: list[str]) -> pd.Series:
+    if kind == "string":
+        return series.astype("string")
+    if kind in ("float64", "int64"):
+        # to_numeric on a string column gives nullable Int64/Float64; see DTYPES
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if kind == "timestamp":
+        text = series.astype("string").str.strip()
+        out = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+        for fmt in [*timestamp_formats, None]:
+            missing = out.isna() & text.notna()
+            if not missing.any():
+                break
+            out.loc[missing] = pd.to_datetime(text.loc[missing], format=fmt, errors="coerce")
+        return out
+    raise ValueError(f"Unsupported column type: {kind}")
+
+
+def _pandas_mask(df: pd.DataFrame, filters: list[Filter]) -> pd.Series:
+    mask = pd.Series(True, index=df.index)
+    for col, op, value in filters:
+        s = df[col]
+        if op == "notnull":
+            cond = s.notna()
+        elif op == "==":
+            cond = s == value
+        elif op == "!=":
+            cond = s != value
+        elif op == ">=":
+            cond = s >= value
+        elif op == ">":
+            cond = s > value
+        elif op == "<=":
+            cond = s <= value
+        elif op == "<":
+            cond = s < value
+        else:
+            raise ValueError(f"Unsupported filter op: {op}")
+        mask &= cond.fillna(False).astype(bool)
+    return mask
+
+
+# ── pandas backend ─────────────────────────────────────────────────────────────
+
+def _read_pandas(
+    path: Path,
+    columns: dict[str, str],
+    *,
+    column_names: list[str] | None,
+    timestamp_formats: list[str],
+    filters: list[Filter],
+    null_values: list[str],
+) -> pd.DataFrame:
+    kwargs: dict = {}
+    if null_values:
+        kwargs["na_values"] = null_values
+    if column_names is not None:
+        kwargs.update(header=None, names=column_names)
+
+    frames: list[pd.DataFrame] = []
+    for chunk in pd.read_csv(
+        path,
+        usecols=list(columns),
+        dtype="string",
+        compression="infer",
+        chunksize=PANDAS_CHUNKSIZE,
+        **kwargs,
+    ):
+        for col, kind in columns.items():
+            chunk[col] = _coerce_series(chunk[col], kind, timestamp_formats)
+        if filters:
+            chunk = chunk[_pandas_mask(chunk, filters)]
+        frames.append(chunk[list(columns)])
+
+    if not frames:
+        return _empty_frame(columns)
+    return _with_dtypes(pd.concat(frames, ignore_index=True), columns)
+
+
+# ── Arrow backend ──────────────────────────────────────────────────────────────
+
+def _arrow_type(kind: str):
+    import pyarrow as pa
+
+    return {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "timestamp": pa.timestamp("ns"),
+    }[kind]
+
+
+def _arrow_mask(table, filters: list[Filter]):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    ops = {
+        "==": pc.equal,
+        "!=": pc.not_equal,
+        ">=": pc.greater_equal,
+        ">": pc.greater,
+        "<=": pc.less_equal,
+        "<": pc.less,
+    }
+    mask = None
+    for col, op, value in filters:
+        arr = table[col]
+        if op == "notnull":
+            cond = pc.is_valid(arr)
+        elif op in ops:
+            if pa.types.is_timestamp(arr.type):
+                # as_unit: pandas >= 2 defaults to µs, which Arrow will not cast implicitly
+                scalar = pa.scalar(pd.Timestamp(value).as_unit("ns"), type=arr.type)
+            else:
+                scalar = pa.scalar(value, type=arr.type)
+            cond = pc.fill_null(ops[op](arr, scalar), False)
+        else:
+            raise ValueError(f"Unsupported filter op: {op}")
+        mask = cond if mask is None else pc.and_(mask, cond)
+    return mask
+
+
+def _read_arrow(
+    path: Path,
+    columns: dict[str, str],
+    *,
+    column_names: list[str] | None,
+    timestamp_formats: list[str],
+    filters: list[Filter],
+    null_values: list[str],
+) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    def _read(types: dict[str, str]):
+        read_opts = pacsv.ReadOptions(use_threads=True, block_size=1 << 24, column_names=column_names)
+        convert_opts = pacsv.ConvertOptions(
+            include_columns=list(columns),
+            column_types={c: _arrow_type(k) for c, k in types.items()},
+            timestamp_parsers=[*timestamp_formats, pacsv.ISO8601] if timestamp_formats else None,
+            strings_can_be_null=True,
+            null_values=["", *null_values],
+        )
+        return pacsv.read_csv(path, read_options=read_opts, convert_options=convert_opts)
+
+    fallback: list[str] = []
+    try:
+        table = _read(columns)
+    except pa.ArrowInvalid as exc:
+        # A value Arrow cannot parse: read non-string columns as text and coerce
+        # them in pandas, which turns bad values into NaN/NaT instead of failing.
+        fallback = [c for c, k in columns.items() if k != "string"]
+        print(f"  Arrow typed read failed ({exc}); coercing {fallback} in pandas")
+        table = _read({c: ("string" if c in fallback else k) for c, k in columns.items()})
+
+    if filters and not fallback:
+        table = table.filter(_arrow_mask(table, filters))
+
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    for col in fallback:
+        df[col] = _coerce_series(df[col], columns[col], timestamp_formats)
+    if filters and fallback:
+        df = df[_pandas_mask(df, filters)].reset_index(drop=True)
+    return _with_dtypes(df, columns)
+
+
+def _empty_frame(columns: dict[str, str]) -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=DTYPES[k]) for c, k in columns.items()})
+
+
+BACKENDS = {
+    "arrow": _read_arrow,
+    "pandas": _read_pandas,
+}
@@ -4,17 +4,32 @@ import argparse
 import sys
 import json
 import csv
+import gzip
 import io
-from datetime import date, datetime, timedelta
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 from urllib.error import HTTPError, URLError
 from urllib.parse import quote, urlencode
 from urllib.request import Request, urlopen
 
+from paths import INTERMEDIATE_FLOOD_ARCHIVE_DIR, INTERMEDIATE_FLOOD_DIR
+
 
 BASE_URL = "https://environment.data.gov.uk/flood-monitoring"
 
+ARCHIVE_WORKERS = 8
+ARCHIVE_CHUNK_BYTES = 1 << 20
+
+# Flood-area coordinates persisted across runs ({area_id: {"lat", "long"}})
+FLOOD_AREA_COORDS_CACHE = INTERMEDIATE_FLOOD_DIR / "flood_area_coords.json"
+# Above this many unresolved areas, one floodAreas list call beats per-area requests
+BULK_AREA_THRESHOLD = 50
+FLOOD_AREAS_LIMIT = 10_000
+
 FLOODS_CSV_COLUMNS = [
     "@id",
     "description",
@@ -103,11 +118,77 @@ class FloodMonitoringApiClient:
     def get_measure_readings(self, measure_id: str, **params: Any) -> dict[str, Any]:
         return self._get(f"/id/measures/{quote(measure_id, safe='')}/readings", params)
 
-    def get_archive_readings_csv(self, target_date: date, full: bool = False) -> str:
-        stamp = target_date.strftime("%Y-%m-%d")
+    def archive_name(self, target_date: date, full: bool = False) -> str:
         prefix = "readings-full" if full else "readings"
-        url = f"{self.base_url}/archive/{prefix}-{stamp}.csv"
-        return self._get_text(url)
+        return f"{prefix}-{target_date.strftime('%Y-%m-%d')}.csv"
+
+    def get_archive_readings_csv(self, target_date: date, full: bool = False) -> str:
+        return self._get_text(f"{self.base_url}/archive/{self.archive_name(target_date, full)}")
+
+    def fetch_archive_to_cache(
+        self,
+        target_date: date,
+        cache_dir: Path,
+        full: bool = False,
+        revalidate: bool = False,
+    ) -> tuple[Path | None, str]:
+        """
+        Ensure the archive CSV for `target_date` is in `cache_dir` as
+        <name>.csv.gz, streaming the download straight to disk.
+
+        Returns (path, status) with status one of:
+          cached       already on disk, not requested
+          revalidated  on disk; server answered 304 to If-None-Match
+          fetched      downloaded (new, or changed since the cached copy)
+          missing      server has no file for that day (path is None)
+        """
+        name = self.archive_name(target_date, full)
+        url = f"{self.base_url}/archive/{name}"
+        path = cache_dir / f"{name}.gz"
+        meta_path = cache_dir / f"{name}.json"
+        meta: dict[str, Any] = {}
+        if path.exists():
+            if not revalidate:
+                return path, "cached"
+            if meta_path.exists():
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+
+        headers = {"Accept": "text/csv"}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with urlopen(Request(url, headers=headers), timeout=self.timeout_seconds) as response:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                with gzip.open(tmp, "wb", compresslevel=5) as out:
+                    shutil.copyfileobj(response, out, ARCHIVE_CHUNK_BYTES)
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                }
+        except HTTPError as exc:
+            tmp.unlink(missing_ok=True)
+            if exc.code == 304 and path.exists():
+                return path, "revalidated"
+            if exc.code == 404:
+                return None, "missing"
+            body = exc.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"HTTP {exc.code} for {url}\n{body}") from exc
+        except URLError as exc:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"Connection error for {url}: {exc}") from exc
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        tmp.replace(path)
+        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        return path, "fetched"
 
 
 def parse_key_value_pairs(values: list[str]) -> dict[str, str]:
@@ -212,42 +293,115 @@ def pick_first_value(record: dict[str, str], keys: list[str]) -> str:
     return ""
 
 
+LAT_KEYS = ["latitude", "lat", "floodArea.latitude", "floodArea.lat"]
+LON_KEYS = ["longitude", "long", "lon", "floodArea.longitude", "floodArea.long", "floodArea.lon"]
+
+
+def area_coords_from_item(item: dict[str, Any]) -> dict[str, str]:
+    flat = flatten_record(item)
+    return {
+        "lat": pick_first_value(flat, ["lat", "latitude"]),
+        "long": pick_first_value(flat, ["long", "lon", "longitude"]),
+    }
+
+
+def load_area_coords_cache(path: Path | None) -> dict[str, dict[str, str]]:
+    if path is None or not path.exists():
+        return {}
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def save_area_coords_cache(path: Path | None, cache: dict[str, dict[str, str]]) -> None:
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(cache, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def resolve_area_coords(
+    client: FloodMonitoringApiClient,
+    area_ids: set[str],
+    cache_path: Path | None = FLOOD_AREA_COORDS_CACHE,
+    workers: int = ARCHIVE_WORKERS,
+) -> dict[str, dict[str, str]]:
+    """
+    {area_id: {"lat", "long"}} for each distinct flood area.  Areas already in
+    the on-disk cache are not requested.  Large batches fetch the whole
+    floodAreas list once; small ones fetch each area concurrently.  Failed
+    lookups resolve to {} and are retried on the next run.
+    """
+    cache = load_area_coords_cache(cache_path)
+    cached_count = len(cache)
+    missing = sorted(a for a in area_ids if a not in cache)
+    failed: dict[str, dict[str, str]] = {}
+
+    if len(missing) > BULK_AREA_THRESHOLD:
+        try:
+            payload = client.list_flood_areas(_limit=FLOOD_AREAS_LIMIT)
+            items = payload.get("items")
+            for item in items if isinstance(items, list) else []:
+                notation = str(item.get("notation", "")).strip() if isinstance(item, dict) else ""
+                if notation:
+                    cache[notation] = area_coords_from_item(item)
+        except RuntimeError:
+            pass
+        missing = [a for a in missing if a not in cache]
+
+    def fetch(area_id: str) -> dict[str, str] | None:
+        try:
+            items = client.get_flood_area(area_id).get("items")
+        except Exception:
+            return None
+        if isinstance(items, dict):
+            return area_coords_from_item(items)
+        if isinstance(items, list) and items and isinstance(items[0], dict):
+            return area_coords_from_item(items[0])
+        return {"lat": "", "long": ""}
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for area_id, coords in zip(missing, pool.map(fetch, missing)):
+                if coords is None:
+                    failed[area_id] = {}
+                else:
+                    cache[area_id] = coords
+
+    if len(cache) != cached_count:
+        save_area_coords_cache(cache_path, cache)
+    return {a: cache.get(a, failed.get(a, {})) for a in area_ids}
+
+
 def enrich_flood_records_with_coords(
     client: FloodMonitoringApiClient,
     records: list[dict[str, str]],
+    cache_path: Path | None = FLOOD_AREA_COORDS_CACHE,
+    workers: int = ARCHIVE_WORKERS,
 ) -> list[dict[str, str]]:
-    cache: dict[str, dict[str, str]] = {}
-    enriched: list[dict[str, str]] = []
-
-    for row in records:
-        area_id = row.get("floodAreaID", "")
-        lat = pick_first_value(row, ["latitude", "lat", "floodArea.latitude", "floodArea.lat"])
-        lon = pick_first_value(row, ["longitude", "long", "lon", "floodArea.longitude", "floodArea.long", "floodArea.lon"])
-
-        if (lat == "" or lon == "") and area_id:
-            if area_id not in cache:
-                try:
-                    area_payload = client.get_flood_area(area_id)
-                    area_items = area_payload.get("items")
-                    if isinstance(area_items, dict):
-                        flat = flatten_record(area_items)
-                    elif isinstance(area_items, list) and area_items and isinstance(area_items[0], dict):
-                        flat = flatten_record(area_items[0])
-                    else:
-                        flat = {}
-                    cache[area_id] = flat
-                except Exception:
-                    cache[area_id] = {}
-
-            area_flat = cache.get(area_id, {})
-            if lat == "":
-                lat = pick_first_value(area_flat, ["lat", "latitude"])
-            if lon == "":
-                lon = pick_first_value(area_flat, ["long", "lon", "longitude"])
+    """
+    Fill latitude/longitude on each record, falling back to its flood area's
+    coordinates.  Area IDs are deduplicated and resolved in one batch
+    (resolve_area_coords) before being broadcast back to the records, so the
+    cost scales with distinct areas, not records.
+    """
+    lats = [pick_first_value(row, LAT_KEYS) for row in records]
+    lons = [pick_first_value(row, LON_KEYS) for row in records]
+    area_ids = [row.get("floodAreaID", "") for row in records]
+
+    needed = {a for a, lat, lon in zip(area_ids, lats, lons) if a and (lat == "" or lon == "")}
+    coords = resolve_area_coords(client, needed, cache_path, workers) if needed else {}
 
+    enriched: list[dict[str, str]] = []
+    for row, area_id, lat, lon in zip(records, area_ids, lats, lons):
+        area = coords.get(area_id, {}) if area_id in needed else {}
         next_row = dict(row)
-        next_row["latitude"] = lat
-        next_row["longitude"] = lon
+        next_row["latitude"] = lat if lat != "" else area.get("lat", "")
+        next_row["longitude"] = lon if lon != "" else area.get("long", "")
         enriched.append(next_row)
 
     return enriched
@@ -298,6 +452,28 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--start-date", help="Start date in YYYY-MM-DD (for archive-readings)")
     parser.add_argument("--end-date", help="End date in YYYY-MM-DD (for archive-readings)")
     parser.add_argument("--archive-full", action="store_true", help="Use readings-full archive files (for archive-readings)")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=INTERMEDIATE_FLOOD_ARCHIVE_DIR,
+        help="Per-day archive cache (for archive-readings); cached days are not re-downloaded",
+    )
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Re-check cached archive days with If-None-Match and refetch any that changed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=ARCHIVE_WORKERS,
+        help=f"Concurrent archive downloads (default: {ARCHIVE_WORKERS})",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=BASE_URL,
+        help="API root (override to point at a mirror or a local stand-in server)",
+    )
     parser.add_argument(
         "--param",
         action="append",
@@ -305,7 +481,12 @@ def build_parser() -> argparse.ArgumentParser:
         help="Additional query params in key=value form. Repeat for multiple params.",
     )
     parser.add_argument("--timeout", type=int, default=30, help="Request timeout in seconds")
-    parser.add_argument("--output", type=Path, default=None, help="Optional path to write output file")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Optional path to write output file (archive-readings: .parquet for columnar, else CSV)",
+    )
     parser.add_argument("--pretty", action="store_true", help="Pretty-print JSON output")
     parser.add_argument(
         "--format",
@@ -336,21 +517,109 @@ def iter_dates(start: date, end: date):
         current += timedelta(days=1)
 
 
-def merge_archive_csv_texts(chunks: list[str]) -> str:
-    merged_lines: list[str] = []
-    header: str | None = None
-    for chunk in chunks:
-        lines = chunk.splitlines()
-        if not lines:
+def fetch_archive_range(
+    client: FloodMonitoringApiClient,
+    days: Iterable[date],
+    cache_dir: Path,
+    full: bool = False,
+    revalidate: bool = False,
+    workers: int = ARCHIVE_WORKERS,
+) -> list[tuple[date, Path | None, str]]:
+    """
+    Fetch archive days into the on-disk cache with at most `workers` requests
+    in flight.  Days already cached are not requested unless `revalidate`.
+    Returns (day, path, status) in date order.
+    """
+    days = list(days)
+    results: dict[date, tuple[Path | None, str]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(client.fetch_archive_to_cache, day, cache_dir, full, revalidate): day
+            for day in days
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            day = futures[future]
+            results[day] = future.result()
+            status = results[day][1]
+            if status != "cached":
+                print(f"  [{done:4d}/{len(days)}] {day.isoformat()}  {status}", file=sys.stderr)
+    return [(day, *results[day]) for day in days]
+
+
+def _archive_header(path: Path) -> list[str] | None:
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as fh:
+        first = fh.readline()
+    if not first.strip():
+        return None
+    return next(csv.reader([first]))
+
+
+def merge_archive_files(paths: list[Path], output: Path | None) -> int:
+    """
+    Stream cached day files into one output without holding any day in
+    memory: Parquet (columnar, all columns as strings) when `output` ends in
+    .parquet, otherwise CSV (stdout when output is None).  Returns data rows.
+    """
+    header: list[str] | None = None
+    inputs: list[Path] = []
+    for path in paths:
+        current = _archive_header(path)
+        if current is None:
             continue
-        current_header = lines[0]
         if header is None:
-            header = current_header
-            merged_lines.append(header)
-        elif current_header != header:
-            raise RuntimeError("Archive CSV headers differ across dates; cannot merge safely")
-        merged_lines.extend(lines[1:])
-    return "\n".join(merged_lines) + ("\n" if merged_lines else "")
+            header = current
+        elif current != header:
+            raise RuntimeError(f"Archive CSV headers differ across dates ({path.name}); cannot merge safely")
+        inputs.append(path)
+
+    if output is not None and output.suffix == ".parquet":
+        return _merge_to_parquet(inputs, header or [], output)
+
+    rows = 0
+    target = output.with_name(f"{output.name}.tmp") if output is not None else None
+    if target is not None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    out = open(target, "w", encoding="utf-8", newline="") if target is not None else sys.stdout
+    try:
+        if header is not None:
+            csv.writer(out, lineterminator="\n").writerow(header)
+        for path in inputs:
+            with gzip.open(path, "rt", encoding="utf-8", newline="") as fh:
+                fh.readline()
+                for line in fh:
+                    if line.strip():
+                        out.write(line.rstrip("\r\n") + "\n")
+                        rows += 1
+    finally:
+        if target is not None:
+            out.close()
+    if target is not None:
+        target.replace(output)
+    return rows
+
+
+def _merge_to_parquet(paths: list[Path], header: list[str], output: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("pyarrow is required for Parquet output; use a .csv --output instead") from exc
+
+    schema = pa.schema([(name, pa.string()) for name in header])
+    convert = pacsv.ConvertOptions(column_types={name: pa.string() for name in header}, strings_can_be_null=True)
+    read = pacsv.ReadOptions(block_size=1 << 24)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f"{output.name}.tmp")
+    rows = 0
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for path in paths:
+            # open_csv streams record batches; compression inferred from .gz
+            for batch in pacsv.open_csv(path, read_options=read, convert_options=convert):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    tmp.replace(output)
+    return rows
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -362,7 +631,7 @@ def main(argv: list[str] | None = None) -> int:
         args.endpoint = "floods"
 
     params = parse_key_value_pairs(args.param)
-    client = FloodMonitoringApiClient(timeout_seconds=max(1, args.timeout))
+    client = FloodMonitoringApiClient(base_url=args.base_url, timeout_seconds=max(1, args.timeout))
 
     if args.endpoint == "floods":
         payload = client.list_floods(**params)
@@ -399,27 +668,23 @@ def main(argv: list[str] | None = None) -> int:
             if end < start:
                 raise ValueError("--end-date cannot be earlier than --start-date")
 
-            chunks: list[str] = []
-            fetched = 0
-            skipped = 0
-            for day in iter_dates(start, end):
-                try:
-                    chunks.append(client.get_archive_readings_csv(day, full=args.archive_full))
-                    fetched += 1
-                except RuntimeError as exc:
-                    if "HTTP 404" in str(exc):
-                        skipped += 1
-                        continue
-                    raise
-            merged_csv = merge_archive_csv_texts(chunks)
+            results = fetch_archive_range(
+                client,
+                iter_dates(start, end),
+                args.cache_dir,
+                full=args.archive_full,
+                revalidate=args.revalidate,
+                workers=args.workers,
+            )
+            counts = {status: sum(1 for _, _, st in results if st == status)
+                      for status in ("fetched", "revalidated", "cached", "missing")}
+            rows = merge_archive_files([path for _, path, _ in results if path is not None], args.output)
+            summary = ", ".join(f"{status}: {n}" for status, n in counts.items())
             if args.output:
-                args.output.parent.mkdir(parents=True, exist_ok=True)
-                args.output.write_text(merged_csv, encoding="utf-8", newline="")
-                print(f"Wrote response to: {args.output}")
-                print(f"Archive dates fetched: {fetched}, missing/skipped: {skipped}")
+                print(f"Wrote {rows:,} readings to: {args.output}")
+                print(f"Archive dates {summary}")
             else:
-                print(merged_csv, end="")
-                print(f"# Archive dates fetched: {fetched}, missing/skipped: {skipped}")
+                print(f"# Archive dates {summary}")
             return 0
 
     if args.output:
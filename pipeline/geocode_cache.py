@@ -0,0 +1,136 @@
+"""
+geocode_cache.py — shared SQLite postcode → coordinate cache.
+
+One row per normalised postcode key with the coordinates, the source that
+produced them and a unix timestamp.  The database runs in WAL mode so several
+builders can read while one writes; writes are batched into a single
+BEGIN IMMEDIATE transaction and retried by SQLite's busy timeout, so parallel
+builders never corrupt the file and a crash loses at most the batch in flight.
+
+Entries use the same dict shape the school builders kept in their old JSON
+cache:
+    {"ok": bool, "postcode": str, "longitude": float, "latitude": float, "source": str}
+and the legacy JSON file is imported automatically the first time a cache is opened.
+
+Usage (library):
+    with GeocodeCache(INTERMEDIATE_SCHOOL_POSTCODE_CACHE) as cache:
+        found = cache.get_many(keys)          # {key: entry} for cached keys
+        cache.put_many({key: entry, ...})
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterable, Mapping
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER on older builds is 999
+QUERY_CHUNK = 900
+BUSY_TIMEOUT_S = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    postcode_key TEXT PRIMARY KEY,
+    ok           INTEGER NOT NULL,
+    postcode     TEXT,
+    longitude    REAL,
+    latitude     REAL,
+    source       TEXT,
+    updated_at   INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def normalize_key(value: object) -> str:
+    return re.sub(r"\s+", "", str(value or "").upper())
+
+
+class GeocodeCache:
+    def __init__(self, path: Path, legacy_json: Path | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly in put_many
+        self.conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        if legacy_json is None:
+            legacy_json = self.path.with_suffix(".json")
+        self._import_legacy_json(Path(legacy_json))
+
+    def __enter__(self) -> "GeocodeCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    # ── Bulk API ─────────────────────────────────────────────────────────────
+
+    def get_many(self, keys: Iterable[object]) -> dict[str, dict[str, object]]:
+        """{key: entry} for the (normalised) keys present in the cache."""
+        wanted = list(dict.fromkeys(k for k in map(normalize_key, keys) if k))
+        out: dict[str, dict[str, object]] = {}
+        for i in range(0, len(wanted), QUERY_CHUNK):
+            chunk = wanted[i : i + QUERY_CHUNK]
+            rows = self.conn.execute(
+                "SELECT postcode_key, ok, postcode, longitude, latitude, source FROM geocodes "
+                f"WHERE postcode_key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, ok, postcode, lon, lat, source in rows:
+                entry: dict[str, object] = {"ok": bool(ok), "source": source}
+                if ok:
+                    entry.update(postcode=postcode, longitude=lon, latitude=lat)
+                out[key] = entry
+        return out
+
+    def put_many(self, entries: Mapping[str, Mapping[str, object]], source: str | None = None) -> int:
+        """Insert or replace entries in one transaction; returns the number written."""
+        now = int(time.time())
+        rows = []
+        for key, entry in entries.items():
+            key = normalize_key(key)
+            if not key:
+                continue
+            ok = bool(entry.get("ok"))
+            rows.append((
+                key,
+                int(ok),
+                entry.get("postcode") if ok else None,
+                entry.get("longitude") if ok else None,
+                entry.get("latitude") if ok else None,
+                entry.get("source") or source,
+                now,
+            ))
+        if not rows:
+            return 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return len(rows)
+
+    # ── Migration ────────────────────────────────────────────────────────────
+
+    def _import_legacy_json(self, path: Path) -> None:
+        if not path.exists() or len(self):
+            return
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if isinstance(payload, dict):
+            n = self.put_many({k: v for k, v in payload.items() if isinstance(v, dict)}, source="legacy-json")
+            print(f"  Imported {n:,} entries from legacy cache {path.name}")
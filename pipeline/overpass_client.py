@@ -0,0 +1,276 @@
+"""
+overpass_client.py — shared, cached, concurrent Overpass API client.
+
+Used by the OSM point builders (pubs, supermarkets).  Great Britain is queried
+as GB_CHUNKS bounding boxes:
+
+  • Chunks run on a small thread pool; a shared limiter spaces request starts
+    at least `min_interval` seconds apart so the public server is not hammered.
+  • Every successful response is cached on disk as
+    <cache_dir>/<sha256 of query>.json.gz, so a rerun after a failure resumes
+    from the completed chunks and an unchanged query never hits the network.
+  • A chunk that times out on the server (HTTP 504 or an Overpass "Query timed
+    out"/"out of memory" remark) is split into quadrants and retried, down to
+    MAX_SPLIT_DEPTH levels; other transient errors (429/502/503, dropped
+    connections) are retried with backoff.
+
+Recorded responses can be dropped into a cache directory (named by
+query_hash) and replayed with offline=True, which never touches the network.
+
+Usage (library):
+    client = OverpassClient(cache_dir=INTERMEDIATE_OVERPASS_CACHE_DIR)
+    elements, failed = client.fetch_chunks(tag_query([("amenity", "pub")]))
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from paths import INTERMEDIATE_OVERPASS_CACHE_DIR
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+USER_AGENT = "valuemap-uk/1.0"
+
+BBox = tuple[float, float, float, float]  # (south, west, north, east)
+
+# Split GB into N/S chunks so each Overpass request stays under ~20k nodes.
+GB_CHUNKS: list[BBox] = [
+    (49.8, -6.5,  51.5,  1.8),   # South England
+    (51.5, -3.0,  52.5,  1.8),   # Midlands / East Anglia
+    (52.5, -5.5,  53.5,  0.2),   # North Midlands / Wales N
+    (53.5, -5.5,  54.5, -0.5),   # N England / N Wales
+    (54.5, -3.5,  55.5, -1.0),   # Border / Northumbria
+    (55.5, -6.5,  57.0, -1.0),   # Central Scotland
+    (57.0, -7.5,  58.5, -1.5),   # Highland / N Scotland
+    (58.5, -7.0,  61.0, -0.5),   # Far N Scotland / islands
+    (49.8, -8.2,  55.0, -6.5),   # W England fringe + SW
+    (51.2, -5.5,  52.5, -3.0),   # Wales
+    (52.5, -8.2,  55.0, -5.5),   # Yorkshire coast / far NW
+]
+
+DEFAULT_WORKERS = 2          # overpass-api.de allows a couple of slots per IP
+DEFAULT_MIN_INTERVAL = 1.0   # seconds between request starts
+QUERY_TIMEOUT_S = 60         # [timeout:..] sent to the server
+HTTP_TIMEOUT_S = 90
+RETRIES = 3
+MAX_SPLIT_DEPTH = 3
+RETRY_STATUSES = {429, 502, 503}
+TIMEOUT_REMARKS = ("timed out", "out of memory")
+
+
+class OverpassTimeout(Exception):
+    """The server gave up on a query; a smaller bbox may succeed."""
+
+
+class CacheMiss(Exception):
+    """offline=True and the query has no cached response."""
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.strip().encode("utf-8")).hexdigest()
+
+
+def tag_query(tag_filters: list[tuple[str, str]], timeout: int = QUERY_TIMEOUT_S) -> Callable[[BBox], str]:
+    """bbox → Overpass QL for nodes and ways matching any key=value, with way centres."""
+    def make(bbox: BBox) -> str:
+        bbox_str = ",".join(f"{v:g}" for v in bbox)
+        lines = "".join(
+            f'  node["{k}"="{v}"]({bbox_str});\n  way["{k}"="{v}"]({bbox_str});\n'
+            for k, v in tag_filters
+        )
+        return f"[out:json][timeout:{timeout}];\n(\n{lines});\nout center tags;\n"
+    return make
+
+
+def split_bbox(bbox: BBox) -> list[BBox]:
+    """Four quadrants of bbox."""
+    south, west, north, east = bbox
+    mid_lat, mid_lon = round((south + north) / 2, 4), round((west + east) / 2, 4)
+    return [
+        (south, west, mid_lat, mid_lon),
+        (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon),
+        (mid_lat, mid_lon, north, east),
+    ]
+
+
+class OverpassClient:
+    def __init__(
+        self,
+        base_url: str = OVERPASS_URL,
+        cache_dir: Path | None = INTERMEDIATE_OVERPASS_CACHE_DIR,
+        workers: int = DEFAULT_WORKERS,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        refresh: bool = False,
+        offline: bool = False,
+    ) -> None:
+        self.base_url = base_url
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.workers = max(1, workers)
+        self.min_interval = max(0.0, min_interval)
+        self.refresh = refresh
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # ── Cache ────────────────────────────────────────────────────────────────
+
+    def _cache_path(self, query: str) -> Path | None:
+        return self.cache_dir / f"{query_hash(query)}.json.gz" if self.cache_dir else None
+
+    def _read_cache(self, query: str) -> list[dict] | None:
+        path = self._cache_path(query)
+        if path is None or self.refresh or not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f).get("elements", [])
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, query: str, raw: bytes) -> None:
+        path = self._cache_path(query)
+        if path is None:
+            return
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wb") as f:
+            f.write(raw)
+        tmp.replace(path)
+
+    # ── HTTP ─────────────────────────────────────────────────────────────────
+
+    def _wait_turn(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _post(self, query: str) -> bytes:
+        self._wait_turn()
+        data = urllib.parse.urlencode({"data": query}).encode()
+        req = urllib.request.Request(self.base_url, data=data, headers={"User-Agent": USER_AGENT})
+        try:
+            with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT_S) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as exc:
+            if exc.code == 504:
+                raise OverpassTimeout(f"HTTP {exc.code}") from exc
+            raise
+        except (socket.timeout, TimeoutError) as exc:
+            raise OverpassTimeout(str(exc)) from exc
+
+    def query(self, query: str) -> list[dict]:
+        """Elements for one Overpass QL query (cached; transient errors retried)."""
+        cached = self._read_cache(query)
+        if cached is not None:
+            return cached
+        if self.offline:
+            raise CacheMiss(query_hash(query))
+
+        for attempt in range(RETRIES):
+            try:
+                raw = self._post(query)
+                payload = json.loads(raw)
+                remark = str(payload.get("remark") or "")
+                if any(r in remark.lower() for r in TIMEOUT_REMARKS):
+                    raise OverpassTimeout(remark)
+                self._write_cache(query, raw)
+                return payload.get("elements", [])
+            except OverpassTimeout:
+                raise
+            except urllib.error.HTTPError as exc:
+                if exc.code not in RETRY_STATUSES or attempt == RETRIES - 1:
+                    raise
+            except (urllib.error.URLError, ConnectionError, ValueError):
+                if attempt == RETRIES - 1:
+                    raise
+            time.sleep(self.min_interval * 2 ** (attempt + 1) + 1)
+        raise RuntimeError("unreachable")
+
+    # ── Chunked fetch ────────────────────────────────────────────────────────
+
+    def fetch_bbox(self, make_query: Callable[[BBox], str], bbox: BBox, depth: int = 0) -> list[dict]:
+        """Elements in bbox, splitting into quadrants when the server times out."""
+        try:
+            return self.query(make_query(bbox))
+        except OverpassTimeout as exc:
+            if depth >= MAX_SPLIT_DEPTH:
+                raise
+            print(f"    timeout on {bbox} ({exc}); splitting")
+            out: list[dict] = []
+            for sub in split_bbox(bbox):
+                out.extend(self.fetch_bbox(make_query, sub, depth + 1))
+            return out
+
+    def fetch_chunks(
+        self,
+        make_query: Callable[[BBox], str],
+        chunks: list[BBox] = GB_CHUNKS,
+    ) -> tuple[list[dict], list[BBox]]:
+        """
+        Elements from every chunk (deduplicated by type/id across chunks),
+        plus the chunks that still failed.  Completed chunks are cached, so
+        rerunning after a failure only refetches the failed ones.
+        """
+        def run(bbox: BBox) -> list[dict]:
+            return self.fetch_bbox(make_query, bbox)
+
+        elements: list[dict] = []
+        failed: list[BBox] = []
+        seen: set[tuple[str, int]] = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(run, bbox) for bbox in chunks]
+            for i, (bbox, fut) in enumerate(zip(chunks, futures), start=1):
+                try:
+                    chunk_elements = fut.result()
+                except Exception as exc:
+                    print(f"  Chunk {i}/{len(chunks)}: bbox={bbox} FAILED: {exc}")
+                    failed.append(bbox)
+                    continue
+                new = 0
+                for el in chunk_elements:
+                    uid = (el.get("type"), el.get("id"))
+                    if uid not in seen:
+                        seen.add(uid)
+                        elements.append(el)
+                        new += 1
+                print(f"  Chunk {i}/{len(chunks)}: bbox={bbox} {len(chunk_elements):,} elements ({new:,} new)")
+        return elements, failed
+
+
+def add_client_args(parser) -> None:
+    """Shared CLI options for builders that use OverpassClient."""
+    parser.add_argument("--overpass-url", default=OVERPASS_URL, help="Overpass interpreter endpoint")
+    parser.add_argument("--cache-dir", default=str(INTERMEDIATE_OVERPASS_CACHE_DIR),
+                        help="Directory for cached Overpass responses (keyed by query hash)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent Overpass requests")
+    parser.add_argument("--pause", type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="Minimum seconds between Overpass request starts")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached responses and refetch every chunk")
+    parser.add_argument("--offline", action="store_true", help="Serve only cached responses; never hit the network")
+
+
+def client_from_args(args) -> OverpassClient:
+    return OverpassClient(
+        base_url=args.overpass_url,
+        cache_dir=Path(args.cache_dir),
+        workers=args.workers,
+        min_interval=args.pause,
+        refresh=args.refresh,
+        offline=args.offline,
+    )
@@ -26,12 +26,21 @@ INTERMEDIATE_SCHOOLS_DIR = INTERMEDIATE_DIR / "schools"
 INTERMEDIATE_PROPERTY_DIR = INTERMEDIATE_DIR / "property"
 INTERMEDIATE_EPC_DIR = INTERMEDIATE_DIR / "epc"
 INTERMEDIATE_STATIONS_DIR = INTERMEDIATE_DIR / "stations"
+INTERMEDIATE_CRIME_DIR = INTERMEDIATE_DIR / "crime"
+INTERMEDIATE_GEOGRAPHY_DIR = INTERMEDIATE_DIR / "geography"
+INTERMEDIATE_FLOOD_DIR = INTERMEDIATE_DIR / "flood"
+# Per-day flood-monitoring archive CSVs (gzip) + ETag sidecars
+INTERMEDIATE_FLOOD_ARCHIVE_DIR = INTERMEDIATE_FLOOD_DIR / "archive"
+INTERMEDIATE_RASTER_WEIGHTS_DIR = INTERMEDIATE_GEOGRAPHY_DIR / "raster_weights"
+# Overpass API responses (gzip JSON) keyed by query hash
+INTERMEDIATE_OVERPASS_CACHE_DIR = INTERMEDIATE_DIR / "overpass"
 
 MODEL_SCHOOLS_DIR = MODEL_DIR / "schools"
 MODEL_FLOOD_DIR = MODEL_DIR / "flood"
 MODEL_VOTE_DIR = MODEL_DIR / "vote"
 MODEL_EPC_DIR = MODEL_DIR / "epc"
 MODEL_PROPERTY_DIR = MODEL_DIR / "property"
+MODEL_CELL_UNIVERSE_TEMPLATE = MODEL_PROPERTY_DIR / "cell_universe_{grid}.parquet"
 MODEL_STATIONS_DIR = MODEL_DIR / "stations"
 MODEL_CENSUS_DIR = MODEL_DIR / "census"
 
@@ -63,7 +72,7 @@ INTERMEDIATE_SCHOOL_POSTCODE_SCORES = INTERMEDIATE_SCHOOLS_DIR / "school_postcod
 INTERMEDIATE_SCHOOL_POSTCODE_SCORES_MAINSTREAM = INTERMEDIATE_SCHOOLS_DIR / "school_postcode_scores_202425_mainstream.csv"
 INTERMEDIATE_SCHOOL_SCORES = INTERMEDIATE_SCHOOLS_DIR / "school_scores_202425.csv"
 INTERMEDIATE_SCHOOL_SCORES_MAINSTREAM = INTERMEDIATE_SCHOOLS_DIR / "school_scores_202425_mainstream.csv"
-INTERMEDIATE_SCHOOL_POSTCODE_CACHE = INTERMEDIATE_SCHOOLS_DIR / "school_postcode_coords_cache.json"
+INTERMEDIATE_SCHOOL_POSTCODE_CACHE = INTERMEDIATE_SCHOOLS_DIR / "school_postcode_coords_cache.sqlite"
 
 MODEL_SCHOOL_OVERLAY_POINTS = MODEL_SCHOOLS_DIR / "school_overlay_points.geojson.gz"
 MODEL_PRIMARY_SCHOOL_OVERLAY_POINTS = MODEL_SCHOOLS_DIR / "primary_school_overlay_points.geojson.gz"
@@ -71,6 +80,7 @@ MODEL_STATION_OVERLAY_POINTS = MODEL_STATIONS_DIR / "station_overlay_points.geoj
 MODEL_FLOOD_POSTCODE_LOOKUP = MODEL_FLOOD_DIR / "flood_postcode_lookup.json.gz"
 MODEL_FLOOD_OUTCODE_SUMMARY = MODEL_FLOOD_DIR / "flood_outcode_summary.json.gz"
 MODEL_FLOOD_POSTCODE_POINTS = MODEL_FLOOD_DIR / "flood_postcode_points.geojson.gz"
+MODEL_FLOOD_CELLS_TEMPLATE = MODEL_FLOOD_DIR / "flood_cells_{grid}.json.gz"
 
 RAW_CRIME_DIR = RAW_DIR / "crime"
 RAW_CRIME_LATEST_ZIP = RAW_CRIME_DIR / "latest.zip"
@@ -78,6 +88,8 @@ RAW_CRIME_LATEST_ZIP = RAW_CRIME_DIR / "latest.zip"
 MODEL_CRIME_DIR = MODEL_DIR / "crime"
 MODEL_CRIME_OVERLAY = MODEL_CRIME_DIR / "crime_overlay_lsoa.geojson.gz"
 MODEL_CRIME_CELLS_TEMPLATE = MODEL_CRIME_DIR / "crime_cells_{grid}.json.gz"
+INTERMEDIATE_CRIME_MONTHLY_DIR = INTERMEDIATE_CRIME_DIR / "monthly_counts"
+INTERMEDIATE_CRIME_CELL_POPULATION_TEMPLATE = INTERMEDIATE_CRIME_DIR / "crime_cell_population_{grid}.parquet"
 
 PUBLISH_CRIME_DIR = PUBLISH_DIR / "crime"
 
@@ -93,11 +105,19 @@ MODEL_BROADBAND_CELLS_TEMPLATE = MODEL_BROADBAND_DIR / "broadband_cells_{grid}.j
 MODEL_LISTED_BUILDING_CELLS_DIR = MODEL_DIR / "listed_building_cells"
 MODEL_LISTED_BUILDING_CELLS_TEMPLATE = MODEL_LISTED_BUILDING_CELLS_DIR / "listed_building_cells_{grid}.json.gz"
 
+INTERMEDIATE_EPC_LATEST = INTERMEDIATE_EPC_DIR / "epc_latest_by_property.parquet"
+INTERMEDIATE_EPC_CELL_COUNTS_TEMPLATE = INTERMEDIATE_EPC_DIR / "epc_cell_counts_{grid}.parquet"
+INTERMEDIATE_EPC_STATE = INTERMEDIATE_EPC_DIR / "epc_incremental_state.json"
+
 MODEL_EPC_FUEL_CELLS_TEMPLATE = MODEL_EPC_DIR / "epc_fuel_cells_{grid}.json.gz"
 MODEL_EPC_AGE_CELLS_TEMPLATE  = MODEL_EPC_DIR / "epc_age_cells_{grid}.json.gz"
+MODEL_EPC_RETROFIT_CELLS_TEMPLATE = MODEL_EPC_DIR / "epc_retrofit_cells_{grid}.json.gz"
 
 MODEL_VOTE_BLOCKS_BY_CONSTITUENCY_CSV = MODEL_VOTE_DIR / "ge2024_vote_blocks_by_constituency.csv"
 MODEL_VOTE_BLOCKS_MAP_GEOJSON = MODEL_VOTE_DIR / "ge2024_vote_blocks_map.geojson"
+# Per-zoom simplified variants. Build-side only for now: the map colours vote
+# cells, so these are neither uploaded to R2 nor served.
+MODEL_VOTE_BLOCKS_MAP_ZOOM_TEMPLATE = MODEL_VOTE_DIR / "ge2024_vote_blocks_map_z{zoom}.geojson"
 
 REQUIRED_PROPERTY_ASSET_NAMES = [
     "grid_1mile_full.json.gz",
@@ -137,6 +157,9 @@ def ensure_pipeline_dirs() -> None:
         INTERMEDIATE_SCHOOLS_DIR,
         INTERMEDIATE_PROPERTY_DIR,
         INTERMEDIATE_EPC_DIR,
+        INTERMEDIATE_RASTER_WEIGHTS_DIR,
+        INTERMEDIATE_FLOOD_ARCHIVE_DIR,
+        INTERMEDIATE_OVERPASS_CACHE_DIR,
         MODEL_SCHOOLS_DIR,
         MODEL_FLOOD_DIR,
         MODEL_VOTE_DIR,
@@ -154,6 +177,7 @@ def ensure_pipeline_dirs() -> None:
         RAW_CENSUS_DIR,
         MODEL_CENSUS_DIR,
         RAW_CRIME_DIR,
+        INTERMEDIATE_CRIME_MONTHLY_DIR,
         MODEL_CRIME_DIR,
         PUBLISH_CRIME_DIR,
         RAW_BROADBAND_DIR,
@@ -0,0 +1,363 @@
+"""
+polygon_raster.py — polygon geometry helpers and an area-weighted
+polygon → grid-cell rasterizer for boundary GeoJSON (WGS84).
+
+Each cell is supersampled with an S × S lattice of BNG points; the share of
+a cell's samples falling in each polygon is its area fraction (exact as S
+grows; S=4 resolves boundaries to ~1/16 of a cell).  The result is a sparse
+cell × polygon weight matrix stored as COO triplets and cached on disk under
+INTERMEDIATE_RASTER_WEIGHTS_DIR, keyed by a hash of the polygon keys and
+coordinates (not the feature properties), the cell list and the sampling
+parameters.  Any per-polygon dataset keyed by the same property (e.g. ons_id
+for constituencies) then maps to cells with one sparse matrix multiply
+(CellWeights.align / CellWeights.apply), and changing those values never
+triggers a re-rasterize.
+
+Usage (library):
+    weights = load_or_build_weights(boundary_path, "ons_id", gx, gy, 1600)
+    shares = weights.apply(weights.align({"E14001063": 41.2, ...}))
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from paths import INTERMEDIATE_RASTER_WEIGHTS_DIR
+
+DEFAULT_SUPERSAMPLE = 4
+
+# Cells sampled per batch while rasterizing (bounds the S² × cells point arrays)
+CELL_BATCH = 50_000
+
+# Ring edges tested per block in points_in_ring (bounds the points × edges matrix)
+EDGE_BLOCK = 64
+
+
+def load_json_maybe_gz(path: Path):
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ── Geometry ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class PolygonPart:
+    outer: np.ndarray          # (n, 2) lon/lat vertices
+    holes: List[np.ndarray]
+
+
+@dataclass
+class Boundary:
+    key: str
+    bbox: Tuple[float, float, float, float]
+    parts: List[PolygonPart]
+
+
+def points_in_ring(lon: np.ndarray, lat: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """Even-odd ray-crossing test for many points against one ring (n × 2 array)."""
+    inside = np.zeros(len(lon), dtype=bool)
+    n = len(ring)
+    if n < 3 or len(lon) == 0:
+        return inside
+    # Edge i joins vertex i to vertex j = i - 1 (wrapping)
+    xi_all, yi_all = ring[:, 0], ring[:, 1]
+    xj_all, yj_all = np.roll(xi_all, 1), np.roll(yi_all, 1)
+    px = lon[:, None]
+    py = lat[:, None]
+    for start in range(0, n, EDGE_BLOCK):
+        sl = slice(start, start + EDGE_BLOCK)
+        xi, yi, xj, yj = xi_all[sl], yi_all[sl], xj_all[sl], yj_all[sl]
+        dy = yj - yi
+        dy = np.where(dy != 0, dy, 1e-18)
+        straddles = (yi > py) != (yj > py)
+        with np.errstate(invalid="ignore", over="ignore"):
+            crosses = px < (xj - xi) * (py - yi) / dy + xi
+        inside ^= (np.count_nonzero(straddles & crosses, axis=1) % 2).astype(bool)
+    return inside
+
+
+def points_in_polygon_parts(lon: np.ndarray, lat: np.ndarray, parts: List[PolygonPart]) -> np.ndarray:
+    """True where a point is inside some part's outer ring and none of its holes."""
+    hit = np.zeros(len(lon), dtype=bool)
+    for part in parts:
+        todo = ~hit
+        if not todo.any():
+            break
+        idx = np.flatnonzero(todo)
+        in_outer = points_in_ring(lon[idx], lat[idx], part.outer)
+        idx = idx[in_outer]
+        for hole in part.holes:
+            if len(idx) == 0:
+                break
+            idx = idx[~points_in_ring(lon[idx], lat[idx], hole)]
+        hit[idx] = True
+    return hit
+
+
+def ring_bbox(ring: np.ndarray) -> Tuple[float, float, float, float]:
+    lo = ring.min(axis=0)
+    hi = ring.max(axis=0)
+    return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+
+def merge_bbox(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]):
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def geometry_parts(geom: dict) -> Tuple[List[PolygonPart], Optional[Tuple[float, float, float, float]]]:
+    """Parts and bbox of a Polygon / MultiPolygon geometry (empty for anything else)."""
+    gtype = geom.get("type")
+    coords = geom.get("coordinates")
+    if gtype not in {"Polygon", "MultiPolygon"} or not coords:
+        return [], None
+
+    polygon_sets = [coords] if gtype == "Polygon" else coords
+    parts: List[PolygonPart] = []
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    for poly in polygon_sets:
+        if not poly:
+            continue
+        outer = np.asarray(poly[0], dtype=np.float64)[:, :2]
+        holes = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in poly[1:]]
+        parts.append(PolygonPart(outer=outer, holes=holes))
+        outer_bbox = ring_bbox(outer)
+        bbox = outer_bbox if bbox is None else merge_bbox(bbox, outer_bbox)
+    return parts, bbox
+
+
+def match_polygons(lon: np.ndarray, lat: np.ndarray, polygons: Sequence) -> np.ndarray:
+    """
+    Index of the first polygon (in sequence order) containing each point, or
+    -1.  Polygons need .bbox and .parts; each only tests the still-unmatched
+    points inside its bbox.
+    """
+    match = np.full(len(lon), -1, dtype=np.int64)
+    for idx, poly in enumerate(polygons):
+        min_lon, min_lat, max_lon, max_lat = poly.bbox
+        cand = np.flatnonzero(
+            (match < 0) & (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        )
+        if len(cand) == 0:
+            continue
+        hit = points_in_polygon_parts(lon[cand], lat[cand], poly.parts)
+        match[cand[hit]] = idx
+    return match
+
+
+def load_boundaries(path: Path, key_prop: str) -> List[Boundary]:
+    """Polygon features of a boundary GeoJSON keyed by properties[key_prop]."""
+    gj = load_json_maybe_gz(path)
+    out: List[Boundary] = []
+    for feature in gj.get("features", []):
+        key = str((feature.get("properties") or {}).get(key_prop) or "").strip()
+        parts, bbox = geometry_parts(feature.get("geometry") or {})
+        if key and parts and bbox is not None:
+            out.append(Boundary(key=key, bbox=bbox, parts=parts))
+    return out
+
+
+# ── Cell × polygon weights ─────────────────────────────────────────────────────
+
+@dataclass
+class CellWeights:
+    """Sparse cell × polygon area fractions (COO: cell_idx, poly_idx, weight)."""
+    gx: np.ndarray
+    gy: np.ndarray
+    keys: List[str]
+    cell_idx: np.ndarray
+    poly_idx: np.ndarray
+    weight: np.ndarray
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.gx)
+
+    def coverage(self) -> np.ndarray:
+        """Fraction of each cell covered by any polygon (0 for sea / outside)."""
+        return np.bincount(self.cell_idx, weights=self.weight, minlength=self.n_cells)
+
+    def dominant(self) -> np.ndarray:
+        """Polygon index covering the largest share of each cell, or -1."""
+        out = np.full(self.n_cells, -1, dtype=np.int64)
+        if len(self.weight) == 0:
+            return out
+        # Sort by (cell, weight) so the last entry per cell is its largest share
+        order = np.lexsort((self.weight, self.cell_idx))
+        cells = self.cell_idx[order]
+        last = np.r_[cells[1:] != cells[:-1], True]
+        out[cells[last]] = self.poly_idx[order][last]
+        return out
+
+    def align(self, values: Mapping[str, object]) -> np.ndarray:
+        """Per-polygon values (key → scalar or sequence) as an array aligned with keys; NaN if absent."""
+        sample = next(iter(values.values()), 0.0)
+        width = len(sample) if isinstance(sample, (list, tuple, np.ndarray)) else None
+        shape = (len(self.keys),) if width is None else (len(self.keys), width)
+        out = np.full(shape, np.nan)
+        for i, key in enumerate(self.keys):
+            if key in values:
+                out[i] = values[key]
+        return out
+
+    def apply(self, poly_values: np.ndarray) -> np.ndarray:
+        """
+        Area-weighted mean of per-polygon values for every cell: the sparse
+        product W · v, normalised by the covered weight so coastal cells are
+        not diluted by sea.  NaN polygon values are left out; cells with no
+        valued coverage are NaN.  Accepts (n_keys,) or (n_keys, k).
+        """
+        v = np.asarray(poly_values, dtype=np.float64)
+        flat = v.ndim == 1
+        v = v.reshape(len(self.keys), -1)
+        out = np.full((self.n_cells, v.shape[1]), np.nan)
+        for j in range(v.shape[1]):
+            col = v[self.poly_idx, j]
+            valid = ~np.isnan(col)
+            w = self.weight * valid
+            num = np.bincount(self.cell_idx, weights=np.where(valid, col, 0.0) * w, minlength=self.n_cells)
+            den = np.bincount(self.cell_idx, weights=w, minlength=self.n_cells)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[:, j] = np.where(den > 0, num / den, np.nan)
+        return out[:, 0] if flat else out
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            gx=self.gx, gy=self.gy, keys=np.array(self.keys, dtype=str),
+            cell_idx=self.cell_idx, poly_idx=self.poly_idx, weight=self.weight,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "CellWeights":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(
+                gx=z["gx"], gy=z["gy"], keys=[str(k) for k in z["keys"]],
+                cell_idx=z["cell_idx"], poly_idx=z["poly_idx"], weight=z["weight"],
+            )
+
+
+def rasterize(
+    boundaries: List[Boundary],
+    gx: np.ndarray,
+    gy: np.ndarray,
+    grid_m: int,
+    supersample: int = DEFAULT_SUPERSAMPLE,
+) -> CellWeights:
+    """Supersampled area fraction of every boundary in every (gx, gy) cell."""
+    from pyproj import Transformer
+
+    transformer = Transformer.from_crs("EPSG:27700", "EPSG:4326", always_xy=True)
+    s = int(supersample)
+    offsets = (np.arange(s) + 0.5) / s * grid_m
+    ox, oy = [a.ravel() for a in np.meshgrid(offsets, offsets, indexing="ij")]
+    n_poly = len(boundaries)
+
+    cell_parts: List[np.ndarray] = []
+    poly_parts: List[np.ndarray] = []
+    count_parts: List[np.ndarray] = []
+    for start in range(0, len(gx), CELL_BATCH):
+        bx = gx[start:start + CELL_BATCH].astype(np.float64)
+        by = gy[start:start + CELL_BATCH].astype(np.float64)
+        px = (bx[:, None] + ox[None, :]).ravel()
+        py = (by[:, None] + oy[None, :]).ravel()
+        lon, lat = transformer.transform(px, py)
+        match = match_polygons(np.asarray(lon), np.asarray(lat), boundaries)
+
+        cell = np.repeat(np.arange(start, start + len(bx)), s * s)
+        hit = match >= 0
+        pairs, counts = np.unique(cell[hit] * n_poly + match[hit], return_counts=True)
+        cell_parts.append(pairs // n_poly)
+        poly_parts.append(pairs % n_poly)
+        count_parts.append(counts)
+
+    counts = np.concatenate(count_parts) if count_parts else np.zeros(0, dtype=np.int64)
+    return CellWeights(
+        gx=np.asarray(gx, dtype=np.int64),
+        gy=np.asarray(gy, dtype=np.int64),
+        keys=[b.key for b in boundaries],
+        cell_idx=(np.concatenate(cell_parts) if cell_parts else np.zeros(0)).astype(np.int32),
+        poly_idx=(np.concatenate(poly_parts) if poly_parts else np.zeros(0)).astype(np.int32),
+        weight=(counts / (s * s)).astype(np.float32),
+    )
+
+
+def boundaries_digest(boundaries: Sequence) -> str:
+    """sha1 over the ordered (key, ring coordinates) of the boundaries — geometry only."""
+    digest = hashlib.sha1()
+    for b in boundaries:
+        digest.update(f"{b.key}\x00{len(b.parts)}".encode("utf-8"))
+        for part in b.parts:
+            for ring in [part.outer, *part.holes]:
+                digest.update(len(ring).to_bytes(8, "little"))
+                digest.update(np.ascontiguousarray(ring, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def weights_cache_path(
+    name: str,
+    boundaries: Sequence,
+    gx: np.ndarray,
+    gy: np.ndarray,
+    grid_m: int,
+    supersample: int,
+) -> Path:
+    digest = hashlib.sha1(boundaries_digest(boundaries).encode("ascii"))
+    digest.update(np.asarray(gx, dtype=np.int64).tobytes())
+    digest.update(np.asarray(gy, dtype=np.int64).tobytes())
+    digest.update(f"{grid_m}|{supersample}".encode("utf-8"))
+    return INTERMEDIATE_RASTER_WEIGHTS_DIR / f"{name}_{grid_m}m_s{supersample}_{digest.hexdigest()[:12]}.npz"
+
+
+def cached_weights(
+    boundaries: Sequence,
+    gx: np.ndarray,
+    gy: np.ndarray,
+    grid_m: int,
+    supersample: int = DEFAULT_SUPERSAMPLE,
+    name: str = "boundaries",
+) -> CellWeights:
+    """
+    Cached CellWeights for these boundaries (anything with .key, .bbox and
+    .parts) and cells, rasterizing on a miss.  The cache key covers geometry
+    and keys only, so per-polygon values can change without a re-rasterize.
+    """
+    if not boundaries:
+        raise ValueError(f"No polygons to rasterize for {name}")
+    path = weights_cache_path(name, boundaries, gx, gy, grid_m, supersample)
+    if path.exists():
+        print(f"  raster weights: cached {path.name}")
+        return CellWeights.load(path)
+    print(f"  raster weights: {len(boundaries):,} polygons × {len(gx):,} cells (S={supersample}) …")
+    weights = rasterize(list(boundaries), gx, gy, grid_m, supersample)
+    weights.save(path)
+    print(f"  raster weights: {len(weights.weight):,} non-zero → {path.name}")
+    return weights
+
+
+def load_or_build_weights(
+    boundary_path: Path,
+    key_prop: str,
+    gx: np.ndarray,
+    gy: np.ndarray,
+    grid_m: int,
+    supersample: int = DEFAULT_SUPERSAMPLE,
+) -> CellWeights:
+    """Cached CellWeights for a boundary GeoJSON keyed by properties[key_prop]."""
+    boundaries = load_boundaries(boundary_path, key_prop)
+    if not boundaries:
+        raise ValueError(f"No polygon features with a '{key_prop}' property in {boundary_path}")
+    stem = boundary_path.name.split(".")[0]
+    return cached_weights(boundaries, gx, gy, grid_m, supersample, name=f"{stem}_{key_prop}")
@@ -0,0 +1,261 @@
+"""
+postcode_geocoder.py — offline batch postcode → WGS84 geocoding against ONSPD.
+
+Replaces the postcodes.io bulk API in the facility builders (pharmacies, GP
+surgeries, schools).  The ONSPD CSV is reduced once to a compact centroid
+table (postcode_key, longitude, latitude, terminated) cached as Parquet under
+INTERMEDIATE_GEOGRAPHY_DIR and keyed on the CSV's size and mtime, so later runs
+load it in well under a second.  Lookups are a single vectorised index join.
+
+Match order for each query postcode:
+  live        active ONSPD postcode
+  terminated  postcode since terminated (facility lists often lag behind);
+              skipped when allow_terminated=False
+  outcode     centroid of the live postcodes in the same outward code;
+              only when outcode_fallback=True
+  unmatched   none of the above (longitude/latitude NaN)
+
+Usage (library):
+    from postcode_geocoder import geocode, geocode_dict
+    frame = geocode(["SW1A 1AA", "eh1 1yz"])       # one row per query
+    coords = geocode_dict(postcodes)                # {query: (lon, lat)}
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+import csv_ingest
+from paths import INTERMEDIATE_GEOGRAPHY_DIR, RAW_PROPERTY_DIR
+
+DEFAULT_ONSPD = RAW_PROPERTY_DIR / "ONSPD_Online_latest_Postcode_Centroids_.csv"
+CENTROID_CACHE = INTERMEDIATE_GEOGRAPHY_DIR / "postcode_centroids.parquet"
+
+STATUSES = ["live", "terminated", "outcode", "unmatched"]
+
+_TABLES: dict[Path, pd.DataFrame] = {}
+
+
+def normalize_postcode_keys(values: Iterable[object]) -> pd.Series:
+    """Upper-case, whitespace-free postcode keys ("" for missing values)."""
+    series = pd.Series(list(values), dtype="string")
+    return series.str.upper().str.replace(r"\s+", "", regex=True).fillna("")
+
+
+def _read_onspd(path: Path) -> pd.DataFrame:
+    cols = {c.lower().strip(): c for c in csv_ingest.read_header(path)}
+    pc_col = cols.get("pcds") or cols.get("pcd7") or cols.get("pcd")
+    lat_col = cols.get("lat") or cols.get("latitude")
+    lon_col = cols.get("long") or cols.get("lon") or cols.get("longitude")
+    term_col = cols.get("doterm")
+    if not all([pc_col, lat_col, lon_col]):
+        raise RuntimeError("Cannot detect postcode/lat/long columns in ONSPD")
+
+    wanted = {pc_col: "string", lat_col: "float64", lon_col: "float64"}
+    if term_col:
+        wanted[term_col] = "string"
+    df = csv_ingest.read_csv(path, wanted, filters=[(pc_col, "notnull", None)])
+
+    lat = df[lat_col].to_numpy(dtype="float64")
+    lon = df[lon_col].to_numpy(dtype="float64")
+    # ONSPD marks postcodes without a grid reference with lat 99.999999
+    no_grid = ~np.isfinite(lat) | ~np.isfinite(lon) | (np.abs(lat) > 90)
+    table = pd.DataFrame({
+        "postcode_key": normalize_postcode_keys(df[pc_col]).to_numpy(),
+        "longitude": np.where(no_grid, np.nan, lon),
+        "latitude": np.where(no_grid, np.nan, lat),
+        "terminated": (
+            df[term_col].fillna("").str.strip().ne("").to_numpy(dtype=bool)
+            if term_col else np.zeros(len(df), dtype=bool)
+        ),
+    })
+    table = table[(table["postcode_key"].str.len() > 0) & table["latitude"].notna()]
+    # Prefer the live record when a key appears twice
+    table = table.sort_values("terminated", kind="stable").drop_duplicates("postcode_key")
+    return table.reset_index(drop=True)
+
+
+def load_postcode_table(onspd_path: Path = DEFAULT_ONSPD, cache_path: Path = CENTROID_CACHE) -> pd.DataFrame:
+    """
+    Centroid table indexed by postcode_key: longitude, latitude, terminated.
+    Built from ONSPD on first use (or when the CSV changes) and memoised per process.
+    """
+    onspd_path = Path(onspd_path)
+    if onspd_path in _TABLES:
+        return _TABLES[onspd_path]
+    if not onspd_path.exists():
+        raise FileNotFoundError(f"ONSPD not found: {onspd_path}")
+
+    stat = onspd_path.stat()
+    stamp = f"{onspd_path.name}:{stat.st_size}:{int(stat.st_mtime)}"
+    table = None
+    if cache_path.exists():
+        cached = pd.read_parquet(cache_path)
+        if cached.attrs.get("source") == stamp or (
+            "source" in cached.columns and len(cached) and cached["source"].iloc[0] == stamp
+        ):
+            table = cached.drop(columns=["source"], errors="ignore")
+
+    if table is None:
+        print(f"  Building postcode centroid table from {onspd_path.name} …")
+        table = _read_onspd(onspd_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f"{cache_path.name}.tmp")
+        table.assign(source=pd.Categorical([stamp] * len(table))).to_parquet(tmp, index=False)
+        tmp.replace(cache_path)
+
+    table = table.set_index("postcode_key")
+    _TABLES[onspd_path] = table
+    return table
+
+
+def outcode_centroids(table: pd.DataFrame) -> pd.DataFrame:
+    """Mean longitude/latitude of live postcodes per outward code."""
+    live = table[~table["terminated"]]
+    outcodes = live.index.str[:-3]
+    return live[["longitude", "latitude"]].groupby(outcodes).mean()
+
+
+def geocode(
+    postcodes: Iterable[object],
+    table: pd.DataFrame | None = None,
+    *,
+    allow_terminated: bool = True,
+    outcode_fallback: bool = False,
+) -> pd.DataFrame:
+    """
+    One row per query (in input order): query, postcode_key, longitude,
+    latitude, status (see module docstring).
+    """
+    queries = list(postcodes)
+    keys = normalize_postcode_keys(queries)
+    if table is None:
+        table = load_postcode_table()
+
+    pos = table.index.get_indexer(keys)
+    found = pos >= 0
+    take = np.where(found, pos, 0)
+    terminated = found & table["terminated"].to_numpy()[take]
+    if not allow_terminated:
+        found &= ~terminated
+    lon = np.where(found, table["longitude"].to_numpy()[take], np.nan)
+    lat = np.where(found, table["latitude"].to_numpy()[take], np.nan)
+    status = np.where(found, np.where(terminated, 1, 0), 3)
+
+    if outcode_fallback and (~found).any():
+        centroids = outcode_centroids(table)
+        miss = ~found & (keys.str.len() > 3).to_numpy()
+        opos = centroids.index.get_indexer(keys.str[:-3][miss])
+        hit = opos >= 0
+        idx = np.flatnonzero(miss)[hit]
+        lon[idx] = centroids["longitude"].to_numpy()[opos[hit]]
+        lat[idx] = centroids["latitude"].to_numpy()[opos[hit]]
+        status[idx] = 2
+
+    return pd.DataFrame({
+        "query": queries,
+        "postcode_key": keys.to_numpy(),
+        "longitude": lon,
+        "latitude": lat,
+        "status": pd.Categorical.from_codes(status, categories=STATUSES),
+    })
+
+
+def coords_by_query(frame: pd.DataFrame) -> dict[object, tuple[float, float]]:
+    """{query: (lon, lat)} for the rows of a geocode() frame that resolved."""
+    ok = frame["status"] != "unmatched"
+    return {
+        q: (lon, lat)
+        for q, lon, lat in zip(
+            frame.loc[ok, "query"].tolist(),
+            frame.loc[ok, "longitude"].tolist(),
+            frame.loc[ok, "latitude"].tolist(),
+        )
+    }
+
+
+def geocode_dict(
+    postcodes: Iterable[object],
+    table: pd.DataFrame | None = None,
+    *,
+    allow_terminated: bool = True,
+    outcode_fallback: bool = False,
+) -> dict[object, tuple[float, float]]:
+    """{query: (lon, lat)} for the queries that resolved."""
+    return coords_by_query(
+        geocode(postcodes, table, allow_terminated=allow_terminated, outcode_fallback=outcode_fallback)
+    )
+
+
+def format_postcode(key: str) -> str:
+    """Canonical spaced form of a normalised key ("SW1A1AA" → "SW1A 1AA")."""
+    return f"{key[:-3]} {key[-3:]}" if len(key) > 3 else key
+
+
+def cache_entries(frame: pd.DataFrame) -> dict[str, dict[str, object]]:
+    """
+    {postcode_key: {"ok", "postcode", "longitude", "latitude", "source"}} for a
+    geocode() frame, in the shape the school builders keep in their coordinate cache.
+    """
+    out: dict[str, dict[str, object]] = {}
+    for key, lon, lat, status in zip(
+        frame["postcode_key"].tolist(),
+        frame["longitude"].tolist(),
+        frame["latitude"].tolist(),
+        frame["status"].astype(str).tolist(),
+    ):
+        if not key:
+            continue
+        if status == "unmatched":
+            out[key] = {"ok": False, "source": "onspd"}
+            continue
+        out[key] = {
+            "ok": True,
+            "postcode": format_postcode(key),
+            "longitude": float(lon),
+            "latitude": float(lat),
+            "source": "onspd" if status == "live" else f"onspd:{status}",
+        }
+    return out
+
+
+def is_exact_entry(entry: dict[str, object] | None) -> bool:
+    """
+    True for a cache entry from a live ONSPD match.  Terminated and
+    outcode-centroid hits, misses and entries from older sources are looked up
+    again, so they are replaced once ONSPD has the real postcode (or the
+    fallback is no longer requested).
+    """
+    return bool(entry and entry.get("ok") and entry.get("source") == "onspd")
+
+
+def _entry_rank(entry: dict[str, object] | None) -> int:
+    if not entry or not entry.get("ok"):
+        return 0
+    return 1 if entry.get("source") == "onspd:outcode" else 2
+
+
+def improved_entries(
+    cached: dict[str, dict[str, object]],
+    fetched: dict[str, dict[str, object]],
+) -> dict[str, dict[str, object]]:
+    """
+    The fetched entries that are at least as good as what the cache holds.
+    An ONSPD miss (or outcode centroid) never replaces real coordinates
+    already cached, e.g. postcodes.io results imported from the legacy JSON
+    for postcodes this ONSPD vintage lacks.
+    """
+    return {
+        key: entry for key, entry in fetched.items()
+        if _entry_rank(entry) >= _entry_rank(cached.get(key))
+    }
+
+
+def summarize(frame: pd.DataFrame) -> str:
+    """One-line match-status breakdown, e.g. "live: 9,812, terminated: 14, …"."""
+    counts = frame["status"].value_counts()
+    return ", ".join(f"{s}: {int(counts.get(s, 0)):,}" for s in STATUSES)
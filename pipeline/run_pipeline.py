@@ -126,6 +126,14 @@ def run_flood() -> None:
             str(MODEL_FLOOD_DIR),
         ],
     )
+    run_step(
+        "flood-cells",
+        [
+            str(SCRIPT_DIR / "build_flood_cells.py"),
+            "--output",
+            str(MODEL_FLOOD_DIR),
+        ],
+    )
 
 
 def run_stations() -> None:
@@ -219,22 +227,27 @@ def run_primary_schools() -> None:
     )
 
 
-def run_epc() -> None:
+def run_epc(incremental: bool = False) -> None:
     """
-    Build EPC fuel and age-band cell grids from the MHCLG bulk EPC download.
+    Build EPC fuel, age-band and retrofit-recommendation cell grids from the
+    MHCLG bulk EPC download.
     Requires: raw/epc/all-domestic-certificates.zip downloaded manually from
               https://epc.opendatacommunities.org/domestic/search (free registration).
+    With incremental=True only certificates lodged since the last run are
+    extracted and folded into the persisted per-property table.
     Uploads via: upload_model_assets_to_r2.py (--skip-epc to omit).
     """
-    run_step("epc-enrich", [str(SCRIPT_DIR / "build_epc_enriched.py")])
-    run_step("epc-cells",  [str(SCRIPT_DIR / "build_epc_cells.py")])
+    extra = ["--incremental"] if incremental else []
+    run_step("epc-enrich", [str(SCRIPT_DIR / "build_epc_enriched.py"), *extra])
+    run_step("epc-cells",  [str(SCRIPT_DIR / "build_epc_cells.py"), *extra])
+    run_step("epc-retrofit", [str(SCRIPT_DIR / "build_epc_retrofit_cells.py")])
 
 
 def run_country_lookup() -> None:
     """
     Build slim country-lookup assets (country_cells_{grid}.json.gz and
-    country_by_outward.json.gz) from vote cell outputs and ONSPD.
-    Must run AFTER run_vote() since it reads the staged vote cell files.
+    country_by_outward.json.gz) from the ONSPD ctry column.
+    Independent of the vote build; needs only raw/property ONSPD.
     Uploads via: python pipeline/_upload_country_assets.py
     """
     run_step("country-lookup", [str(SCRIPT_DIR / "build_country_lookup_assets.py")])
@@ -256,7 +269,7 @@ def run_transit() -> None:
 
     Bus stops and metro/tram: downloaded from the free NaPTAN API (DfT).
     Pharmacies: downloaded from NHS BSA Consolidated Pharmaceutical List (geocoded
-    via postcodes.io). England only; Scotland/Wales pharmacies are not included.
+    offline against ONSPD). England only; Scotland/Wales pharmacies are not included.
     GP surgeries: downloaded from NHS ODS epraccur (Active practices, England only).
     Listed buildings: downloaded from MHCLG Planning Data (Historic England data).
 
@@ -322,19 +335,11 @@ def run_transit() -> None:
         ],
     )
     run_step(
-        "transit-pubs",
+        "transit-osm-amenities",
         [
-            str(SCRIPT_DIR / "build_pub_points.py"),
-            "--output",
-            str(MODEL_TRANSIT_DIR / "pub_overlay_points.geojson.gz"),
-        ],
-    )
-    run_step(
-        "transit-supermarkets",
-        [
-            str(SCRIPT_DIR / "build_supermarket_points.py"),
-            "--output",
-            str(MODEL_TRANSIT_DIR / "supermarket_overlay_points.geojson.gz"),
+            str(SCRIPT_DIR / "build_osm_amenity_points.py"),
+            "--output-dir",
+            str(MODEL_TRANSIT_DIR),
         ],
     )
 
@@ -350,7 +355,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--skip-census", action="store_true", help="Skip Census age and commute fetch + cell generation (Nomis API, no key needed)")
     parser.add_argument("--skip-primary-schools", action="store_true", help="Skip primary school Ofsted overlay generation (auto-downloads Ofsted MI CSV)")
     parser.add_argument("--skip-epc", action="store_true", help="Skip EPC cell generation (requires all-domestic-certificates.zip manually downloaded)")
-    parser.add_argument("--skip-country-lookup", action="store_true", help="Skip country-lookup asset generation (must run after vote step)")
+    parser.add_argument("--epc-incremental", action="store_true", help="Refresh EPC cells from certificates lodged since the last EPC run")
+    parser.add_argument("--skip-country-lookup", action="store_true", help="Skip country-lookup asset generation")
     parser.add_argument("--skip-broadband", action="store_true", help="Skip broadband cell generation (requires 202507_fixed_broadband_coverage_r01.zip in raw/broadband/)")
     parser.add_argument("--skip-transit", action="store_true", help="Skip bus stop, metro/tram, and pharmacy overlay generation (auto-download from NaPTAN + NHS BSA)")
     parser.add_argument(
@@ -400,7 +406,7 @@ def main() -> None:
         run_primary_schools()
 
     if not args.skip_epc:
-        run_epc()
+        run_epc(incremental=args.epc_incremental)
 
     if not args.skip_country_lookup:
         run_country_lookup()
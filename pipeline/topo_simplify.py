@@ -0,0 +1,336 @@
+"""
+topo_simplify.py — shared-arc (topology-preserving) simplification of polygon
+GeoJSON, with one output per web-map zoom level.
+
+Simplifying each polygon on its own moves a shared border differently on
+either side, leaving gaps and slivers between neighbours.  Instead, as in
+TopoJSON:
+
+  1. Coordinates are quantized to an integer lattice over the layer bbox.
+  2. Junctions are found: points where the neighbouring vertices differ
+     between the rings that pass through them (where borders meet).
+  3. Rings are cut at junctions into arcs; an arc shared by two features is
+     stored once (in either direction).
+  4. Visvalingam–Whyatt effective areas are computed once per arc.
+  5. Each zoom level keeps the vertices whose effective area exceeds about
+     one screen pixel², so both sides of a border drop the same vertices and
+     the layer stays watertight at every zoom.
+
+Usage (library):
+    topo = build_topology([f["geometry"] for f in features])
+    for zoom in (6, 9, 12):
+        geoms = topo.simplify(zoom_min_area(topo, zoom), zoom_precision(zoom))
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_QUANTIZATION = 1_000_000
+TILE_SIZE = 256
+# How many times a feature's arcs may have their threshold halved to stop its
+# main ring collapsing (tiny constituencies at national zoom).
+MAX_RELAX = 12
+
+Point = Tuple[int, int]
+# Arc reference, TopoJSON style: i = arc i forwards, ~i = arc i reversed.
+ArcRef = int
+Ring = List[ArcRef]
+Part = List[Ring]
+
+
+def _triangle_area(a: Point, b: Point, c: Point) -> float:
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2.0
+
+
+def _ring_area(points: Sequence[Point]) -> float:
+    """Signed shoelace area of a closed ring (first == last)."""
+    total = 0
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        total += x0 * y1 - x1 * y0
+    return total / 2.0
+
+
+def effective_areas(points: Sequence[Point]) -> List[float]:
+    """
+    Visvalingam–Whyatt effective area of each vertex of a polyline.  Endpoints
+    are inf; areas are made monotonic so that filtering by a threshold gives
+    the same vertex set as running the elimination up to that threshold.
+    """
+    n = len(points)
+    areas = [math.inf] * n
+    if n < 3:
+        return areas
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    current = [math.inf] * n
+    removed = [False] * n
+    heap: List[Tuple[float, int]] = []
+    for i in range(1, n - 1):
+        current[i] = _triangle_area(points[i - 1], points[i], points[i + 1])
+        heap.append((current[i], i))
+    heapq.heapify(heap)
+
+    floor = 0.0
+    while heap:
+        area, i = heapq.heappop(heap)
+        if removed[i] or area != current[i]:
+            continue
+        floor = max(floor, area)
+        areas[i] = floor
+        removed[i] = True
+        p, q = prev[i], nxt[i]
+        nxt[p] = q
+        prev[q] = p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                current[j] = _triangle_area(points[prev[j]], points[j], points[nxt[j]])
+                heapq.heappush(heap, (current[j], j))
+    return areas
+
+
+# ── Topology construction ──────────────────────────────────────────────────────
+
+def _geometry_polygons(geom: dict) -> Optional[list]:
+    gtype = (geom or {}).get("type")
+    coords = (geom or {}).get("coordinates") or []
+    if gtype == "Polygon":
+        return [coords]
+    if gtype == "MultiPolygon":
+        return list(coords)
+    return None
+
+
+def _find_junctions(rings: Sequence[List[Point]]) -> set:
+    neighbours: Dict[Point, Tuple[Point, Point]] = {}
+    junctions: set = set()
+    for ring in rings:
+        n = len(ring)
+        for i, p in enumerate(ring):
+            a, b = ring[i - 1], ring[(i + 1) % n]
+            pair = (a, b) if a <= b else (b, a)
+            seen = neighbours.get(p)
+            if seen is None:
+                neighbours[p] = pair
+            elif seen != pair:
+                junctions.add(p)
+    return junctions
+
+
+def _cut_ring(ring: List[Point], junctions: set) -> List[List[Point]]:
+    """Split an open ring into arcs at junctions (one closed arc if none)."""
+    cuts = [i for i, p in enumerate(ring) if p in junctions]
+    if not cuts:
+        # Rotate to the smallest point so the same ring cut from two features
+        # produces the same (or exactly reversed) arc.
+        k = min(range(len(ring)), key=ring.__getitem__)
+        rotated = ring[k:] + ring[:k]
+        return [rotated + [rotated[0]]]
+    start = cuts[0]
+    rotated = ring[start:] + ring[:start] + [ring[start]]
+    bounds = [i - start for i in cuts] + [len(ring)]
+    return [rotated[a:b + 1] for a, b in zip(bounds, bounds[1:])]
+
+
+@dataclass
+class Topology:
+    arcs: List[List[Point]]
+    areas: List[List[float]]
+    # Per input geometry: list of polygon parts → list of rings → arc refs
+    # (None for geometries that are not polygons).
+    features: List[Optional[List[Part]]]
+    # Index of each feature's largest part at full detail; never dropped.
+    primary: List[int]
+    transform: Tuple[float, float, float, float]  # x0, y0, kx, ky
+
+    # ── Reassembly ─────────────────────────────────────────────────────────
+
+    def _kept_arcs(self, arc_min: Sequence[float]) -> List[List[Point]]:
+        out: List[List[Point]] = []
+        for pts, areas, min_area in zip(self.arcs, self.areas, arc_min):
+            out.append([p for p, a in zip(pts, areas) if a >= min_area] if min_area > 0 else pts)
+        return out
+
+    @staticmethod
+    def _ring_points(ring: Ring, kept: List[List[Point]]) -> List[Point]:
+        points: List[Point] = []
+        for ref in ring:
+            arc = kept[ref] if ref >= 0 else kept[~ref][::-1]
+            # Consecutive arcs share their junction endpoint
+            points.extend(arc[1:] if points else arc)
+        return points
+
+    @staticmethod
+    def _valid(points: List[Point]) -> bool:
+        return len(points) >= 4 and _ring_area(points) != 0
+
+    def _relaxed_thresholds(self, min_area: float) -> List[float]:
+        """
+        Per-arc thresholds: min_area everywhere, halved on the arcs of any
+        feature whose main exterior ring would otherwise collapse.  Thresholds
+        are per arc, so the neighbour sharing a relaxed arc sees the same
+        vertices and the border stays closed.
+        """
+        arc_min = [min_area] * len(self.arcs)
+        pending = [i for i, parts in enumerate(self.features) if parts]
+        for _ in range(MAX_RELAX):
+            kept = self._kept_arcs(arc_min)
+            collapsed = [
+                i for i in pending
+                if not self._valid(self._ring_points(self.features[i][self.primary[i]][0], kept))
+            ]
+            if not collapsed:
+                break
+            for i in collapsed:
+                for ref in self.features[i][self.primary[i]][0]:
+                    j = ref if ref >= 0 else ~ref
+                    arc_min[j] /= 2.0
+            pending = collapsed
+        return arc_min
+
+    def simplify(self, min_area: float, precision: int) -> List[Optional[dict]]:
+        """
+        GeoJSON geometries (same order as the input) keeping vertices whose
+        effective area ≥ min_area (quantized units²), with coordinates
+        rounded to `precision` decimal places.  Holes and secondary parts
+        smaller than min_area are dropped.
+        """
+        x0, y0, kx, ky = self.transform
+        kept = self._kept_arcs(self._relaxed_thresholds(min_area))
+
+        def to_coords(points: List[Point]) -> list:
+            return [[round(x0 + x * kx, precision), round(y0 + y * ky, precision)] for x, y in points]
+
+        out: List[Optional[dict]] = []
+        for parts, primary in zip(self.features, self.primary):
+            if parts is None:
+                out.append(None)
+                continue
+            polygons = []
+            for k, part in enumerate(parts):
+                rings = []
+                for r, ring in enumerate(part):
+                    points = self._ring_points(ring, kept)
+                    if not self._valid(points):
+                        if r == 0:
+                            break
+                        continue
+                    if abs(_ring_area(points)) < min_area and not (k == primary and r == 0):
+                        if r == 0:
+                            break
+                        continue
+                    rings.append(to_coords(points))
+                if rings:
+                    polygons.append(rings)
+            if not polygons:
+                out.append(None)
+            elif len(polygons) == 1:
+                out.append({"type": "Polygon", "coordinates": polygons[0]})
+            else:
+                out.append({"type": "MultiPolygon", "coordinates": polygons})
+        return out
+
+
+def build_topology(geometries: Sequence[dict], quantization: int = DEFAULT_QUANTIZATION) -> Topology:
+    """Quantize, find junctions, cut and deduplicate arcs, rank vertices."""
+    polygons = [_geometry_polygons(g) for g in geometries]
+
+    xs: List[float] = []
+    ys: List[float] = []
+    for parts in polygons:
+        for part in parts or []:
+            for ring in part:
+                for pt in ring:
+                    xs.append(pt[0])
+                    ys.append(pt[1])
+    if not xs:
+        return Topology([], [], [None] * len(polygons), [0] * len(polygons), (0.0, 0.0, 1.0, 1.0))
+    x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+    del xs, ys
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    def quantize(ring: list) -> List[Point]:
+        points: List[Point] = []
+        for pt in ring:
+            p = (int(round((pt[0] - x0) / kx)), int(round((pt[1] - y0) / ky)))
+            if not points or points[-1] != p:
+                points.append(p)
+        if len(points) > 1 and points[0] == points[-1]:
+            points.pop()
+        return points
+
+    # Open quantized rings, grouped as feature → part → ring
+    quantized: List[Optional[List[List[List[Point]]]]] = []
+    for parts in polygons:
+        if parts is None:
+            quantized.append(None)
+            continue
+        q_parts = []
+        for part in parts:
+            q_rings = [quantize(ring) for ring in part]
+            if q_rings and len(q_rings[0]) >= 3:
+                q_parts.append([r for i, r in enumerate(q_rings) if i == 0 or len(r) >= 3])
+        quantized.append(q_parts)
+
+    junctions = _find_junctions([r for parts in quantized for part in parts or [] for r in part])
+
+    arcs: List[List[Point]] = []
+    index: Dict[Tuple[Point, ...], int] = {}
+
+    def arc_ref(points: List[Point]) -> ArcRef:
+        key = tuple(points)
+        i = index.get(key)
+        if i is not None:
+            return i
+        i = index.get(key[::-1])
+        if i is not None:
+            return ~i
+        index[key] = len(arcs)
+        arcs.append(points)
+        return len(arcs) - 1
+
+    features: List[Optional[List[Part]]] = []
+    primary: List[int] = []
+    for parts in quantized:
+        if parts is None:
+            features.append(None)
+            primary.append(0)
+            continue
+        features.append([[[arc_ref(a) for a in _cut_ring(r, junctions)] for r in part] for part in parts])
+        sizes = [abs(_ring_area(part[0] + part[0][:1])) for part in parts]
+        primary.append(max(range(len(sizes)), key=sizes.__getitem__) if sizes else 0)
+
+    areas = []
+    for pts in arcs:
+        a = effective_areas(pts)
+        if len(pts) > 3 and pts[0] == pts[-1]:
+            # Closed arc (a ring with no neighbours): keep its two strongest
+            # interior vertices so it never collapses below a triangle.
+            for i in sorted(range(1, len(pts) - 1), key=a.__getitem__)[-2:]:
+                a[i] = math.inf
+        areas.append(a)
+
+    return Topology(arcs, areas, features, primary, (x0, y0, kx, ky))
+
+
+# ── Zoom helpers ───────────────────────────────────────────────────────────────
+
+def pixel_degrees(zoom: int) -> float:
+    """Width of one web-mercator screen pixel in degrees of longitude."""
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def zoom_min_area(topology: Topology, zoom: int, pixels: float = 1.0) -> float:
+    """Effective-area threshold (quantized units²) of `pixels` screen pixels² at `zoom`."""
+    _, _, kx, ky = topology.transform
+    side = pixel_degrees(zoom)
+    return pixels * (side / kx) * (side / ky)
+
+
+def zoom_precision(zoom: int) -> int:
+    """Decimal places that resolve a tenth of a pixel at `zoom`."""
+    return max(0, math.ceil(-math.log10(pixel_degrees(zoom)))) + 1
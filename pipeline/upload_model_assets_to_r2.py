@@ -111,6 +111,15 @@ def collect_assets(
                 flood_dir / "flood_postcode_points.geojson.gz",
             ]
         )
+        for grid in ("1mile", "5km", "10km", "25km"):
+            p = flood_dir / f"flood_cells_{grid}.json.gz"
+            if p.exists():
+                files.append(p)
+        # Per-outcode lookup shards (flood_lookup/{OUTCODE}.json.gz) and their index
+        shard_dir = flood_dir / "flood_lookup"
+        if shard_dir.is_dir():
+            files.extend(sorted(shard_dir.glob("*.json.gz")))
+            files.append(shard_dir / "_index.json")
     if include_property:
         files.extend(property_dir / name for name in REQUIRED_PROPERTY_ASSET_NAMES)
         # Include partitioned cell files (cells/{grid}/{metric}/{endMonth}/*.json.gz)
@@ -128,7 +137,7 @@ def collect_assets(
             if p.exists():
                 files.append(p)
     if include_epc:
-        for kind in ("fuel", "age"):
+        for kind in ("fuel", "age", "retrofit"):
             for grid in ("1mile", "5km", "10km", "25km"):
                 p = epc_dir / f"epc_{kind}_cells_{grid}.json.gz"
                 if p.exists():
@@ -178,13 +187,22 @@ def content_type_for(path: Path) -> str:
     return "application/gzip"
 
 
-def object_keys_for_files(files: list[Path], prefix: str, property_dir: Path | None = None) -> list[str]:
+def object_keys_for_files(
+    files: list[Path],
+    prefix: str,
+    property_dir: Path | None = None,
+    flood_dir: Path | None = None,
+) -> list[str]:
     keys: list[str] = []
     for path in files:
-        # For partition files under cells/, preserve the relative directory structure
+        # For partition files under cells/ and flood shards under flood_lookup/,
+        # preserve the relative directory structure
         if property_dir and path.is_relative_to(property_dir / "cells"):
             rel = path.relative_to(property_dir)
             object_key = f"{prefix}/{rel.as_posix()}" if prefix else rel.as_posix()
+        elif flood_dir and path.is_relative_to(flood_dir / "flood_lookup"):
+            rel = path.relative_to(flood_dir)
+            object_key = f"{prefix}/{rel.as_posix()}" if prefix else rel.as_posix()
         else:
             object_key = f"{prefix}/{path.name}" if prefix else path.name
         keys.append(object_key)
@@ -391,7 +409,12 @@ def main() -> None:
         if missing:
             raise SystemExit("Missing staged files:\n- " + "\n- ".join(missing))
 
-        object_keys = object_keys_for_files(files, prefix, property_dir=property_dir if include_property else None)
+        object_keys = object_keys_for_files(
+            files,
+            prefix,
+            property_dir=property_dir if include_property else None,
+            flood_dir=flood_dir if include_flood else None,
+        )
         if backup_before_upload:
             backup_remote_objects(
                 s3=s3,